@@ -0,0 +1,215 @@
+"""
+Benchmark suite for the word game engines across the bundled dictionaries.
+
+Created by: Tony Held
+Created on: 2021-03-26
+
+Every benchmark is run on the words of each dictionary in proj06_magic_spells/dictionaries/
+(and proj07_anagrams/dictionaries/), so the timings show how each engine scales with dictionary size.
+
+Benchmarks
+----------
+find_palindromes        palindrome_v01.find_palindromes(words)
+find_palingrams_sets    palindrome_v01.find_palingrams(words, 'sets')
+find_palingrams_lists   palindrome_v01.find_palingrams(words[:LISTS_MAX_WORDS], 'lists'), quadratic so capped
+wordlist_build          anagrams_v01.WordList(file_name)
+find_anagrams           WordList.find_anagrams for SAMPLE_SIZE words of the dictionary
+find_contained          WordList.find_contained for CONTAINED_SAMPLE_SIZE words, with the default engine
+pig_sentence            PigLatin.pig_sentence of the whole dictionary as one sentence
+
+Each benchmark is run `warmup` times untimed, then `repeat` times timed.  Printing by the
+engines is discarded.  Results (median and percentiles in seconds) are written as JSON, and
+if a baseline is given any benchmark whose median is slower than the baseline by more than
+the tolerance is reported and the script exits with status 1.
+
+Usage
+-----
+    python benchmarks/benchmark_suite.py --save_baseline
+    python benchmarks/benchmark_suite.py --baseline benchmarks/baseline.json
+    python benchmarks/benchmark_suite.py -k palingrams -d 2of4brif --repeat 10
+"""
+from contextlib import redirect_stdout
+from datetime import datetime
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for project in ('proj04_pig_latin', 'proj06_magic_spells', 'proj07_anagrams'):
+    sys.path.append(os.path.join(ROOT, project))
+
+from anagrams_v01 import WordList
+from palindrome_v01 import find_palindromes, find_palingrams, load_dictionary
+from pig_latin_v01 import PigLatin
+
+DICTIONARY_PATTERNS = ('proj06_magic_spells/dictionaries/**/*.txt', 'proj07_anagrams/dictionaries/*.txt')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'latest.json')
+LISTS_MAX_WORDS = 2_000
+SAMPLE_SIZE = 1_000
+CONTAINED_SAMPLE_SIZE = 5
+
+
+def dictionary_files():
+    """Return the path of every bundled dictionary."""
+    files = []
+    for pattern in DICTIONARY_PATTERNS:
+        files.extend(sorted(glob.glob(os.path.join(ROOT, pattern), recursive=True)))
+    return files
+
+
+def dictionary_name(file_name):
+    """Return a short, unique name for a dictionary file."""
+    return os.path.relpath(file_name, ROOT).replace(os.sep, '/')
+
+
+def make_benchmarks(file_name):
+    """Return {benchmark name: function of no arguments} for a dictionary."""
+    words = load_dictionary(file_name)
+    rng = random.Random(0)
+    sample = rng.sample(words, min(SAMPLE_SIZE, len(words)))
+    contained_sample = [w for w in sample if w.isalpha()][:CONTAINED_SAMPLE_SIZE]
+    word_list = WordList(file_name)
+    sentence = ' '.join(words)
+
+    return {
+        'find_palindromes': lambda: find_palindromes(words),
+        'find_palingrams_sets': lambda: find_palingrams(words, 'sets', verbose=False),
+        'find_palingrams_lists': lambda: find_palingrams(words[:LISTS_MAX_WORDS], 'lists', verbose=False),
+        'wordlist_build': lambda: WordList(file_name),
+        'find_anagrams': lambda: [word_list.find_anagrams(w) for w in sample],
+        'find_contained': lambda: [word_list.find_contained(w) for w in contained_sample],
+        'pig_sentence': lambda: PigLatin.pig_sentence(sentence),
+    }
+
+
+def summarize(timings):
+    """Return summary statistics (in seconds) of a list of timings."""
+    ordered = sorted(timings)
+    quantiles = statistics.quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 else ordered * 99
+    return {
+        'runs': len(ordered),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p90': quantiles[89],
+        'p99': quantiles[98],
+        'max': ordered[-1],
+        'mean': statistics.fmean(ordered),
+        'stdev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def run_benchmark(function, warmup, repeat):
+    """Return the summary of repeat timed runs of function, after warmup untimed runs."""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(warmup):
+            function()
+        timings = []
+        for _ in range(repeat):
+            time_start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - time_start)
+    return summarize(timings)
+
+
+def run_suite(name_filter=None, dictionary_filter=None, warmup=1, repeat=5):
+    """Run every benchmark (optionally filtered by regular expressions) on every dictionary.
+
+    Returns
+    -------
+    results : dict
+        {'meta': run information, 'results': {'benchmark[dictionary]': summary}}
+    """
+    results = {}
+    for file_name in dictionary_files():
+        dictionary = dictionary_name(file_name)
+        if dictionary_filter and not re.search(dictionary_filter, dictionary):
+            continue
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            benchmarks = make_benchmarks(file_name)
+        for name, function in benchmarks.items():
+            if name_filter and not re.search(name_filter, name):
+                continue
+            key = f'{name}[{dictionary}]'
+            results[key] = run_benchmark(function, warmup, repeat)
+            summary = results[key]
+            print(f'{key:<85} median {summary["median"] * 1000:10.2f} ms  '
+                  f'p90 {summary["p90"] * 1000:10.2f} ms', flush=True)
+
+    meta = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'warmup': warmup,
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Print the change in median time against a baseline and return the list of regressions.
+
+    A benchmark regresses if its median is more than (1 + tolerance) times the baseline median.
+    """
+    regressions = []
+    print(f'\n{"benchmark":<85} {"baseline":>10} {"current":>10} {"change":>8}')
+    for key, summary in results['results'].items():
+        if key not in baseline['results']:
+            continue
+        before = baseline['results'][key]['median']
+        after = summary['median']
+        change = after / before - 1 if before else 0.0
+        flag = ''
+        if after > before * (1 + tolerance):
+            regressions.append((key, before, after))
+            flag = '  <-- REGRESSION'
+        print(f'{key:<85} {before * 1000:8.2f}ms {after * 1000:8.2f}ms {change:+7.1%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the word game engines.')
+    parser.add_argument('-k', '--benchmarks', help="regular expression selecting benchmark names")
+    parser.add_argument('-d', '--dictionaries', help="regular expression selecting dictionaries")
+    parser.add_argument('-w', '--warmup', type=int, default=1, help="untimed runs per benchmark")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument('-b', '--baseline', help="JSON results to compare against")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.25,
+                        help="allowed slowdown of the median before failing (0.25 = 25%%)")
+    parser.add_argument('--save_baseline', action='store_true',
+                        help=f"also save the results as the baseline ({DEFAULT_BASELINE})")
+    args = parser.parse_args()
+
+    results = run_suite(args.benchmarks, args.dictionaries, args.warmup, args.repeat)
+
+    with open(args.output, 'w') as fn:
+        json.dump(results, fn, indent=2)
+    print(f'\nResults written to {args.output}')
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w') as fn:
+            json.dump(results, fn, indent=2)
+        print(f'Baseline saved to {DEFAULT_BASELINE}')
+
+    if args.baseline:
+        with open(args.baseline) as fn:
+            baseline = json.load(fn)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f'\nFAILED: {len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}:')
+            for key, before, after in regressions:
+                print(f'\t{key}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms')
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Code shared between the side projects (add the repository root to sys.path to import it)."""
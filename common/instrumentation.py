@@ -0,0 +1,270 @@
+"""
+Stage-level timing and allocation instrumentation shared by the word projects.
+
+Created by: Tony Held
+Created on: 2021-03-27
+
+Stages (load, index, search, sort, output, ...) are marked with the instrument decorator or
+the stage context manager.  For every stage name the call count, total wall time and, optionally,
+the peak memory allocated while it ran (measured with tracemalloc) are recorded.
+A stage that is entered again while it is running (e.g. a recursive call) is recorded once,
+by its outermost run.
+
+Stages may run in several threads (e.g. the event loop and the executor thread of the anagram daemon).
+Open stages are tracked per thread, so a run in one thread is never mistaken for a nested run of
+the same stage in another, and the totals of a stage name are shared by all threads.  Memory is
+measured for the whole process, so a stage's peak also counts what other threads allocated while it ran.
+
+Instrumentation is off by default.  It is switched on by:
+    1. the environment variable SIDE_PROJECTS_INSTRUMENT=time (or =memory to also trace allocations),
+        with SIDE_PROJECTS_INSTRUMENT_JSON=path to write the summary as JSON instead of a table,
+    2. the --instrument / --instrument_json command line flags of the scripts (see add_arguments),
+    3. calling enable().
+When it is switched on a summary is printed (to stderr) or saved when the program exits.
+
+When it is off, stage() returns a shared do-nothing context manager and instrumented functions
+only check a flag before calling through, so the stages can be left in place.  Stages are meant
+to mark coarse work (a dictionary load, an index build), not inner loops.
+
+Usage
+-----
+    from common.instrumentation import instrument, stage
+
+    @instrument('anagrams.load')
+    def load_dictionary(file_name): ...
+
+    with stage('anagrams.sort'):
+        words.sort()
+"""
+from contextlib import nullcontext
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+ENV_VAR = 'SIDE_PROJECTS_INSTRUMENT'
+ENV_JSON = 'SIDE_PROJECTS_INSTRUMENT_JSON'
+MODES = ('time', 'memory')
+
+_enabled = False
+_trace_memory = False
+_json_path = None
+_report_registered = False
+_started_tracing = False    # tracemalloc was started by enable(), so disable() stops it
+_stats = {}
+_stats_lock = threading.Lock()
+_NULL_STAGE = nullcontext()
+
+
+class _ThreadStages(threading.local):
+    """Stages open in the calling thread."""
+
+    def __init__(self):
+        # number of open runs of each stage name, nested runs of an open stage are not recorded
+        self.open_stages = {}
+        # [allocated at entry, highest allocation seen] for each open stage, when tracing memory
+        self.memory_stack = []
+
+
+_thread_stages = _ThreadStages()
+
+
+class StageStats:
+    """Totals recorded for one stage name."""
+
+    __slots__ = ('calls', 'seconds', 'peak_bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_bytes = None
+
+    def as_dict(self):
+        return {'calls': self.calls, 'seconds': self.seconds, 'peak_bytes': self.peak_bytes}
+
+
+class _Stage:
+    """Context manager recording a single run of a stage."""
+
+    __slots__ = ('name', 'time_start', 'nested', 'traced')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        open_stages = _thread_stages.open_stages
+        depth = open_stages.get(self.name, 0)
+        open_stages[self.name] = depth + 1
+        self.nested = depth > 0
+        # a run pops the memory entry it pushed, even if tracing is switched off before it ends
+        self.traced = _trace_memory and not self.nested
+        if self.nested:
+            return self
+        if self.traced:
+            memory_stack = _thread_stages.memory_stack
+            current, peak = tracemalloc.get_traced_memory()
+            if memory_stack:
+                # keep the enclosing stage's peak before the peak is reset for this stage
+                memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            memory_stack.append([current, current])
+        self.time_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        open_stages = _thread_stages.open_stages
+        depth = open_stages.get(self.name, 1) - 1
+        if depth:
+            open_stages[self.name] = depth
+        else:
+            open_stages.pop(self.name, None)
+        if self.nested:
+            return False
+        seconds = time.perf_counter() - self.time_start
+
+        peak_bytes = None
+        if self.traced:
+            memory_stack = _thread_stages.memory_stack
+            start, highest = memory_stack.pop()
+            if tracemalloc.is_tracing():
+                highest = max(highest, tracemalloc.get_traced_memory()[1])
+                peak_bytes = highest - start
+            if memory_stack:
+                memory_stack[-1][1] = max(memory_stack[-1][1], highest)
+
+        with _stats_lock:
+            stats = _stats.get(self.name)
+            if stats is None:
+                stats = _stats[self.name] = StageStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            if peak_bytes is not None:
+                stats.peak_bytes = max(stats.peak_bytes or 0, peak_bytes)
+        return False
+
+
+def stage(name):
+    """Return a context manager that records the enclosed block as a run of stage name."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def instrument(name):
+    """Decorator recording every call of a function as a run of stage name.
+
+    Do not use it on generator functions, only the creation of the generator would be recorded.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(mode='time', json_path=None, report_at_exit=True):
+    """
+    Switch instrumentation on.
+
+    Parameters
+    ----------
+    mode : 'time' | 'memory'
+        'memory' also traces allocations (tracemalloc slows the program down noticeably)
+    json_path : str | None
+        save the summary as JSON to this file at exit, instead of printing a table
+    report_at_exit : bool
+        print or save the summary when the program exits
+    """
+    global _enabled, _trace_memory, _json_path, _report_registered, _started_tracing
+    if mode not in MODES:
+        raise ValueError(f'mode must be one of {MODES}, not {mode!r}')
+    _enabled = True
+    _trace_memory = mode == 'memory'
+    _json_path = json_path
+    if _trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+    if report_at_exit and not _report_registered:
+        atexit.register(_report_at_exit)
+        _report_registered = True
+
+
+def disable():
+    """Switch instrumentation off (recorded stats are kept).
+
+    tracemalloc is only stopped if enable() started it, tracing started by someone else is left running.
+    """
+    global _enabled, _trace_memory, _started_tracing
+    _enabled = False
+    _trace_memory = False
+    if _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget every recorded stage."""
+    with _stats_lock:
+        _stats.clear()
+
+
+def summary():
+    """Return {stage name: {'calls', 'seconds', 'peak_bytes'}} sorted by stage name."""
+    with _stats_lock:
+        return {name: _stats[name].as_dict() for name in sorted(_stats)}
+
+
+def report(file=None):
+    """Print the recorded stages as a table (default to stderr)."""
+    file = sys.stderr if file is None else file
+    print(f'\n{"stage":<40} {"calls":>7} {"total (s)":>10} {"mean (ms)":>10} {"peak (MiB)":>11}', file=file)
+    for name, stats in summary().items():
+        peak = '' if stats['peak_bytes'] is None else f'{stats["peak_bytes"] / 2 ** 20:.2f}'
+        print(f'{name:<40} {stats["calls"]:>7} {stats["seconds"]:>10.4f} '
+              f'{stats["seconds"] / stats["calls"] * 1000:>10.3f} {peak:>11}', file=file)
+
+
+def dump_json(path):
+    """Save the recorded stages to path as JSON."""
+    with open(path, 'w') as fn:
+        json.dump(summary(), fn, indent=2)
+
+
+def _report_at_exit():
+    if not _stats:
+        return
+    if _json_path:
+        dump_json(_json_path)
+        print(f'Instrumentation summary saved to {_json_path}', file=sys.stderr)
+    else:
+        report()
+
+
+def add_arguments(parser):
+    """Add the --instrument and --instrument_json flags to an argparse parser."""
+    parser.add_argument('--instrument', nargs='?', const='time', choices=MODES,
+                        help="record stage timings (and peak memory with 'memory'), summarized at exit")
+    parser.add_argument('--instrument_json', metavar='FILE',
+                        help="save the instrumentation summary to FILE as JSON")
+
+
+def enable_from_args(args):
+    """Switch instrumentation on if requested by the flags of add_arguments."""
+    if args.instrument or args.instrument_json:
+        enable(args.instrument or 'time', args.instrument_json)
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR] if os.environ[ENV_VAR] in MODES else 'time', os.environ.get(ENV_JSON))
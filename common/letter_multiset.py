@@ -0,0 +1,249 @@
+"""
+Compact letter multiset (bag of letters) shared by the word projects.
+
+Created by: Tony Held
+Created on: 2021-03-22
+
+The letter counts a-z are packed into a single integer, with one lane of lane_bits bits per letter.
+The top bit of each lane is a guard bit that is never set in a valid count, so:
+    1. equality and hashing are a single integer operation,
+    2. a multiset contains another if subtracting it (with the guard bits set) clears no guard bit,
+    3. subtraction and addition are a single integer operation plus a guard bit check.
+Every operation is therefore O(26) at worst, however long the words are.
+
+Lanes are LANE_BITS (16) wide, so a count of up to 32767 fits.  A multiset with a larger count
+uses the narrowest lane width (32, 64, ... bits) that fits its counts, so any count can be held and
+every multiset still has a single canonical signature.  Operations on two multisets with the
+default width stay single integer operations, an addition that overflows is redone with wider lanes.
+
+Only the letters a-z are counted, upper case letters are folded to lower case and
+every other character is ignored.
+
+Usage
+-----
+    python letter_multiset.py    # compare memory and speed with the other letter representations
+"""
+from array import array
+from collections import Counter
+import functools
+import os
+import sys
+import time
+import tracemalloc
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+NUM_LETTERS = len(ALPHABET)
+LANE_BITS = 16
+LANE_MAX = (1 << (LANE_BITS - 1)) - 1
+LANE_MASK = (1 << LANE_BITS) - 1
+GUARD_BITS = sum(1 << (LANE_BITS * i + LANE_BITS - 1) for i in range(NUM_LETTERS))
+SHIFTS = {c: LANE_BITS * i for i, c in enumerate(ALPHABET)}
+LETTER_INDEX = {c: i for i, c in enumerate(ALPHABET)}
+# array typecodes of 2, 4 and 8 byte unsigned lanes, used to unpack the counts
+LANE_TYPECODES = {array(t).itemsize * 8: t for t in 'HILQ'}
+
+
+@functools.lru_cache(maxsize=None)
+def lane_layout(lane_bits):
+    """Return (guard bits, largest count, lane mask) of lanes lane_bits wide."""
+    guard_bits = sum(1 << (lane_bits * i + lane_bits - 1) for i in range(NUM_LETTERS))
+    return guard_bits, (1 << (lane_bits - 1)) - 1, (1 << lane_bits) - 1
+
+
+def lane_bits_for(largest):
+    """Return the narrowest lane width (LANE_BITS doubled as needed) that holds a count of largest."""
+    lane_bits = LANE_BITS
+    while largest > (1 << (lane_bits - 1)) - 1:
+        lane_bits *= 2
+    return lane_bits
+
+
+class LetterMultiset:
+    """Immutable multiset of the letters a-z."""
+
+    __slots__ = ('signature', 'lane_bits')
+
+    def __init__(self, letters=''):
+        """letters : str - letters to count, characters other than a-z / A-Z are ignored"""
+        letters = letters.lower()
+        signature = 0
+        largest = 0
+        for c, shift in SHIFTS.items():
+            count = letters.count(c)
+            if count:
+                signature |= count << shift
+                largest = max(largest, count)
+        if largest > LANE_MAX:
+            # Too many of a letter for the default lanes, repack with wider ones
+            other = LetterMultiset.from_counts([letters.count(c) for c in ALPHABET])
+            signature, self.lane_bits = other.signature, other.lane_bits
+        else:
+            self.lane_bits = LANE_BITS
+        self.signature = signature
+
+    @classmethod
+    def from_signature(cls, signature, lane_bits=LANE_BITS):
+        """Create a multiset from its integer signature (which must use the narrowest lanes that fit)."""
+        multiset = cls.__new__(cls)
+        multiset.signature = signature
+        multiset.lane_bits = lane_bits
+        return multiset
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Create a multiset from a sequence of 26 letter counts (a-z)."""
+        counts = list(counts)
+        if any(count < 0 for count in counts):
+            raise ValueError(f'letter counts must not be negative: {counts}')
+        lane_bits = lane_bits_for(max(counts, default=0))
+        signature = 0
+        for i, count in enumerate(counts):
+            signature |= count << (lane_bits * i)
+        return cls.from_signature(signature, lane_bits)
+
+    @property
+    def counts(self):
+        """tuple of the 26 letter counts (a-z)"""
+        typecode = LANE_TYPECODES.get(self.lane_bits)
+        if typecode is None:
+            mask = lane_layout(self.lane_bits)[2]
+            return tuple((self.signature >> (self.lane_bits * i)) & mask for i in range(NUM_LETTERS))
+        lanes = array(typecode)
+        lanes.frombytes(self.signature.to_bytes(NUM_LETTERS * self.lane_bits // 8, 'little'))
+        if sys.byteorder == 'big':
+            lanes.byteswap()
+        return tuple(lanes)
+
+    @property
+    def mask(self):
+        """26-bit integer, bit i is set if letter i is present"""
+        mask = 0
+        for i, count in enumerate(self.counts):
+            if count:
+                mask |= 1 << i
+        return mask
+
+    def __getitem__(self, letter):
+        lane_bits = self.lane_bits
+        return (self.signature >> (lane_bits * LETTER_INDEX[letter])) & ((1 << lane_bits) - 1)
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __bool__(self):
+        return self.signature != 0
+
+    def __iter__(self):
+        """Iterate over the letters, with repeats, in alphabetical order."""
+        for c, count in zip(ALPHABET, self.counts):
+            yield from c * count
+
+    def __str__(self):
+        return ''.join(c * count for c, count in zip(ALPHABET, self.counts))
+
+    def __repr__(self):
+        if self.lane_bits != LANE_BITS:
+            return f'{type(self).__name__}.from_counts({list(self.counts)!r})'
+        return f'{type(self).__name__}({str(self)!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, LetterMultiset):
+            return NotImplemented
+        return self.signature == other.signature and self.lane_bits == other.lane_bits
+
+    def __hash__(self):
+        return hash(self.signature)
+
+    def contains(self, other):
+        """Return True if every letter in other occurs at least as often in self."""
+        if self.lane_bits == other.lane_bits:
+            guard_bits = GUARD_BITS if self.lane_bits == LANE_BITS else lane_layout(self.lane_bits)[0]
+            return ((self.signature | guard_bits) - other.signature) & guard_bits == guard_bits
+        return all(a >= b for a, b in zip(self.counts, other.counts))
+
+    def __ge__(self, other):
+        return self.contains(other)
+
+    def __le__(self, other):
+        return other.contains(self)
+
+    def __sub__(self, other):
+        """Remove the letters of other, raises ValueError if other is not contained in self."""
+        if self.lane_bits == other.lane_bits == LANE_BITS:
+            difference = (self.signature | GUARD_BITS) - other.signature
+            if difference & GUARD_BITS != GUARD_BITS:
+                raise ValueError(f'{other!r} is not contained in {self!r}')
+            return LetterMultiset.from_signature(difference ^ GUARD_BITS)
+        if not self.contains(other):
+            raise ValueError(f'{other!r} is not contained in {self!r}')
+        return LetterMultiset.from_counts(a - b for a, b in zip(self.counts, other.counts))
+
+    def __add__(self, other):
+        if self.lane_bits == other.lane_bits == LANE_BITS:
+            total = self.signature + other.signature
+            if not total & GUARD_BITS:
+                return LetterMultiset.from_signature(total)
+        return LetterMultiset.from_counts(a + b for a, b in zip(self.counts, other.counts))
+
+    def items(self):
+        """Return a list of (letter, count) for the letters that are present."""
+        return [(c, count) for c, count in zip(ALPHABET, self.counts) if count]
+
+
+def _measure(label, words, build, operation):
+    """Print the memory per word of build(word) and the speed of operation(a, b)."""
+    tracemalloc.start()
+    values = [build(w) for w in words]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pairs = list(zip(values, values[1:] + values[:1]))
+    time_start = time.perf_counter()
+    for a, b in pairs:
+        operation(a, b)
+    time_diff = time.perf_counter() - time_start
+
+    print(f'{label:>24}: {memory / len(words):7.1f} bytes/word, {len(pairs) / time_diff:12,.0f} ops/sec')
+
+
+def _pop_letters(word, letters):
+    """Original list-and-pop letter removal (anagrams_v01.remove_letters before LetterMultiset)."""
+    remaining = list(word)
+    for i in letters:
+        if i not in remaining:
+            return None
+        remaining.pop(remaining.index(i))
+    return remaining
+
+
+def _histogram(word):
+    """Original LetterHistogram representation, a dict of lists of letters."""
+    freq_dict = {c: [] for c in ALPHABET}
+    for c in word:
+        if c in freq_dict:
+            freq_dict[c].append(c)
+    return freq_dict
+
+
+def main(file_name):
+    """Compare the memory per word and the speed of a contains / subtract operation for each representation."""
+    with open(file_name) as fn:
+        words = [w.strip().lower() for w in fn if w.strip()]
+    print(f'Letter representations of the {len(words)} words in {file_name}:')
+
+    _measure('sorted tuple (==)', words, lambda w: tuple(sorted(w)), lambda a, b: a == b)
+    _measure('Counter (contains)', words, Counter,
+             lambda a, b: all(a[k] >= v for k, v in b.items()))
+    _measure('str + list.pop (remove)', words, str, _pop_letters)
+    _measure('dict of lists (count e)', words, _histogram, lambda a, b: len(a['e']))
+    _measure('LetterMultiset (==)', words, LetterMultiset, lambda a, b: a == b)
+    _measure('LetterMultiset (contains)', words, LetterMultiset, LetterMultiset.contains)
+    _measure('LetterMultiset (remove)', words, LetterMultiset,
+             lambda a, b: a - b if a.contains(b) else None)
+    _measure('LetterMultiset (count e)', words, LetterMultiset, lambda a, b: a['e'])
+
+
+if __name__ == '__main__':
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'proj07_anagrams', 'dictionaries', '2of4brif.txt')
+    main(sys.argv[1] if len(sys.argv) > 1 else default)
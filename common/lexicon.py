@@ -0,0 +1,249 @@
+"""
+Streaming word list loader that understands every 12dicts file format.
+
+Created by: Tony Held
+Created on: 2021-03-28
+
+Formats
+-------
+'plain'       one word (or phrase) per line, possibly followed by annotation markers
+              (e.g. 2of12inf.txt 'abandonments%', 6of12.txt 'abductor=', 3of6game.txt 'abaci$').
+'lemmatized'  headwords, each followed by an indented, comma separated line of its inflections,
+              with optional cross-references, e.g. '    abided, abides, abode -> [abode]' (2+2+3lem.txt).
+'frequency'   the lemmatized layout split into sections by '----- N -----' lines, where N is the
+              frequency rank of the headwords below it (2+2+3frq.txt), parenthesized words and
+              '*' markers are unwrapped.
+'agid'        Automatically Generated Inflection Database entries '<word> [{explanation}] <POS>: <forms>',
+              other lines (e.g. the documentation of agid.txt) are skipped.
+The format of a file is detected from its first lines (see detect_format).
+
+Every word is stripped of surrounding annotation markers (MARKERS), and by default
+lower cased, deduplicated (keeping the first occurrence) and filtered by length and alphabet.
+The file is read line by line, so iter_words never holds more than the words it has yielded
+(and the set used to deduplicate them), and load_words builds its list directly from it.
+
+Usage
+-----
+    from common.lexicon import iter_words, load_words
+
+    for word in iter_words('2of12inf.txt', alphabet=ALPHABET):
+        ...
+    words = load_words('2+2+3lem.txt', min_length=3)
+"""
+from collections import namedtuple
+import glob
+import itertools
+import os
+import re
+import string
+import sys
+
+FORMATS = ('plain', 'lemmatized', 'frequency', 'agid')
+# 12dicts annotation markers, they only ever surround a word (2+2+3frq.txt also wraps some words in parentheses)
+MARKERS = '!#$%&*+:;<=>^~'
+STRIP_CHARS = string.whitespace + MARKERS
+ALPHABET = string.ascii_lowercase
+# 12dicts files are ISO-8859-1 (ASCII except for a few accented words in agid.txt)
+ENCODING = 'latin-1'
+SNIFF_LINES = 50
+
+SECTION_PATTERN = re.compile(r'^-+\s*(\d+)\s*-+$')
+CROSS_REFERENCE_PATTERN = re.compile(r'\s*->\s*\[[^\]]*\]')
+AGID_PATTERN = re.compile(r'^(\S+)(?: \{[^}]*\})? [VNA]\??: (.*)$')
+AGID_SEPARATORS = re.compile(r'\s+\|\s+|\s+/\??\s*|\s{2,}')
+AGID_EXPLANATION = re.compile(r'\s*\{[^}]*\}')
+
+LexiconEntry = namedtuple('LexiconEntry', ['word', 'lemma', 'rank'])
+LexiconEntry.__doc__ = """A word of a word list.
+
+word : str - the normalized word
+lemma : str - the headword the word is an inflection of (the word itself for a headword)
+rank : int | None - frequency rank of the headword's section ('frequency' format only)
+"""
+
+
+def find_dictionaries(directory, pattern='**/*.txt'):
+    """Return the sorted paths of the word lists in directory (searched recursively)."""
+    return sorted(glob.glob(os.path.join(directory, pattern), recursive=True))
+
+
+def detect_format(file_name):
+    """Return the format of a word list, detected from its first SNIFF_LINES lines."""
+    with open(file_name, encoding=ENCODING) as fn:
+        lines = list(itertools.islice(fn, SNIFF_LINES))
+    if lines and lines[0].startswith('Automatically Generated Inflection Database'):
+        return 'agid'
+    if any(SECTION_PATTERN.match(line.strip()) for line in lines):
+        return 'frequency'
+    if any(line[:1] in (' ', '\t') and line.strip() for line in lines):
+        return 'lemmatized'
+    return 'plain'
+
+
+def normalize(token, lower=True):
+    """Return a word stripped of whitespace, cross-references and annotation markers."""
+    if '->' in token:
+        token = CROSS_REFERENCE_PATTERN.sub('', token)
+    token = token.strip(STRIP_CHARS)
+    if token[:1] == '(' and token[-1:] == ')':
+        token = token[1:-1].strip(STRIP_CHARS)
+    return token.lower() if lower else token
+
+
+def _plain_entries(lines, lower):
+    for line in lines:
+        word = normalize(line, lower)
+        if word:
+            yield LexiconEntry(word, word, None)
+
+
+def _lemmatized_entries(lines, lower, sections):
+    lemma = None
+    rank = None
+    for line in lines:
+        if not line.strip():
+            continue
+        if sections:
+            match = SECTION_PATTERN.match(line.strip())
+            if match:
+                rank = int(match.group(1))
+                continue
+        if line[0] in ' \t':
+            # Inflections of the last headword, cross-references may hold commas
+            if '->' in line:
+                line = CROSS_REFERENCE_PATTERN.sub('', line)
+            for item in line.split(','):
+                word = normalize(item, lower)
+                if word:
+                    yield LexiconEntry(word, lemma or word, rank)
+        else:
+            lemma = normalize(line, lower)
+            if lemma:
+                yield LexiconEntry(lemma, lemma, rank)
+
+
+def _agid_entries(lines, lower):
+    for line in lines:
+        match = AGID_PATTERN.match(line.rstrip('\n'))
+        if not match:
+            continue
+        lemma = normalize(match.group(1), lower)
+        if not lemma:
+            continue
+        yield LexiconEntry(lemma, lemma, None)
+        forms = AGID_EXPLANATION.sub('', match.group(2))
+        for item in AGID_SEPARATORS.split(forms.strip()):
+            word = normalize(item.rstrip('~!?'), lower)
+            if word:
+                yield LexiconEntry(word, lemma, None)
+
+
+def iter_entries(file_name, fmt=None, lower=True):
+    """
+    Lazily read the entries of a word list, in file order, without deduplicating or filtering.
+
+    Parameters
+    ----------
+    file_name : str
+        location of the word list
+    fmt : 'plain' | 'lemmatized' | 'frequency' | 'agid' | None
+        format of the file, None detects it (see detect_format)
+    lower : bool
+        lower case the words
+
+    Returns
+    -------
+    generator of LexiconEntry
+    """
+    fmt = detect_format(file_name) if fmt is None else fmt
+    if fmt not in FORMATS:
+        raise ValueError(f'fmt must be one of {FORMATS}, not {fmt!r}')
+    with open(file_name, encoding=ENCODING) as fn:
+        if fmt == 'plain':
+            yield from _plain_entries(fn, lower)
+        elif fmt == 'agid':
+            yield from _agid_entries(fn, lower)
+        else:
+            yield from _lemmatized_entries(fn, lower, sections=fmt == 'frequency')
+
+
+def iter_words(file_name, fmt=None, lower=True, unique=True, min_length=1, max_length=None,
+               alphabet=None, inflections=True):
+    """
+    Lazily read the words of a word list.
+
+    Parameters
+    ----------
+    file_name : str
+        location of the word list
+    fmt : 'plain' | 'lemmatized' | 'frequency' | 'agid' | None
+        format of the file, None detects it (see detect_format)
+    lower : bool
+        lower case the words
+    unique : bool
+        skip words that were already yielded
+    min_length, max_length : int, int | None
+        only yield words with a length in this range
+    alphabet : str | None
+        only yield words made entirely of these characters (e.g. ALPHABET), None allows any word
+    inflections : bool
+        also yield the inflections listed under each headword (lemmatized, frequency and agid formats)
+
+    Returns
+    -------
+    generator of str
+    """
+    fmt = detect_format(file_name) if fmt is None else fmt
+    if fmt == 'plain':
+        # Fast path, no entries to unpack and normalize() only for the rare words that need more than a strip
+        with open(file_name, encoding=ENCODING) as fn:
+            words = (line.strip(STRIP_CHARS) for line in fn)
+            words = (normalize(w, False) if '(' in w or '->' in w else w for w in words)
+            if lower:
+                words = map(str.lower, words)
+            yield from _filter_words(words, unique, min_length, max_length, alphabet)
+        return
+
+    entries = iter_entries(file_name, fmt, lower)
+    words = (e.word for e in entries if inflections or e.word == e.lemma)
+    yield from _filter_words(words, unique, min_length, max_length, alphabet)
+
+
+def _filter_words(words, unique, min_length, max_length, alphabet):
+    """Yield the non-empty words that pass the filters of iter_words."""
+    words = filter(None, words)
+    if min_length > 1 or max_length is not None:
+        max_length = float('inf') if max_length is None else max_length
+        words = (w for w in words if min_length <= len(w) <= max_length)
+    if alphabet is not None:
+        allowed = frozenset(alphabet).issuperset
+        words = filter(allowed, words)
+    if not unique:
+        yield from words
+        return
+    seen = set()
+    add = seen.add
+    for word in words:
+        if word not in seen:
+            add(word)
+            yield word
+
+
+def load_words(file_name, **options):
+    """Return the list of words of a word list, options are those of iter_words."""
+    return list(iter_words(file_name, **options))
+
+
+def main(directory):
+    """Print the format, number of words and sample words of every word list in directory."""
+    print(f'{"word list":<50} {"format":>10} {"words":>7}  first words')
+    for file_name in find_dictionaries(directory):
+        words = load_words(file_name)
+        print(f'{os.path.relpath(file_name, directory):<50} {detect_format(file_name):>10} '
+              f'{len(words):>7}  {words[:4]}')
+
+
+if __name__ == '__main__':
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'proj06_magic_spells', 'dictionaries')
+    main(sys.argv[1] if len(sys.argv) > 1 else default)
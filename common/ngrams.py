@@ -0,0 +1,268 @@
+"""
+Letter n-gram (n = 1..4) frequency tables of a word list or a text.
+
+Created by: Tony Held
+Created on: 2021-04-01
+
+Every word is padded with a boundary symbol at both ends ('cat' is counted as '_cat_'), so the
+tables also know which letters start and end words.  A symbol is coded as 0 (boundary) or
+1..26 (a-z), and the counts of the n-grams of each n are stored in a dense array of 27**n
+unsigned ints indexed by the base 27 number of the n-gram's codes: a lookup is an index
+computation and an array access, with no str keys or dicts.  Building the tables is a single pass
+over the words, updating the index of every n at once as each symbol is read.
+
+The searches use the tables to reject letter sequences that never occur in a word:
+    is_plausible(fragment, start, end)  - every n-gram of the fragment occurs
+    is_plausible_prefix(prefix)         - O(1), the word start and the newest n-gram of a prefix occur
+    is_plausible_suffix(suffix)         - O(1), the oldest n-gram and the word end of a suffix occur
+and score() ranks fragments by how likely their letters are, to order candidates.
+
+Binary Format
+-------------
+    header  - MAGIC, max n (uint8), number of words counted (uint64)
+    tables  - zlib compressed little-endian uint32 counts of n = 1..max n
+
+Usage
+-----
+    python ngrams.py    # build, save and load the tables of a dictionary and demonstrate the queries
+"""
+from array import array
+import math
+import os
+import re
+import string
+import struct
+import sys
+import time
+import zlib
+
+ALPHABET = string.ascii_lowercase
+BOUNDARY = '_'
+SYMBOLS = BOUNDARY + ALPHABET
+BASE = len(SYMBOLS)
+MAX_N = 4
+CODES = str.maketrans(SYMBOLS, ''.join(map(chr, range(BASE))))
+SYMBOL_CODES = {symbol: code for code, symbol in enumerate(SYMBOLS)}
+WORD_PATTERN = re.compile('[a-z]+')
+PARTIAL_WORD_PATTERN = re.compile('[A-Za-z]*\\Z')
+MAGIC = b'NGRAMS02'
+HEADER = struct.Struct('<8sBQ')
+DEFAULT_CHUNK_SIZE = 1 << 20     # characters
+
+
+def gram_index(gram):
+    """Return the table index of an n-gram made of SYMBOLS, raises ValueError for other characters."""
+    index = 0
+    for symbol in gram:
+        # Checked by symbol: CODES leaves other characters as they are, and the ones below chr(BASE)
+        # would pass for codes
+        code = SYMBOL_CODES.get(symbol)
+        if code is None:
+            raise ValueError(f'n-gram {gram!r} has characters other than {SYMBOLS!r}')
+        index = index * BASE + code
+    return index
+
+
+class NGramTables:
+    """Dense count tables of the 1..max_n letter grams of words."""
+
+    def __init__(self, max_n=MAX_N, tables=None):
+        """
+        max_n : int - longest n-gram counted (1 to MAX_N)
+        tables : list of array('I') | None - the tables of n = 1..max_n, default all zero counts
+        """
+        if not 1 <= max_n <= MAX_N:
+            raise ValueError(f'max_n must be between 1 and {MAX_N}, not {max_n}')
+        self.max_n = max_n
+        if tables is None:
+            tables = [array('I', bytes(4 * BASE ** n)) for n in range(1, max_n + 1)]
+        self.tables = tables
+        self.words = 0
+
+    # Building
+    # --------
+    def add_words(self, words):
+        """Count the n-grams of an iterable of lower case words (a-z).
+
+        Raises ValueError for a word that is empty or has other characters, the words before it stay counted.
+        """
+        tables = self.tables
+        moduli = [BASE ** n for n in range(1, self.max_n + 1)]
+        ns = range(self.max_n)
+        words_added = 0
+        try:
+            for word in words:
+                # Any other character would be coded past the last symbol and wrap into other grams
+                if not WORD_PATTERN.fullmatch(word):
+                    raise ValueError(f'words must be made of the letters a-z, not {word!r}')
+                words_added += 1
+                indices = [0] * self.max_n
+                # A gram is counted once it is full: after n symbols of the padded word have been read
+                for position, code in enumerate(f'{BOUNDARY}{word}{BOUNDARY}'.translate(CODES).encode('latin-1')):
+                    for n in ns:
+                        indices[n] = (indices[n] * BASE + code) % moduli[n]
+                        if position >= n:
+                            tables[n][indices[n]] += 1
+        finally:
+            self.words += words_added
+        return self
+
+    def add_text(self, text):
+        """Count the n-grams of the words (runs of letters) of a text."""
+        return self.add_words(WORD_PATTERN.findall(text.lower()))
+
+    def add_stream(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Count the n-grams of the words of a text stream, read chunk_size characters at a time."""
+        partial = ''
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            chunk = partial + chunk
+            cut = PARTIAL_WORD_PATTERN.search(chunk).start()    # a word may continue in the next chunk
+            partial = chunk[cut:]
+            self.add_text(chunk[:cut])
+        return self.add_text(partial)
+
+    @classmethod
+    def from_words(cls, words, max_n=MAX_N):
+        return cls(max_n).add_words(words)
+
+    @classmethod
+    def from_dictionary(cls, file_name, max_n=MAX_N):
+        """Build the tables of a word list (any 12dicts format, see common/lexicon.py)."""
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+        from common.lexicon import iter_words
+        return cls.from_words(iter_words(file_name, alphabet=ALPHABET), max_n)
+
+    # Saving
+    # ------
+    def save(self, path):
+        """Save the tables and the number of words counted to a compressed binary file."""
+        counts = array('I')
+        for table in self.tables:
+            counts.extend(table)
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        with open(path, 'wb') as fn:
+            fn.write(HEADER.pack(MAGIC, self.max_n, self.words))
+            fn.write(zlib.compress(counts.tobytes()))
+
+    @classmethod
+    def load(cls, path):
+        """Load tables saved by save()."""
+        with open(path, 'rb') as fn:
+            header = fn.read(HEADER.size)
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f'{path} does not hold n-gram tables (of format {MAGIC!r})')
+            counts = array('I')
+            counts.frombytes(zlib.decompress(fn.read()))
+        _, max_n, words = HEADER.unpack(header)
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        tables = []
+        start = 0
+        for n in range(1, max_n + 1):
+            tables.append(counts[start:start + BASE ** n])
+            start += BASE ** n
+        ngrams = cls(max_n, tables)
+        ngrams.words = words
+        return ngrams
+
+    # Queries
+    # -------
+    def count(self, gram):
+        """Return the number of occurrences of an n-gram of SYMBOLS ('_' marks a word boundary),
+        raises ValueError for an empty gram or one longer than max_n."""
+        if not 0 < len(gram) <= self.max_n:
+            raise ValueError(f'n-grams have 1 to {self.max_n} symbols, not {len(gram)} ({gram!r})')
+        return self.tables[len(gram) - 1][gram_index(gram)]
+
+    def _windows(self, fragment, start, end):
+        """Return the n-grams covering a fragment (with its word boundaries if start / end)."""
+        padded = f'{BOUNDARY if start else ""}{fragment}{BOUNDARY if end else ""}'
+        if not padded:
+            return []
+        n = min(self.max_n, len(padded))
+        return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+    def is_plausible(self, fragment, start=False, end=False):
+        """Return True if every n-gram of a lower case fragment occurs.
+
+        start, end : the fragment starts / ends a word
+        """
+        return all(self.count(gram) for gram in self._windows(fragment, start, end))
+
+    def is_plausible_prefix(self, prefix):
+        """Return True if the start and the last n-gram of a word prefix occur, in O(1).
+
+        A search that extends a prefix one letter at a time checks every n-gram of it this way.
+        """
+        if not prefix:
+            return bool(self.count(BOUNDARY))
+        head = BOUNDARY + prefix[:self.max_n - 1]
+        return bool(self.count(head) and self.count(prefix[-self.max_n:]))
+
+    def is_plausible_suffix(self, suffix):
+        """Return True if the first n-gram and the end of a word suffix occur, in O(1)."""
+        if not suffix:
+            return bool(self.count(BOUNDARY))
+        tail = suffix[-(self.max_n - 1):] + BOUNDARY if self.max_n > 1 else BOUNDARY
+        return bool(self.count(suffix[:self.max_n]) and self.count(tail))
+
+    def score(self, fragment, start=False, end=False):
+        """Return the log probability of the letters of a fragment (higher is more plausible),
+        -inf if one of its n-grams never occurs."""
+        windows = self._windows(fragment, start, end)
+        total = 0.0
+        for i, gram in enumerate(windows):
+            # The first window is scored on its own, every later one given the letters before its last
+            grams = [gram] if i else [gram[:k] for k in range(1, len(gram) + 1)]
+            for g in grams:
+                count = self.count(g)
+                if not count:
+                    return -math.inf
+                context = self.count(g[:-1]) if len(g) > 1 else sum(self.tables[0])
+                total += math.log(count / context)
+        return total
+
+    @property
+    def nbytes(self):
+        """bytes used by the count tables"""
+        return sum(t.itemsize * len(t) for t in self.tables)
+
+
+def main(file_name):
+    time_start = time.perf_counter()
+    ngrams = NGramTables.from_dictionary(file_name)
+    print(f'n-grams of {ngrams.words} words of {os.path.basename(file_name)} counted in '
+          f'{time.perf_counter() - time_start:.2f} seconds ({ngrams.nbytes / 2 ** 20:.1f} MiB of tables).')
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ngrams.bin')
+    ngrams.save(path)
+    loaded = NGramTables.load(path)
+    if loaded.tables != ngrams.tables:
+        raise AssertionError('saved and loaded tables differ')
+    print(f'Saved to {path} ({os.path.getsize(path) / 2 ** 10:.0f} KiB).')
+    os.remove(path)
+
+    for gram in ('e', 'th', '_qu', 'ing_', 'xq'):
+        print(f'count({gram!r}) = {ngrams.count(gram)}')
+    for fragment in ('str', 'tsr', 'ngth', 'zzq', 'pkl'):
+        print(f'{fragment!r}: prefix {ngrams.is_plausible_prefix(fragment)}, '
+              f'suffix {ngrams.is_plausible_suffix(fragment)}, anywhere {ngrams.is_plausible(fragment)}, '
+              f'score {ngrams.score(fragment, start=True):.2f}')
+
+    # How many 3 letter word starts the tables rule out, and the cost of a query
+    starts = [a + b + c for a in ALPHABET for b in ALPHABET for c in ALPHABET]
+    time_start = time.perf_counter()
+    plausible = sum(map(ngrams.is_plausible_prefix, starts))
+    seconds = time.perf_counter() - time_start
+    print(f'{len(starts) - plausible} of {len(starts)} three letter word starts are implausible '
+          f'({seconds / len(starts) * 1e6:.2f} microseconds per query).')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else
+         os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'proj06_magic_spells',
+                      'dictionaries', '12dicts-6.0.2', 'International', '2of4brif.txt'))
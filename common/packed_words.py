@@ -0,0 +1,316 @@
+"""
+Packed, read-only word list stored in a single buffer, shareable between processes without copying.
+
+Created by: Tony Held
+Created on: 2021-03-30
+
+A list of N str objects costs about 50 bytes of object overhead per word, plus a pointer in the list,
+and every process working on the list needs its own copy.  PackedWords keeps the words in one
+contiguous buffer instead:
+    blob    - the utf-8 words, each followed by a newline (the layout of word_index.py's word_blob)
+    offsets - uint32[N+1], start of each word in blob, offsets[N] is the end of the blob
+Word i is decoded to a str only when it is accessed, slices are views that share the buffer, and
+iteration decodes the words a chunk at a time.
+
+The same layout can be saved to a file and memory-mapped (save / open), or placed in a
+multiprocessing.shared_memory block (to_shared_memory / attach), so any number of processes can
+read one physical copy of the words.
+
+PackedWordIndex looks words up in a PackedWords without a dict of str: an open addressing hash
+table of uint32 word positions, hashed with zlib.crc32 (str hashes differ between processes), that
+is built once and saved / memory-mapped like the words.
+
+Buffer Layout
+-------------
+    header  - MAGIC, number of words (uint64), blob length in bytes (uint64)
+    offsets - uint32[N+1]
+    blob    - starting on an 8-byte boundary
+
+Index Layout
+------------
+    header  - INDEX_MAGIC, number of slots (uint64, a power of 2)
+    slots   - uint32[slots], 1 + position of a word, 0 for an empty slot
+
+Usage
+-----
+    python packed_words.py    # compare the memory used by lists of words and PackedWords
+"""
+from array import array
+from collections.abc import Sequence
+from multiprocessing import shared_memory
+import gc
+import mmap
+import os
+import struct
+import sys
+import tracemalloc
+import zlib
+
+MAGIC = b'PACKWRDS'
+HEADER = struct.Struct('<8sQQ')
+ALIGNMENT = 8
+ITER_CHUNK = 4096   # words decoded at a time when iterating
+INDEX_MAGIC = b'PACKHASH'
+INDEX_HEADER = struct.Struct('<8sQ')
+
+
+def _layout(num_words, blob_length):
+    """Return (offsets position, blob position, total size) of the buffer layout."""
+    offsets_position = HEADER.size
+    blob_position = offsets_position + 4 * (num_words + 1)
+    blob_position += -blob_position % ALIGNMENT
+    return offsets_position, blob_position, blob_position + blob_length
+
+
+class PackedWords(Sequence):
+    """Immutable sequence of words backed by a single bytes-like buffer."""
+
+    def __init__(self, blob, offsets, owner=None):
+        """
+        blob : bytes-like - the words, each followed by a newline
+        offsets : sequence of int - uint32[N+1] start of each word in blob (array or memoryview)
+        owner : object keeping the buffer alive (an mmap or SharedMemory), released by close()
+        """
+        self.blob = blob
+        self.offsets = offsets
+        self.owner = owner
+
+    @classmethod
+    def from_words(cls, words):
+        """Pack an iterable of words (which must not contain newlines)."""
+        offsets = array('I', [0])
+        parts = []
+        position = 0
+        for word in words:
+            encoded = word.encode()
+            parts.append(encoded)
+            position += len(encoded) + 1
+            offsets.append(position)
+        parts.append(b'')
+        return cls(b'\n'.join(parts), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            # offsets are absolute positions in the blob, so a slice of them is a valid view
+            return PackedWords(self.blob, self.offsets[start:max(start, stop) + 1], self.owner)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('PackedWords index out of range')
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1] - 1], 'utf-8')
+
+    def __iter__(self):
+        for start in range(0, len(self), ITER_CHUNK):
+            yield from self._decode(start, min(start + ITER_CHUNK, len(self)))
+
+    def _decode(self, start, stop):
+        """Return words start to stop as a list of str."""
+        if start >= stop:
+            return []
+        return str(self.blob[self.offsets[start]:self.offsets[stop] - 1], 'utf-8').split('\n')
+
+    def tolist(self):
+        """Return every word as a list of str."""
+        return self._decode(0, len(self))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} words, {self.nbytes} bytes)'
+
+    @property
+    def nbytes(self):
+        """bytes used by the words and offsets (a view counts its whole blob)"""
+        return len(self.blob) + len(self.offsets) * 4
+
+    def _pack_into(self, buffer):
+        """Write the buffer layout of these words into a writable buffer of size buffer_size()."""
+        base = self.offsets[0]
+        blob = self.blob[base:self.offsets[-1]]
+        offsets_position, blob_position, _ = _layout(len(self), len(blob))
+        HEADER.pack_into(buffer, 0, MAGIC, len(self), len(blob))
+        rebased = array('I', self.offsets) if not base else array('I', (o - base for o in self.offsets))
+        buffer[offsets_position:offsets_position + len(rebased) * 4] = rebased.tobytes()
+        buffer[blob_position:blob_position + len(blob)] = blob
+
+    def buffer_size(self):
+        """Return the size in bytes of the saved / shared buffer layout."""
+        return _layout(len(self), self.offsets[-1] - self.offsets[0])[2]
+
+    @classmethod
+    def from_buffer(cls, buffer, owner=None):
+        """Return a PackedWords viewing (without copying) a buffer in the saved layout."""
+        view = memoryview(buffer)
+        magic, num_words, blob_length = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('buffer does not hold packed words')
+        offsets_position, blob_position, end = _layout(num_words, blob_length)
+        offsets = view[offsets_position:offsets_position + 4 * (num_words + 1)].cast('I')
+        return cls(view[blob_position:end], offsets, owner)
+
+    def save(self, path):
+        """Save the words to a file that open() can memory-map."""
+        buffer = bytearray(self.buffer_size())
+        self._pack_into(buffer)
+        with open(path, 'wb') as fn:
+            fn.write(buffer)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a file written by save(), the pages are shared by every process mapping it."""
+        with open(path, 'rb') as fn:
+            buffer = mmap.mmap(fn.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer, owner=buffer)
+
+    def to_shared_memory(self, name=None):
+        """Copy the words into a new shared memory block and return the SharedMemory.
+
+        The caller owns the block: attach() to it from other processes with its name,
+        and close() and unlink() it when every process is done.
+        """
+        block = shared_memory.SharedMemory(name=name, create=True, size=self.buffer_size())
+        self._pack_into(block.buf)
+        return block
+
+    @classmethod
+    def attach(cls, name):
+        """Return a PackedWords viewing an existing shared memory block created by to_shared_memory().
+
+        Only the creator unlinks the block, so attaching must not register it with the resource tracker.
+        Before Python 3.13 SharedMemory always registers the block, and unregistering it again would
+        also drop the creator's entry (the tracker process is shared with the workers multiprocessing
+        starts), so a POSIX block is memory-mapped read-only directly, like open() maps a file.
+        No global state is touched, attach is safe to call from any thread.
+        """
+        if sys.version_info >= (3, 13):
+            block = shared_memory.SharedMemory(name=name, track=False)
+        elif os.name == 'posix':
+            import _posixshmem
+            fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+            try:
+                buffer = mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+            return cls.from_buffer(buffer, owner=buffer)
+        else:
+            # Windows blocks are not tracked, they are freed when the last handle is closed
+            block = shared_memory.SharedMemory(name=name)
+        return cls.from_buffer(block.buf, owner=block)
+
+    def close(self):
+        """Release the buffer of an opened or attached PackedWords (and its views)."""
+        if isinstance(self.blob, memoryview):
+            self.blob.release()
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        if self.owner is not None:
+            self.owner.close()
+            self.owner = None
+
+
+class PackedWordIndex:
+    """Hash index of the positions of the words of a PackedWords."""
+
+    def __init__(self, words, slots, owner=None):
+        """
+        words : PackedWords - the indexed words
+        slots : sequence of int - uint32 hash table built by build() (array or memoryview)
+        owner : object keeping the slots alive (an mmap), released by close()
+        """
+        self.words = words
+        self.slots = slots
+        self.mask = len(slots) - 1
+        self.owner = owner
+
+    @classmethod
+    def build(cls, words):
+        """Index a PackedWords, the table is at most half full."""
+        size = 1 << max(3, (2 * len(words)).bit_length())
+        slots = array('I', bytes(4 * size))
+        mask = size - 1
+        blob, offsets = words.blob, words.offsets
+        for i in range(len(words)):
+            slot = zlib.crc32(blob[offsets[i]:offsets[i + 1] - 1]) & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = i + 1
+        return cls(words, slots)
+
+    def index(self, word):
+        """Return the position of word, -1 if it is not one of the words."""
+        encoded = word.encode()
+        blob, offsets, slots, mask = self.words.blob, self.words.offsets, self.slots, self.mask
+        slot = zlib.crc32(encoded) & mask
+        while entry := slots[slot]:
+            if blob[offsets[entry - 1]:offsets[entry] - 1] == encoded:
+                return entry - 1
+            slot = (slot + 1) & mask
+        return -1
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __len__(self):
+        return len(self.words)
+
+    def save(self, path):
+        """Save the hash table (not the words) to a file that open() can memory-map."""
+        with open(path, 'wb') as fn:
+            fn.write(INDEX_HEADER.pack(INDEX_MAGIC, len(self.slots)))
+            fn.write(array('I', self.slots).tobytes())
+
+    @classmethod
+    def open(cls, path, words):
+        """Memory-map a hash table written by save(), words must be the PackedWords it was built for."""
+        with open(path, 'rb') as fn:
+            buffer = mmap.mmap(fn.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+        magic, size = INDEX_HEADER.unpack_from(view)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f'{path} does not hold a packed word index')
+        return cls(words, view[INDEX_HEADER.size:INDEX_HEADER.size + 4 * size].cast('I'), owner=buffer)
+
+    def close(self):
+        """Release the slots of an opened index (the words are closed separately)."""
+        if isinstance(self.slots, memoryview):
+            self.slots.release()
+        if self.owner is not None:
+            self.owner.close()
+            self.owner = None
+
+
+def _traced(build):
+    """Return (result, bytes still allocated by build())."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, memory
+
+
+def main(file_names):
+    """Compare the memory used by a list of str and by PackedWords for each word list."""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from common.lexicon import iter_words
+
+    print(f'{"word list":<28} {"words":>7} {"list (MiB)":>11} {"packed (MiB)":>13} {"ratio":>6}')
+    for file_name in file_names:
+        words, list_memory = _traced(lambda: list(iter_words(file_name)))
+        packed, packed_memory = _traced(lambda: PackedWords.from_words(words))
+        if packed.tolist() != words:
+            raise AssertionError(f'packed words of {file_name} differ')
+        print(f'{os.path.basename(file_name):<28} {len(words):>7} {list_memory / 2 ** 20:>11.2f} '
+              f'{packed_memory / 2 ** 20:>13.2f} {list_memory / packed_memory:>5.1f}x')
+
+
+if __name__ == '__main__':
+    dictionaries = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'proj06_magic_spells',
+                                'dictionaries')
+    main(sys.argv[1:] or [os.path.join(dictionaries, '12dicts-6.0.2', 'International', '2of4brif.txt'),
+                          os.path.join(dictionaries, '12dicts-6.0.2', 'Lemmatized', '2+2+3lem.txt'),
+                          os.path.join(dictionaries, 'american_words_long.txt')])
@@ -0,0 +1,148 @@
+"""
+Seeded, splittable random number streams for reproducible (and parallel) generation.
+
+Created by: Tony Held
+Created on: 2021-04-02
+
+A RandomStream is a random.Random (so randint, choice, shuffle, ... all work) whose seed is
+derived from a root seed and a key, a tuple naming the task the stream is for:
+    root = RandomStream(42)
+    dice = root.child('dice')           # key ('dice',)
+    tasks = dice.spawn(8)               # keys ('dice', 0) ... ('dice', 7)
+The seed of a stream is a hash (blake2b) of the root seed and its key, so streams with different
+keys are independent, and a stream only depends on (root seed, key): giving task i the stream
+spawn(n)[i] makes its output the same whichever worker runs it and however many workers there are.
+Without a root seed a random one is drawn, and is kept in root_seed so the run can be repeated.
+
+Batched draws return arrays of values instead of a Python int per call:
+    randints(low, high, size)   - uniform integers low..high (like randint), array('B') for
+                                  small ranges, made with one randbytes() and one bytes.translate
+    dice(num_sides, num_dice)   - rolls of a num_sides die
+    choose(population, size)    - elements of population, with replacement
+
+Usage
+-----
+    python random_streams.py    # check that parallel draws do not depend on the number of workers
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import random
+import secrets
+import sys
+import time
+
+SEED_BYTES = 32
+WORD_BITS = 32
+
+
+def derive_seed(root_seed, key):
+    """Return the integer seed of the stream of key (a tuple of str / int) under root_seed."""
+    data = repr((root_seed, tuple(key))).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=SEED_BYTES).digest(), 'little')
+
+
+class RandomStream(random.Random):
+    """Independent random stream identified by a root seed and a key."""
+
+    def __init__(self, root_seed=None, key=()):
+        """
+        root_seed : int | None - seed shared by every stream of a run, None draws one
+        key : tuple of str / int - name of this stream under the root seed
+        """
+        self.root_seed = secrets.randbits(64) if root_seed is None else root_seed
+        self.key = tuple(key)
+        super().__init__(derive_seed(self.root_seed, self.key))
+
+    def __repr__(self):
+        return f'{type(self).__name__}(root_seed={self.root_seed!r}, key={self.key!r})'
+
+    def __reduce__(self):
+        # Keep the root seed and key (random.Random only pickles the generator state)
+        return type(self), (self.root_seed, self.key), self.getstate()
+
+    def __setstate__(self, state):
+        self.setstate(state)
+
+    def child(self, *key):
+        """Return the stream named key under this stream (its draws do not affect this stream)."""
+        return RandomStream(self.root_seed, self.key + key)
+
+    def spawn(self, n):
+        """Return n independent child streams, one per task."""
+        return [self.child(i) for i in range(n)]
+
+    # Batched draws
+    # -------------
+    def randints(self, low, high, size):
+        """Return size uniform integers in low..high (inclusive), as an array."""
+        span = high - low + 1
+        if span <= 0:
+            raise ValueError(f'empty range {low}..{high}')
+        if 0 <= low and high <= 0xFF:
+            return self._small_randints(low, span, size)
+        if span <= 1 << WORD_BITS and -(1 << 63) <= low and high < 1 << 63:
+            return self._word_randints(low, span, size)
+        return [self.randrange(low, high + 1) for _ in range(size)]
+
+    def _small_randints(self, low, span, size):
+        """Bytes are mapped to low + byte % span, bytes that would bias the result are deleted."""
+        limit = 256 - 256 % span
+        table = bytes(low + b % span if b < limit else 0 for b in range(256))
+        rejected = bytes(range(limit, 256))
+        values = bytearray()
+        while len(values) < size:
+            need = size - len(values)
+            values += self.randbytes(need + need * (256 - limit) // limit + 8).translate(table, rejected)
+        del values[size:]
+        return array('B', values)
+
+    def _word_randints(self, low, span, size):
+        limit = (1 << WORD_BITS) - (1 << WORD_BITS) % span
+        values = array('q')
+        while len(values) < size:
+            need = size - len(values)
+            words = array('I')
+            words.frombytes(self.randbytes(4 * (need + need * ((1 << WORD_BITS) - limit) // limit + 8)))
+            if sys.byteorder == 'big':
+                words.byteswap()
+            values.extend(low + w % span for w in words if w < limit)
+        del values[size:]
+        return values
+
+    def dice(self, num_sides=6, num_dice=1):
+        """Return the rolls of num_dice dice with num_sides sides."""
+        return self.randints(1, num_sides, num_dice)
+
+    def choose(self, population, size):
+        """Return a list of size elements of population, chosen with replacement."""
+        return [population[i] for i in self.randints(0, len(population) - 1, size)]
+
+
+def _roll_task(stream, num_dice):
+    """Sum of the rolls of a task's stream (run in a worker process)."""
+    return sum(stream.dice(6, num_dice))
+
+
+def main(root_seed=2021, tasks=12, num_dice=100_000):
+    """Check that tasks draw the same values with 1 and 3 workers, and compare draw speeds."""
+    streams = RandomStream(root_seed).child('demo').spawn(tasks)
+    results = {}
+    for workers in (1, 3):
+        with ProcessPoolExecutor(workers) as executor:
+            results[workers] = list(executor.map(_roll_task, streams, [num_dice] * tasks))
+    print(f'{tasks} tasks give the same sums with 1 and 3 workers: {results[1] == results[3]}')
+
+    rng = RandomStream(root_seed)
+    time_start = time.perf_counter()
+    [rng.randint(1, 6) for _ in range(num_dice)]
+    scalar = time.perf_counter() - time_start
+    time_start = time.perf_counter()
+    rng.dice(6, num_dice)
+    batched = time.perf_counter() - time_start
+    print(f'{num_dice} dice: randint {scalar:.3f} seconds, batched {batched:.4f} seconds '
+          f'({scalar / batched:.0f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
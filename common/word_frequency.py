@@ -0,0 +1,154 @@
+"""
+Frequency rank and lemma index of English words, from the 12dicts lemmatized lists.
+
+Created by: Tony Held
+Created on: 2021-03-29
+
+Sources
+-------
+2+2+3frq.txt  headwords (with their inflections) split into frequency bands '----- N -----',
+              band 1 holds the most common words.
+2+2+3lem.txt  every headword with its inflections (lemma -> inflection groups).
+
+Every word of the frequency list gets the band of its headword, and every other inflection in the
+lemma list gets the best band of its lemmas.  Ranked words are then ordered by band, with the words
+of the frequency list before the inherited inflections and file order within each, and a word's
+rank is its position in that order (0 = most common).  Words that are not ranked share the rank
+len(WordFrequency), after every ranked word.
+
+Search engines use the index to cut a word list down to its top_n most common words before
+searching (prune, prune_indices), and to order their results by score (ranked).
+
+Usage
+-----
+    python word_frequency.py    # summarize the index
+"""
+from collections import defaultdict
+import functools
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.lexicon import iter_entries
+
+LEMMATIZED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'proj06_magic_spells',
+                              'dictionaries', '12dicts-6.0.2', 'Lemmatized')
+DEFAULT_FREQUENCY = os.path.join(LEMMATIZED_DIR, '2+2+3frq.txt')
+DEFAULT_LEMMAS = os.path.join(LEMMATIZED_DIR, '2+2+3lem.txt')
+
+
+class WordFrequency:
+    """Frequency rank and lemma index of words."""
+
+    def __init__(self, frequency_file=DEFAULT_FREQUENCY, lemma_file=DEFAULT_LEMMAS):
+        """
+        frequency_file : str - frequency banded word list (2+2+3frq.txt format)
+        lemma_file : str | None - lemmatized word list (2+2+3lem.txt format), None to skip inherited ranks
+        """
+        self.bands = {}                     # word -> frequency band
+        self.lemmas = defaultdict(list)     # word -> headwords it is listed under
+        self.inflections = defaultdict(list)    # headword -> words listed under it
+
+        for entry in iter_entries(frequency_file, 'frequency'):
+            self.bands.setdefault(entry.word, entry.rank)
+            self._add_lemma(entry.word, entry.lemma)
+        ranked = list(self.bands)
+
+        if lemma_file is not None:
+            inherited = {}
+            for entry in iter_entries(lemma_file, 'lemmatized'):
+                self._add_lemma(entry.word, entry.lemma)
+                band = self.bands.get(entry.lemma)
+                if entry.word not in self.bands and band is not None:
+                    inherited[entry.word] = min(band, inherited.get(entry.word, band))
+            self.bands.update(inherited)
+            ranked += inherited
+
+        # sorted() is stable, so file order (frequency list first) is kept within a band
+        self.ranks = {word: i for i, word in enumerate(sorted(ranked, key=self.bands.__getitem__))}
+        self.unranked = len(self.ranks)
+        self.lemmas.default_factory = None
+        self.inflections.default_factory = None
+
+    def _add_lemma(self, word, lemma):
+        if lemma not in self.lemmas[word]:
+            self.lemmas[word].append(lemma)
+            if word != lemma:
+                self.inflections[lemma].append(word)
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def __contains__(self, word):
+        return word in self.ranks
+
+    def rank(self, word):
+        """Return the rank of a word, 0 is the most common, unranked words return len(self)."""
+        return self.ranks.get(word, self.unranked)
+
+    def band(self, word):
+        """Return the frequency band of a word (1 is the most common) or None if it is not ranked."""
+        return self.bands.get(word)
+
+    def score(self, *words):
+        """Return the score of a result made of one or more words: the rank of its least common word."""
+        ranks_get, unranked = self.ranks.get, self.unranked
+        return max(ranks_get(w, unranked) for w in words)
+
+    def top_words(self, top_n):
+        """Return the top_n most common words, most common first."""
+        return sorted(self.ranks, key=self.ranks.__getitem__)[:top_n]
+
+    def prune_indices(self, words, top_n):
+        """Return the indices (in increasing order) of the words that are among the top_n most common words."""
+        ranks_get = self.ranks.get
+        return [i for i, w in enumerate(words) if ranks_get(w, top_n) < top_n]
+
+    def prune(self, words, top_n):
+        """Return the words (in their original order) that are among the top_n most common words."""
+        return [words[i] for i in self.prune_indices(words, top_n)]
+
+    def ranked(self, results, key=None):
+        """Return results sorted by score, most common first, ties in their natural order.
+
+        key : function returning the words of a result (as a tuple), default: the result is a word
+        """
+        if key is None:
+            return sorted(results, key=lambda w: (self.rank(w), w))
+        return sorted(results, key=lambda r: (self.score(*key(r)), r))
+
+    def lemma(self, word):
+        """Return the headwords a word is listed under (empty if it is not listed)."""
+        return tuple(self.lemmas.get(word, ()))
+
+    def family(self, word):
+        """Return the headwords of a word and all of their inflections."""
+        family = []
+        for lemma in self.lemmas.get(word, ()):
+            for w in (lemma, *self.inflections.get(lemma, ())):
+                if w not in family:
+                    family.append(w)
+        return family
+
+
+@functools.lru_cache(maxsize=None)
+def load_word_frequency(frequency_file=DEFAULT_FREQUENCY, lemma_file=DEFAULT_LEMMAS):
+    """Return the WordFrequency index of the given files, built once per process."""
+    return WordFrequency(frequency_file, lemma_file)
+
+
+def main():
+    frequency = load_word_frequency()
+    bands = defaultdict(int)
+    for band in frequency.bands.values():
+        bands[band] += 1
+    print(f'{len(frequency)} ranked words, {len(frequency.inflections)} headwords with inflections.')
+    print('Words per frequency band: ' + ', '.join(f'{b}: {n}' for b, n in sorted(bands.items())))
+    print(f'The 20 most common words are: {frequency.top_words(20)}')
+    for word in ('went', 'abode', 'aardvarks'):
+        print(f'{word}: rank {frequency.rank(word)}, band {frequency.band(word)}, '
+              f'lemma {frequency.lemma(word)}, family {frequency.family(word)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,175 @@
 
 """Create a desirable D&D Character to mount an attack on the most evil of Hickam Dungeon Masters!"""
 
-from random import randint  # access random number generator function from python library
+from array import array
+from fractions import Fraction
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.random_streams import RandomStream  # seeded random streams, one per character
+
+# SEED makes every run roll the same characters, None rolls new ones each run
+SEED = None
+
+# Batched dice engine
+# -------------------
+# Three dice thrown together are drawn as a single byte, the code 36*(a-1) + 6*(b-1) + (c-1) in 0..215
+# of their values a, b, c (a uniform code is three independent uniform dice), so a block of attempts
+# is one array of codes, NUM_QUALITIES per attempt.  The codes are turned into pass flags with one
+# bytes.translate, each attempt's flags are padded to 8 bytes, and array('Q').index finds the first
+# attempt whose flags are all set, all without a Python loop over the dice.
+DICE_CODES = 216
+CODE_SUMS = bytes(a + b + c for a in range(1, 7) for b in range(1, 7) for c in range(1, 7))
+ATTEMPT_BYTES = 8
+ALL_PASSED = int.from_bytes(b'\x01' * ATTEMPT_BYTES, sys.byteorder)
+BLOCK_SIZE = 100_000     # attempts rolled at a time
+MAX_ATTEMPTS = 10_000_000
+
+
+def decode_dice(code):
+    """Return the three die values of a dice code"""
+    return code // 36 + 1, code // 6 % 6 + 1, code % 6 + 1
+
+
+def roll_batched(rng, min_roll, num_qualities=6, max_attempts=MAX_ATTEMPTS, block_size=BLOCK_SIZE, report=None):
+    """Roll attempts of num_qualities 3d6 sums in blocks until every sum of an attempt is >= min_roll.
+        rng - RandomStream the dice are rolled with
+        report - called with the number of attempts made after every block without a passing attempt
+    Returns (attempts, rolls, passed): the number of the first passing attempt (counting from 1) and
+    its sums, or max_attempts and the sums of the last attempt if none passed, as the sequential loop does"""
+    if num_qualities > ATTEMPT_BYTES:
+        raise ValueError(f'at most {ATTEMPT_BYTES} qualities can be rolled in a batch')
+    pass_table = bytes(s >= min_roll for s in CODE_SUMS) + bytes(256 - DICE_CODES)
+    if not any(pass_table):
+        raise ValueError(f'3d6 can not roll {min_roll} or more')
+    attempts = 0
+    codes = array('B', [0] * num_qualities)
+    while attempts < max_attempts:
+        block = min(block_size, max_attempts - attempts)
+        codes = rng.randints(0, DICE_CODES - 1, block * num_qualities)
+        flags = codes.tobytes().translate(pass_table)
+        padded = bytearray(b'\x01') * (block * ATTEMPT_BYTES)
+        for k in range(num_qualities):
+            padded[k::ATTEMPT_BYTES] = flags[k::num_qualities]
+        try:
+            first = array('Q', padded).index(ALL_PASSED)
+        except ValueError:
+            attempts += block
+            if report is not None:
+                report(attempts)
+            continue
+        start = first * num_qualities
+        return attempts + first + 1, [CODE_SUMS[c] for c in codes[start:start + num_qualities]], True
+    return attempts, [CODE_SUMS[c] for c in codes[-num_qualities:]], False
+
+# Exact distribution
+# ------------------
+# The number of ways num_dice dice can sum to each total is the num_dice-fold convolution of one
+# die's counts [0, 1, 1, ..., 1].  Given a threshold the stats of a character are independent, each
+# following the distribution of a single sum conditioned on being >= the threshold, so qualifying
+# characters can be drawn directly from it instead of rejecting attempts.
+
+def sum_counts(num_dice=3, num_sides=6):
+    """Return counts where counts[total] is the number of ways num_dice num_sides dice sum to total"""
+    counts = [1]
+    for _ in range(num_dice):
+        convolved = [0] * (len(counts) + num_sides)
+        for total, ways in enumerate(counts):
+            if ways:
+                for face in range(1, num_sides + 1):
+                    convolved[total + face] += ways
+        counts = convolved
+    return counts
+
+
+def threshold_probability(min_roll, num_dice=3, num_sides=6):
+    """Return the exact probability (a Fraction) that the sum of num_dice num_sides dice is >= min_roll"""
+    counts = sum_counts(num_dice, num_sides)
+    return Fraction(sum(counts[max(min_roll, 0):]), num_sides ** num_dice)
+
+
+def character_odds(min_roll, num_qualities=6, num_dice=3, num_sides=6):
+    """Return the exact (probability that an attempt passes, expected number of attempts) for a threshold,
+    the expected attempts are infinite if no attempt can pass"""
+    probability = threshold_probability(min_roll, num_dice, num_sides) ** num_qualities
+    return probability, (1 / probability if probability else math.inf)
+
+
+def roll_exact(rng, min_roll, num_qualities=6, num_dice=3, num_sides=6):
+    """Draw the sums of a qualifying character directly from the conditional distribution, in constant time"""
+    counts = sum_counts(num_dice, num_sides)
+    start = max(min_roll, num_dice)
+    if start >= len(counts):
+        raise ValueError(f'{num_dice}d{num_sides} can not roll {min_roll} or more')
+    return rng.choices(range(start, len(counts)), weights=counts[start:], k=num_qualities)
+
+
+def chi_square_p_value(statistic, df):
+    """Return P(X >= statistic) for X chi-square distributed with df degrees of freedom
+    (the regularized upper incomplete gamma function Q(df/2, statistic/2))"""
+    a, x = df / 2, statistic / 2
+    if x <= 0:
+        return 1.0
+    scale = math.exp(-x + a * math.log(x) - math.lgamma(a))
+    if x < a + 1:
+        # series for the lower function P
+        term = total = 1 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1 - total * scale)
+    # continued fraction for Q (modified Lentz)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10_000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return scale * h
+
+
+def compare_samplers(min_roll=12, characters=2000, rng=None, num_qualities=6):
+    """Roll characters with the rejection sampler (roll_batched) and the exact sampler (roll_exact) and
+    test whether their stats follow the same distribution with a two sample chi-square test.
+    Returns (statistic, degrees of freedom, p value), a small p value (< 0.01) means they differ"""
+    rng = RandomStream(SEED, ('compare_samplers',)) if rng is None else rng
+    rejection = rng.child('rejection')
+    exact = rng.child('exact')
+    samples = {'rejection': [], 'exact': []}
+    for _ in range(characters):
+        attempts, rolls, passed = roll_batched(rejection, min_roll, num_qualities, block_size=4096)
+        if not passed:
+            raise ValueError(f'rejection sampling found no character with all stats >= {min_roll}')
+        samples['rejection'] += rolls
+        samples['exact'] += roll_exact(exact, min_roll, num_qualities)
+
+    totals = sorted(set(samples['rejection']) | set(samples['exact']))
+    table = [[rolls.count(t) for t in totals] for rolls in samples.values()]
+    columns = [sum(column) for column in zip(*table)]
+    rows = [sum(row) for row in table]
+    grand = sum(rows)
+    statistic = sum((observed - rows[i] * columns[j] / grand) ** 2 / (rows[i] * columns[j] / grand)
+                    for i, row in enumerate(table) for j, observed in enumerate(row))
+    df = len(totals) - 1
+    p_value = chi_square_p_value(statistic, df) if df else 1.0
+    print(f'Rejection vs exact sampling of {characters} characters with all stats >= {min_roll}: '
+          f'chi-square = {statistic:.2f}, df = {df}, p = {p_value:.3f}')
+    return statistic, df, p_value
 
 def print_header(str, char='*'):
     """Print header to seperate output
@@ -23,11 +191,15 @@ class DChar:
     NUM_QUALITIES = len(QUALITIES) # Number of qualities for a single character
 
 
-    def __init__(self, player_name):
+    def __init__(self, player_name, rng=None, engine='auto'):
+        """player_name - name of the character
+           rng - RandomStream the dice are rolled with, defaults to the player's stream under SEED
+           engine - 'auto', 'exact', 'batched' or 'sequential', see roll_character"""
         self.player_name = player_name
+        self.rng = RandomStream(SEED, ('d_and_d', player_name)) if rng is None else rng
         self.characteristics={}
         self.set_characteristics() # initialize all to 0
-        self.roll_character()
+        self.roll_character(engine)
         self.display_character()
 
     def set_characteristics(self, rolls=[]):
@@ -54,15 +226,54 @@ class DChar:
             print(f'{key.title()} = {value}')
         print()
         
-    def roll_character(self):
-        """roll a character with all values >= than MIN_ROLL""" 
+    def roll_character(self, engine='auto'):
+        """roll a character with all values >= than MIN_ROLL
+            engine - 'exact' draws a qualifying character from the exact distribution (see roll_exact),
+                     'batched' rolls blocks of attempts at once (see roll_batched),
+                     'sequential' rolls one attempt at a time,
+                     'auto' is 'exact' when more than MAX_ATTEMPTS attempts are expected, else 'batched'"""
+        print_header(f'Rolling for characteristics of player named {self.player_name}', '-')
+
+        probability, expected_attempts = character_odds(DChar.MIN_ROLL, DChar.NUM_QUALITIES)
+        if not probability:
+            # no engine can find a character, rejection sampling would only give up after MAX_ATTEMPTS
+            raise ValueError(f'MIN_ROLL = {DChar.MIN_ROLL} can not be rolled with 3d6 (3 to 18)')
+        print(f'Each attempt passes with probability {float(probability):.3g} '
+              f'({float(expected_attempts):,.0f} attempts expected)')
+        if engine == 'auto':
+            engine = 'exact' if expected_attempts > MAX_ATTEMPTS else 'batched'
+
+        if engine == 'exact':
+            self.set_characteristics(roll_exact(self.rng, DChar.MIN_ROLL, DChar.NUM_QUALITIES))
+            print(f'Characteristics drawn from the exact distribution of rolls >= {DChar.MIN_ROLL}\n')
+            return
+
+        time_start = time.perf_counter()
+        if engine == 'batched':
+            attempts, char_roll, passed = roll_batched(
+                self.rng, DChar.MIN_ROLL, DChar.NUM_QUALITIES,
+                report=lambda attempts: print(f'Still looking after {attempts} attempts ...'))
+            if not passed:
+                print(f'I quit looking after {attempts} attempts!')
+        elif engine == 'sequential':
+            attempts, char_roll = self.roll_sequential()
+        else:
+            raise ValueError(f"engine must be 'auto', 'exact', 'batched' or 'sequential', not {engine!r}")
+        seconds = time.perf_counter() - time_start
+
+        print(f'{attempts} attempts were made to roll a character '
+              f'with all characteristics >= {DChar.MIN_ROLL} '
+              f'({attempts / max(seconds, 1e-9):,.0f} attempts/sec)\n')
+
+        self.set_characteristics(char_roll)
+
+    def roll_sequential(self):
+        """roll one attempt at a time until all values are >= MIN_ROLL, return (attempts, rolls)"""
         attempts = 0
         # temp_roll is an array to store all rolls for a single character
         temp_roll = [0] * DChar.NUM_QUALITIES
         min_roll = 0 # value of smallest characteristics in last roll
 
-        print_header(f'Rolling for characteristics of player named {self.player_name}', '-')
-
         # Roll all qualities and then check if all are greater than minimum
         while min_roll < DChar.MIN_ROLL:
             attempts += 1
@@ -70,20 +281,19 @@ class DChar:
             min_roll = min(char_roll)  # find min roll in charateristics
             if (attempts % 10_000 == 0):
                 print(f'Still looking after {attempts} attempts ...')
-            if (attempts % 10_000_000 == 0):
+            if (attempts % MAX_ATTEMPTS == 0):
                 print(f'I quit looking after {attempts} attempts!')
                 min_roll = DChar.MIN_ROLL
 
-        print(f'{attempts} attempts were made to roll a character '
-              f'with all characteristics >= {DChar.MIN_ROLL}\n')
-
-        self.set_characteristics(char_roll)
+        return attempts, char_roll
 
     def roll3(self):
         """Return the sum of 3 6-sided dice thrown simultaneously"""
         # randint is incredibly slow which is the bottleneck for the whole program
-        return randint(1,6) + randint(1,6) + randint(1,6)
+        return self.rng.randint(1,6) + self.rng.randint(1,6) + self.rng.randint(1,6)
 
-flach = DChar('Flach the Fearless')
-seguso = DChar('Seguso the Strong')
-print(f'Broken by The Nibbler\n')
\ No newline at end of file
+if __name__ == '__main__':
+    flach = DChar('Flach the Fearless')
+    seguso = DChar('Seguso the Strong')
+    compare_samplers()
+    print(f'Broken by The Nibbler\n')
\ No newline at end of file
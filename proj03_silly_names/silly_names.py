@@ -8,11 +8,37 @@ References & Acknowledgements:
 1) Inspired by `Impractical Python Projects` chapter 1 challenge
 2) argument parser: https://docs.python.org/3/howto/argparse.html
 3) Generator overview: https://realpython.com/introduction-to-python-generators/
+
+Bulk Generation
+---------------
+unique_names() streams distinct "first middle last" names (or names of any number of parts), up to
+every one of the len(first) * len(middle) * len(last) combinations, without remembering the names
+already made:
+1. Position i of the output is mapped to the combination index (a * i + c) % N, a permutation of
+    0..N-1 because the multiplier a is coprime with N (a and c are drawn from the seed's stream,
+    see common/random_streams.py).
+2. The index is split into one position per part (a mixed radix number, last part fastest), and
+    every part list is shuffled once, so consecutive names do not step through the lists in order.
+3. Names are made a batch of positions at a time, and a batch is computed a column at a time: the
+    indices, then the position in each part, then the names, each with one map over the whole batch
+    (the loops run in C), so the speed and memory use do not depend on how many names are requested.
+    The last parts are joined ahead of time into one table of at most MAX_TABLE_SIZE partial names
+    ("middle last" by default), which leaves fewer columns to split each batch into.
+
+    python silly_names.py --count 100000 --seed 42 --output names.txt --report_memory
 """
 
+import os
 import sys
-from random import choice
+from itertools import repeat
+from math import gcd
 import argparse
+import operator
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.random_streams import RandomStream
 
 # First and last silly name options for
 first = ('Baby Oil', 'Bad News', 'Big Burps', "Bill 'Beenie-Weenie'",
@@ -52,19 +78,104 @@ last = ('Appleyard', 'Bigmeat', 'Bloominshine', 'Boogerbottom',
         'Weiners', 'Whipkey', 'Wigglesworth', 'Wimplesnatch', 'Winterkorn',
         'Woolysocks')
 
+DEFAULT_BATCH_SIZE = 10_000
+MAX_TABLE_SIZE = 1 << 16    # partial names joined ahead of time by unique_names
+
+
 class TooPicky(Exception):
     """Exception if the user does not select a name combo in a reasonable amount of tries."""
     pass
 
-def name_combo(max_tries):
-    """Return next choice via a generator function"""
+def name_combo(max_tries, rng=None):
+    """Return next choice via a generator function
 
+    rng : RandomStream | None - stream the names are drawn from, default a randomly seeded one
+    """
+    rng = RandomStream(key=('name_combo',)) if rng is None else rng
     for i in range(max_tries):
-        yield f"Try # {i}: {choice(first)} {choice(last)}"
+        yield f"Try # {i}: {rng.choice(first)} {rng.choice(last)}"
     raise TooPicky("What's wrong with you! :)")
 
 
-def main(max_tries=10):
+def unique_names(count=None, seed=None, batch_size=DEFAULT_BATCH_SIZE, parts=(first, middle, last)):
+    """
+    Yield batches of distinct names, sampled without replacement.
+
+    Parameters
+    ----------
+    count : int | None
+        number of names, None for every combination of the parts
+    seed : int | None
+        seed of the permutation and of the shuffled parts, None for a different order every run
+    batch_size : int
+        number of names made (and yielded as a list) at a time
+    parts : sequence of sequences of str
+        the name lists combined, one name from each (any number of lists)
+
+    Returns
+    -------
+    generator of list of str
+    """
+    rng = RandomStream(seed, ('unique_names',))
+    parts = [[p.strip() for p in rng.sample(part, len(part))] for part in parts]
+    size = 1
+    for part in parts:
+        size *= len(part)
+    count = size if count is None else count
+    if not 0 <= count <= size:
+        raise ValueError(f'count must be between 0 and {size} (the number of combinations), not {count}')
+    if batch_size < 1:
+        raise ValueError(f'batch_size must be at least 1, not {batch_size}')
+    if not count:
+        # Nothing to permute (possibly an empty part, so no combination at all)
+        return
+
+    # A multiplier coprime with the size makes i -> (a * i + c) % size a permutation
+    multiplier = rng.randrange(1, size) if size > 1 else 1
+    while gcd(multiplier, size) != 1:
+        multiplier = rng.randrange(1, size)
+    offset = rng.randrange(size)
+
+    # Every part but the last carries the space that separates it from the next one,
+    # and the last parts are joined into a single table while it stays small
+    tables = [[p + ' ' for p in part] for part in parts[:-1]] + parts[-1:]
+    while len(tables) > 1 and len(tables[-2]) * len(tables[-1]) <= MAX_TABLE_SIZE:
+        tail = tables.pop()
+        tables[-1] = [p + t for p in tables[-1] for t in tail]
+
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        if not tables:
+            yield [''] * (stop - start)
+            continue
+        indices = list(map(operator.mod, range(multiplier * start + offset, multiplier * stop + offset, multiplier),
+                           repeat(size)))
+        # Peel off the position in each table, last table first (it varies fastest)
+        columns = []
+        for table in tables[:0:-1]:
+            num = len(table)
+            columns.append(map(table.__getitem__, map(operator.mod, indices, repeat(num))))
+            indices = list(map(operator.floordiv, indices, repeat(num)))
+        columns.append(map(tables[0].__getitem__, indices))
+        if len(columns) == 1:
+            yield list(columns[0])
+        elif len(columns) == 2:
+            yield list(map(operator.add, columns[1], columns[0]))
+        else:
+            yield list(map(''.join, zip(*reversed(columns))))
+
+
+def write_names(output, count=None, seed=None, batch_size=DEFAULT_BATCH_SIZE, parts=(first, middle, last)):
+    """Write distinct names (see unique_names) to a text stream, one per line, and return the number written."""
+    written = 0
+    for batch in unique_names(count, seed, batch_size, parts):
+        output.write('\n'.join(batch))
+        output.write('\n')
+        written += len(batch)
+    return written
+
+
+def main(max_tries=10, seed=None):
     """Main function to drive silly name creator."""
 
     print("Welcome to the silly name generator.")
@@ -73,7 +184,7 @@ def main(max_tries=10):
     full_name = None
 
     try:
-        for full_name in name_combo(max_tries):
+        for full_name in name_combo(max_tries, RandomStream(seed, ('name_combo',))):
             print(full_name, file=sys.stderr, end="")
             my_input = input()
             if my_input.lower() == "q":
@@ -94,12 +205,39 @@ if __name__ == "__main__":
     Example usage:  
         python silly_names.py -max_tries 7
         python silly_names.py -m 3
+        python silly_names.py --count 100000 --seed 42 --output names.txt
     """
     parser = argparse.ArgumentParser(description='Silly name generator.')
     parser.add_argument('-m', '--max_tries', type=int)
+    parser.add_argument('-n', '--count', type=int, help="write this many distinct names instead of choosing one")
+    parser.add_argument('-s', '--seed', type=int, help="seed of the names, for a repeatable run")
+    parser.add_argument('-o', '--output', default='-', help="file the bulk names are written to (- for stdout)")
+    parser.add_argument('--batch_size', type=int, default=DEFAULT_BATCH_SIZE, help="names made at a time")
+    parser.add_argument('--report_memory', action='store_true',
+                        help="trace allocations and report the peak memory used by the bulk names (slower)")
     args = parser.parse_args()
 
-    if args.max_tries is None:
-        main()
+    if args.count is not None:
+        combinations = len(first) * len(middle) * len(last)
+        if not 0 <= args.count <= combinations:
+            parser.error(f'--count must be between 0 and {combinations} (the number of combinations)')
+        if args.report_memory:
+            tracemalloc.start()
+        time_start = time.perf_counter()
+        if args.output == '-':
+            written = write_names(sys.stdout, args.count, args.seed, args.batch_size)
+        else:
+            with open(args.output, 'w') as fn:
+                written = write_names(fn, args.count, args.seed, args.batch_size)
+        seconds = time.perf_counter() - time_start
+        print(f'{written:,} names written in {seconds:.2f} seconds '
+              f'({written / max(seconds, 1e-9):,.0f} names/sec)', file=sys.stderr)
+        if args.report_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'Peak memory allocated: {peak / 2 ** 20:.2f} MiB '
+                  f'({args.batch_size:,} names per batch)', file=sys.stderr)
+    elif args.max_tries is None:
+        main(seed=args.seed)
     else:
-        main(args.max_tries)
+        main(args.max_tries, args.seed)
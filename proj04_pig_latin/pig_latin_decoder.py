@@ -0,0 +1,186 @@
+"""
+Translate Pig Latin back to English.
+
+Created by: Tony Held
+Created on: 2021-03-31
+
+Pig latin can not be inverted by rule alone: 'ickquay' is 'quick', but it is not clear where the
+moved consonants of 'ingstray' started ('string' or 'gstrin'?), and 'oneway' could be 'one' or 'woneway'.
+The decoder instead translates every word of a dictionary forwards once, into a reverse index of
+{pig latin form: [English words]}, and looks the pig latin words up in it.
+
+Implementation Details:
+1. When several dictionary words have the same pig latin form, the most common one is used
+    (see common/word_frequency.py), otherwise the first in the dictionary.
+2. Words that are not in the index are decoded by rule: a 'way' ending is dropped, and for an 'ay'
+    ending the longest consonant cluster before it that starts a dictionary word ('str', 'qu', ...)
+    is moved back to the front.  A 'way' ending is always read as a vowel word, so an unknown word
+    whose moved onset is 'w' is not recovered: 'ugway' decodes to 'ug', never 'wug'
+    (dictionary words such as 'wad' are found in the index and are not affected).
+3. A capitalized pig latin word is decoded to a capitalized word.
+4. Text is decoded with the same chunked streaming and word cache as the forward translator
+    (see pig_latin_v01.translate_stream), so non-words (spacing, punctuation) are copied unchanged.
+
+Usage
+-----
+    python pig_latin_decoder.py "Eakingspay Igpay Atinlay oesday otnay akemay oneway orcinepay!"
+    python pig_latin_decoder.py --file pig.txt --output english.txt
+
+References & Acknowledgements:
+    1) Inspired by `Impractical Python Projects` chapter 1 challenge
+"""
+from collections import defaultdict
+from functools import lru_cache
+import argparse
+import os
+import sys
+import time
+
+from pig_latin_v01 import (DEFAULT_CACHE_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_DICTIONARY, IGNORED_TABLE,
+                           WORD_PATTERN, fast_pig_word, iter_chunks, open_text, translate_text)
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.lexicon import ALPHABET, load_words
+from common.word_frequency import load_word_frequency
+
+
+class PigLatinDecoder:
+    """Reverse index of the pig latin forms of a list of words."""
+
+    def __init__(self, words, frequency=None, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        words : iterable of str - English words, made of the letters a-z
+        frequency : WordFrequency | None - used to choose between words with the same pig latin form
+        cache_size : int - maximum number of decoded words cached
+        """
+        index = defaultdict(list)
+        self.onsets = set()     # consonant clusters moved to the end of a word by the forward rules
+        for word in words:
+            pig_word = fast_pig_word(word)
+            index[pig_word].append(word)
+            if pig_word != word + 'way':
+                rotated = pig_word[:-2]
+                self.onsets.add(next(word[:n] for n in range(1, len(word) + 1)
+                                     if rotated == word[n:] + word[:n]))
+        self.max_onset = max(map(len, self.onsets), default=0)
+
+        rank = (lambda w: 0) if frequency is None else frequency.rank
+        self.index = {}
+        for pig_word, candidates in index.items():
+            # sorted() is stable, so dictionary order breaks ties
+            self.index[pig_word] = tuple(sorted(candidates, key=rank))
+        self.decode_word = lru_cache(maxsize=cache_size)(self._decode_word)
+
+    @classmethod
+    def from_dictionary(cls, file_name=DEFAULT_DICTIONARY, use_frequency=True, cache_size=DEFAULT_CACHE_SIZE):
+        """Build the decoder of a dictionary, ranked by word frequency if the frequency list is available."""
+        frequency = None
+        if use_frequency:
+            try:
+                frequency = load_word_frequency()
+            except OSError:
+                pass
+        return cls(load_words(file_name, alphabet=ALPHABET), frequency, cache_size)
+
+    def candidates(self, pig_word):
+        """Return the dictionary words (most likely first) whose pig latin form is pig_word."""
+        return self.index.get(pig_word.lower(), ())
+
+    def decode_by_rule(self, pig_word):
+        """Guess the English word of a lower case pig latin word that is not in the index.
+
+        The 'way' ending of a vowel word is checked first, so a word whose moved onset is a single 'w'
+        is decoded as a vowel word ('ugway' -> 'ug', not 'wug'): nothing in 'ugway' tells the two apart.
+        Dictionary words with this ambiguity ('adway' for 'ad' and 'wad') are resolved by the index.
+        """
+        if pig_word.endswith('way') and len(pig_word) > 3:
+            return pig_word[:-3]
+        if pig_word.endswith('ay') and len(pig_word) > 3:
+            stem = pig_word[:-2]
+            for k in range(min(len(stem) - 1, self.max_onset), 0, -1):
+                if stem[-k:] in self.onsets:
+                    return stem[-k:] + stem[:-k]
+            return stem
+        return pig_word
+
+    def _decode_word(self, pig_word):
+        """Decode a single pig latin word (of the letters A-Z, a-z)."""
+        lower = pig_word.lower()
+        candidates = self.index.get(lower)
+        word = candidates[0] if candidates else self.decode_by_rule(lower)
+        return word.capitalize() if pig_word[0].isupper() else word
+
+    def decode_text(self, text):
+        """Translate pig latin text back to English."""
+        decode = self.decode_word
+        return WORD_PATTERN.sub(lambda match: decode(match[0]), text.translate(IGNORED_TABLE))
+
+    def decode_stream(self, source, output, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Decode a pig latin text stream chunk by chunk, writing the English text to output.
+
+        Returns
+        -------
+        stats : dict
+            characters read, seconds, and the hits, misses and hit rate of the word cache
+        """
+        time_start = time.perf_counter()
+        before = self.decode_word.cache_info()
+        characters = 0
+        for chunk in iter_chunks(source, chunk_size):
+            characters += len(chunk)
+            output.write(self.decode_text(chunk))
+        output.flush()
+
+        after = self.decode_word.cache_info()
+        hits, misses = after.hits - before.hits, after.misses - before.misses
+        return {'characters': characters, 'seconds': time.perf_counter() - time_start,
+                'hits': hits, 'misses': misses, 'hit_rate': hits / max(hits + misses, 1)}
+
+
+def compare_throughput(decoder, words, repeat=3):
+    """Report the round trip accuracy of decoding the pig latin of words, and the speed of
+    decode_text against the forward translate_text on the same text."""
+    decoded = [decoder.decode_word(fast_pig_word(w)) for w in words]
+    correct = sum(w == d for w, d in zip(words, decoded))
+    ambiguous = sum(len(c) > 1 for c in decoder.index.values())
+    print(f'{correct / len(words):.2%} of {len(words)} dictionary words round trip, '
+          f'{ambiguous} pig latin forms have more than one word.')
+
+    english = ' '.join(words)
+    pig_latin = translate_text(english)
+    timings = {}
+    for name, function, text in (('forward', translate_text, english), ('decode', decoder.decode_text, pig_latin)):
+        timings[name] = float('inf')
+        for _ in range(repeat):
+            time_start = time.perf_counter()
+            function(text)
+            timings[name] = min(timings[name], time.perf_counter() - time_start)
+        print(f'{name:>8}: {len(text) / timings[name] / 1e6:.1f} M characters/sec')
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pig latin to English translator')
+    parser.add_argument('text', nargs='?', help="quoted string of pig latin to translate")
+    parser.add_argument('-f', '--file', help="decode this file (- for stdin) instead of text")
+    parser.add_argument('-o', '--output', default='-', help="file the translation of --file is written to")
+    parser.add_argument('-d', '--dictionary', default=DEFAULT_DICTIONARY, help="words that can be decoded")
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE, help="characters read at a time")
+    args = parser.parse_args()
+
+    time_start = time.perf_counter()
+    decoder = PigLatinDecoder.from_dictionary(args.dictionary)
+    print(f'Reverse index of {len(decoder.index)} pig latin forms built in '
+          f'{time.perf_counter() - time_start:.2f} seconds.', file=sys.stderr)
+
+    if args.file is not None:
+        with open_text(args.file, 'r') as source, open_text(args.output, 'w') as output:
+            stats = decoder.decode_stream(source, output, args.chunk_size)
+        print(f"{stats['characters']:,} characters decoded in {stats['seconds']:.2f} seconds, "
+              f"word cache hit rate {stats['hit_rate']:.1%}", file=sys.stderr)
+    elif args.text is not None:
+        print(decoder.decode_text(args.text))
+    else:
+        pig_latin = 'Eakingspay Igpay Atinlay oesday otnay akemay oneway orcinepay!'
+        print(f'Decoding: {pig_latin}\nDecoded text: {decoder.decode_text(pig_latin)}')
+        compare_throughput(decoder, load_words(args.dictionary, alphabet=ALPHABET))
@@ -21,15 +21,41 @@ Subtleties not implemented:
     For example, "one" should be treated as "won" if using your ear and would be
     best translated as onway rather than oneway.
 2. Compound words should be broken up piecemeal and translated separately to make Pig Latin less obvious.
-    However, in this implementation, compound words are considered a single word.
-    For instance: "mudslide" is translated to udslidemay.  It would be superior
-    to change it to "mud slide" first and then translate it as "udmay ideslay" to make it harder for those
-    who don't know pig latin to decode what you are saying.
+    By default, compound words are considered a single word: "mudslide" is translated to udslidemay.
+    With compounds=True (--compounds) they are split into dictionary words first (see CompoundSplitter),
+    so "moonwalk" is translated as "moon walk" to "oonmay alkway", which is harder for those
+    who don't know pig latin to decode.  Words of the dictionary are kept whole, so "carpet" is
+    not split into "car pet" (nor "together" into "tog ether"), and neither are dictionary compounds
+    like "mudslide".  The dictionary is 2of4brif unless another is given (--dictionary).
+
+Streaming Translation:
+    translate_stream() translates files (or stdin) of any size with exactly the output of pig_sentence.
+    1. The input is read in large chunks, each cut after its last complete word.
+    2. Words are found with a precompiled pattern and translated with fast_pig_word,
+        whose results are kept in a bounded LRU cache (see cache_stats() for the hit rate).
+    3. With processes > 1 the chunks are translated by a process pool and written back in order.
+
+    python pig_latin_v01.py --file big.txt --output big_pig.txt --processes 4
+    cat big.txt | python pig_latin_v01.py --file - > big_pig.txt
 
 References & Acknowledgements:
     1) Inspired by `Impractical Python Projects` chapter 1 challenge
 """
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import argparse
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.lexicon import ALPHABET, load_words
+
+DEFAULT_DICTIONARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'proj06_magic_spells',
+                                  'dictionaries', '12dicts-6.0.2', 'International', '2of4brif.txt')
 
 
 class PigLatin:
@@ -152,7 +178,7 @@ class PigLatin:
 
         # Determine first vowel.
         # If no regular vowels, assume the first y is a vowel sound.
-        if first_regular_vowel:
+        if first_regular_vowel is not None:
             first_vowel = first_regular_vowel
         else:
             first_vowel = first_y
@@ -186,17 +212,291 @@ class PigLatin:
         return pig_word
 
 
+# Streaming translation
+# ---------------------
+WORD_PATTERN = re.compile('[A-Za-z]+')
+VOWEL_PATTERN = re.compile('[aeiouAEIOU]')
+PARTIAL_WORD_PATTERN = re.compile("[A-Za-z']*\\Z")     # word that may continue in the next chunk
+IGNORED_TABLE = str.maketrans('', '', ''.join(PigLatin.ignored_chars))
+DEFAULT_CHUNK_SIZE = 1 << 20     # characters
+DEFAULT_CACHE_SIZE = 100_000     # words
+
+
+def fast_pig_word(word):
+    """Translate a single word (of the letters A-Z, a-z) to pig latin, same result as PigLatin.pig_word."""
+    match = VOWEL_PATTERN.search(word)
+    if match:
+        first_vowel = match.start()
+    else:
+        first_vowel = word.find('y')
+        if first_vowel == -1:
+            first_vowel = None
+
+    first_qu = word.find('qu')
+    if first_qu != -1 and first_qu < first_vowel:
+        pig_word = word[first_qu + 2:] + word[:first_qu + 2] + 'ay'
+    elif not first_vowel:
+        pig_word = word + 'way'
+    else:
+        pig_word = word[first_vowel:] + word[:first_vowel] + 'ay'
+
+    return pig_word.capitalize() if word[0] in PigLatin.upper_case else pig_word.lower()
+
+
+cached_pig_word = lru_cache(maxsize=DEFAULT_CACHE_SIZE)(fast_pig_word)
+
+
+# Compound words
+# --------------
+MIN_PIECE_LENGTH = 3    # shorter dictionary words ('a', 'in', 'to', ...) are not used as pieces
+END = ''                # key of a prefix index node marking the end of a word
+
+
+class CompoundSplitter:
+    """Split words that are not dictionary words into dictionary words, e.g. 'moonwalk' into ('moon', 'walk')."""
+
+    def __init__(self, words, min_length=MIN_PIECE_LENGTH, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        words : iterable of str - lower case dictionary words
+        min_length : int - length of the shortest word used as a piece
+        cache_size : int - maximum number of splits cached
+        """
+        # Prefix index (a trie of nested dicts), built once and shared by every split
+        self.prefixes = {}
+        for word in words:
+            if len(word) >= min_length:
+                node = self.prefixes
+                for letter in word:
+                    node = node.setdefault(letter, {})
+                node[END] = True
+        self.split = lru_cache(maxsize=cache_size)(self._split)
+
+    @classmethod
+    def from_dictionary(cls, file_name=DEFAULT_DICTIONARY, min_length=MIN_PIECE_LENGTH,
+                        cache_size=DEFAULT_CACHE_SIZE):
+        """Build the splitter of a dictionary."""
+        return cls(load_words(file_name, alphabet=ALPHABET, min_length=min_length), min_length, cache_size)
+
+    def _ends(self, word, start):
+        """Yield every end such that word[start:end] is a dictionary word."""
+        node = self.prefixes
+        for end in range(start, len(word)):
+            node = node.get(word[end])
+            if node is None:
+                return
+            if END in node:
+                yield end + 1
+
+    def _split(self, word):
+        """
+        Split a word (of the letters A-Z, a-z) into two or more dictionary words.
+
+        Returns
+        -------
+        pieces : tuple of str
+            the first piece is a slice of word, the others are lower case,
+            or (word,) if it is a dictionary word or can not be split
+
+        Methodology
+        ------------
+        Word break dynamic program over the suffixes of the word, from the shortest:
+        best[i] is the best split of word[i:], found from the dictionary words starting at i
+        (looked up in the prefix index) and the best splits of what follows them.
+        The fewest pieces win, then the longest pieces (largest sum of squared piece lengths).
+        A dictionary word is kept whole, even if it could be split ('carpet' is not 'car pet').
+        """
+        lower = word.lower()
+        n = len(lower)
+        best = [None] * n + [(0, 0, ())]    # (pieces, -sum of squared lengths, piece ends)
+        for start in range(n - 1, -1, -1):
+            for end in self._ends(lower, start):
+                if start == 0 and end == n:
+                    return (word,)
+                rest = best[end]
+                if rest is None:
+                    continue
+                candidate = (rest[0] + 1, rest[1] - (end - start) ** 2, (end, *rest[2]))
+                if best[start] is None or candidate[:2] < best[start][:2]:
+                    best[start] = candidate
+        if not n or best[0] is None:
+            return (word,)
+        # Only the first piece keeps the word's capitalization ('BASEBALL' is 'BASE ball')
+        ends = best[0][2]
+        return (word[:ends[0]], *(lower[a:b] for a, b in zip(ends, ends[1:])))
+
+    def pig_word(self, word):
+        """Translate a word to pig latin piece by piece, e.g. 'moonwalk' to 'oonmay alkway'."""
+        return ' '.join(fast_pig_word(piece) for piece in self.split(word))
+
+
+@lru_cache(maxsize=None)
+def load_compound_splitter(file_name=DEFAULT_DICTIONARY):
+    """Return the CompoundSplitter of a dictionary, built once per process."""
+    return CompoundSplitter.from_dictionary(file_name)
+
+
+def compound_pig_word(word, dictionary=DEFAULT_DICTIONARY):
+    """Translate a single word to pig latin after splitting it into the words of dictionary (see CompoundSplitter)."""
+    return load_compound_splitter(dictionary).pig_word(word)
+
+
+cached_compound_pig_word = lru_cache(maxsize=DEFAULT_CACHE_SIZE)(compound_pig_word)
+
+
+def set_cache_size(cache_size):
+    """Replace the word translation caches with empty ones holding at most cache_size words."""
+    global cached_pig_word, cached_compound_pig_word
+    cached_pig_word = lru_cache(maxsize=cache_size)(fast_pig_word)
+    cached_compound_pig_word = lru_cache(maxsize=cache_size)(compound_pig_word)
+
+
+def _word_translator(compounds):
+    """Return this process's cached word translation function."""
+    return cached_compound_pig_word if compounds else cached_pig_word
+
+
+def cache_stats(compounds=False):
+    """Return the hits, misses, size and hit rate of this process's word translation cache."""
+    info = _word_translator(compounds).cache_info()
+    lookups = info.hits + info.misses
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize,
+            'hit_rate': info.hits / lookups if lookups else 0.0}
+
+
+def translate_text(text, compounds=False, dictionary=DEFAULT_DICTIONARY):
+    """Translate text to pig latin, same result as PigLatin.pig_sentence unless compound words are split
+    (into the words of dictionary)."""
+    translate = _word_translator(compounds)
+    if compounds:
+        return WORD_PATTERN.sub(lambda match: translate(match[0], dictionary), text.translate(IGNORED_TABLE))
+    return WORD_PATTERN.sub(lambda match: translate(match[0]), text.translate(IGNORED_TABLE))
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the text of a stream in chunks of about chunk_size characters that never split a word."""
+    partial = ''
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        chunk = partial + chunk
+        cut = PARTIAL_WORD_PATTERN.search(chunk).start()
+        partial = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+    if partial:
+        yield partial
+
+
+def _translate_chunk(text, compounds=False, dictionary=DEFAULT_DICTIONARY):
+    """Translate a chunk in a worker, returning the translation and the cache hits and misses it caused."""
+    before = _word_translator(compounds).cache_info()
+    translated = translate_text(text, compounds, dictionary)
+    after = _word_translator(compounds).cache_info()
+    return translated, after.hits - before.hits, after.misses - before.misses
+
+
+def translate_stream(source, output, chunk_size=DEFAULT_CHUNK_SIZE, processes=1, cache_size=DEFAULT_CACHE_SIZE,
+                     compounds=False, dictionary=DEFAULT_DICTIONARY):
+    """
+    Translate a text stream to pig latin chunk by chunk, writing the translation to output.
+
+    Parameters
+    ----------
+    source : text stream
+        text to translate, e.g. an open file or sys.stdin
+    output : text stream
+        stream the translation is written to
+    chunk_size : int
+        number of characters read at a time
+    processes : int
+        number of worker processes, 1 translates in this process
+    cache_size : int
+        maximum number of word translations cached (per process)
+    compounds : bool
+        split compound words into dictionary words before translating them (see CompoundSplitter),
+        the dictionary is indexed once per process
+    dictionary : str
+        word list compound words are split into
+
+    Returns
+    -------
+    stats : dict
+        characters read, seconds, and the hits, misses and hit rate of the word cache
+    """
+    time_start = time.perf_counter()
+    characters = hits = misses = 0
+    if processes <= 1:
+        set_cache_size(cache_size)
+        for chunk in iter_chunks(source, chunk_size):
+            characters += len(chunk)
+            translated, chunk_hits, chunk_misses = _translate_chunk(chunk, compounds, dictionary)
+            output.write(translated)
+            hits += chunk_hits
+            misses += chunk_misses
+    else:
+        # Keep a bounded number of chunks in flight so memory stays flat for any input size
+        with ProcessPoolExecutor(processes, initializer=set_cache_size, initargs=(cache_size,)) as executor:
+            pending = deque()
+            for chunk in iter_chunks(source, chunk_size):
+                characters += len(chunk)
+                pending.append(executor.submit(_translate_chunk, chunk, compounds, dictionary))
+                while len(pending) > 2 * processes or (pending and pending[0].done()):
+                    translated, chunk_hits, chunk_misses = pending.popleft().result()
+                    output.write(translated)
+                    hits += chunk_hits
+                    misses += chunk_misses
+            while pending:
+                translated, chunk_hits, chunk_misses = pending.popleft().result()
+                output.write(translated)
+                hits += chunk_hits
+                misses += chunk_misses
+    output.flush()
+
+    lookups = hits + misses
+    return {'characters': characters, 'seconds': time.perf_counter() - time_start,
+            'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else 0.0}
+
+
+def open_text(file_name, mode):
+    """Open a file ('-' for stdin / stdout) as text that round trips any bytes and line endings."""
+    if file_name == '-':
+        stream = sys.stdin.buffer if mode == 'r' else sys.stdout.buffer
+        return io.TextIOWrapper(stream, encoding='utf-8', errors='surrogateescape', newline='')
+    return open(file_name, mode, encoding='utf-8', errors='surrogateescape', newline='')
+
+
 if __name__ == '__main__':
 
-    try:
-        # determine command line parameters
-        parser = argparse.ArgumentParser(description='Pig latin translator')
-        parser.add_argument('text', help="quoted string of text you wish to translate")
-        args = parser.parse_args()
-        text_to_translate = args.text
-    except:
-        print('Argument not passed via command line')
-        print('Using default sentence for example translation')
-        text_to_translate = "Speaking Pig Latin does not make one porcine!"
-
-    translation = PigLatin(text_to_translate)
+    # determine command line parameters
+    parser = argparse.ArgumentParser(description='Pig latin translator')
+    parser.add_argument('text', nargs='?', help="quoted string of text you wish to translate")
+    parser.add_argument('-f', '--file', help="translate this file (- for stdin) instead of text")
+    parser.add_argument('-o', '--output', default='-', help="file the translation of --file is written to")
+    parser.add_argument('-p', '--processes', type=int, default=1, help="worker processes for --file")
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE, help="characters read at a time")
+    parser.add_argument('--cache_size', type=int, default=DEFAULT_CACHE_SIZE, help="word translations cached")
+    parser.add_argument('--compounds', action='store_true',
+                        help="split compound words into dictionary words ('moonwalk' -> 'oonmay alkway')")
+    parser.add_argument('-d', '--dictionary', default=DEFAULT_DICTIONARY,
+                        help="word list compound words are split into")
+    args = parser.parse_args()
+
+    if args.file is not None:
+        with open_text(args.file, 'r') as source, open_text(args.output, 'w') as output:
+            stats = translate_stream(source, output, args.chunk_size, args.processes, args.cache_size,
+                                     args.compounds, args.dictionary)
+        print(f"{stats['characters']:,} characters translated in {stats['seconds']:.2f} seconds "
+              f"({stats['characters'] / max(stats['seconds'], 1e-9) / 1e6:.1f} M characters/sec), "
+              f"word cache hit rate {stats['hit_rate']:.1%}", file=sys.stderr)
+    else:
+        if args.text is None:
+            print('Argument not passed via command line')
+            print('Using default sentence for example translation')
+            text_to_translate = "Speaking Pig Latin does not make one porcine!"
+        else:
+            text_to_translate = args.text
+
+        translation = PigLatin(text_to_translate)
+        if args.compounds:
+            print(f'Translated text (compound words split): {translate_text(text_to_translate, True, args.dictionary)}')
@@ -4,40 +4,168 @@ Letter usage histogram to plot a poor man's bar chart of letter frequency in a s
 Created by: Tony Held
 Created on: 2021-03-06
 
+Implementation Details:
+1. Only the letter counts are stored (a LetterMultiset, see common/letter_multiset.py), so memory
+    does not grow with the text.  Its lanes widen as needed, so counts of any size are held.
+2. Counting is done on the raw bytes: one bytes.translate folds A-Z to a-z, then one bytes.count
+    per letter, so the per-character work happens in C instead of a Python loop.
+    Text is counted from its utf-8 encoding, where no byte of a non-ASCII character is a letter.
+3. Files and streams are read in fixed size chunks into a reused buffer (count_stream), so files
+    of any size are counted in flat memory.  With processes > 1, count_file gives each worker
+    process a byte range of the file and adds up the partial LetterMultisets they return.
+4. The original list-of-letters view (freq_dict, built by initialize_dict and populate_dict) is
+    rendered from the counts only when it is used.
+
+Usage
+-----
+    python histogram_v01.py
+    python histogram_v01.py --file big.txt --processes 4
+
 References & Acknowledgements:
     1) Inspired by `Impractical Python Projects` chapter 1 challenge
 """
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+import argparse
+import functools
+import operator
+import os
 import pprint
+import string
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.letter_multiset import LetterMultiset
+
 pp = pprint.PrettyPrinter(indent=4, width=200)  # usage pp(stuff)
 
+ALPHABET = string.ascii_lowercase
+LETTER_BYTES = [ord(c) for c in ALPHABET]
+LOWER_TABLE = bytes.maketrans(string.ascii_uppercase.encode(), ALPHABET.encode())
+DEFAULT_CHUNK_SIZE = 1 << 22     # bytes
+
+
+def count_bytes(data):
+    """Return the LetterMultiset of a bytes-like buffer (ASCII or utf-8), A-Z are folded to a-z."""
+    lowered = data.translate(LOWER_TABLE)
+    return LetterMultiset.from_counts(lowered.count(b) for b in LETTER_BYTES)
+
+
+def count_text(text):
+    """Return the LetterMultiset of a str, counted from its utf-8 encoding."""
+    return count_bytes(text.encode('utf-8', 'surrogateescape'))
+
+
+def count_stream(stream, chunk_size=DEFAULT_CHUNK_SIZE, limit=None):
+    """
+    Count the letters of a binary stream, reading chunk_size bytes at a time into a reused buffer.
+
+    Parameters
+    ----------
+    stream : binary stream
+        e.g. open(file_name, 'rb') or sys.stdin.buffer
+    chunk_size : int
+        bytes read at a time
+    limit : int | None
+        stop after this many bytes, None reads to the end of the stream
+
+    Returns
+    -------
+    LetterMultiset
+    """
+    letters = LetterMultiset()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    remaining = float('inf') if limit is None else limit
+    while remaining > 0:
+        size = stream.readinto(view[:min(chunk_size, remaining)])
+        if not size:
+            break
+        letters += count_bytes(buffer if size == chunk_size else view[:size].tobytes())
+        remaining -= size
+    view.release()
+    return letters
+
+
+def _count_range(file_name, start, stop, chunk_size):
+    """Count the letters of bytes start to stop of a file (run in a worker process)."""
+    with open(file_name, 'rb') as fn:
+        fn.seek(start)
+        return count_stream(fn, chunk_size, stop - start)
+
+
+def count_file(file_name, chunk_size=DEFAULT_CHUNK_SIZE, processes=1):
+    """Count the letters of a file in chunks, split into one byte range per worker process if processes > 1."""
+    if processes <= 1:
+        with open(file_name, 'rb') as fn:
+            return count_stream(fn, chunk_size)
+
+    size = os.path.getsize(file_name)
+    bounds = [size * i // processes for i in range(processes + 1)]
+    with ProcessPoolExecutor(processes) as executor:
+        partials = executor.map(_count_range, [file_name] * processes, bounds[:-1], bounds[1:],
+                                [chunk_size] * processes)
+        return functools.reduce(operator.add, partials, LetterMultiset())
+
 
 class LetterHistogram:
-    def __init__(self, sentence):
+    def __init__(self, sentence='', letters=None):
+        """
+        sentence : str - text to count
+        letters : LetterMultiset | None - counts of a text that was already counted (e.g. by count_file)
+        """
         self.sentence = sentence.lower()
+        self.letters = count_text(self.sentence) if letters is None else letters
+
+    @classmethod
+    def from_file(cls, file_name, chunk_size=DEFAULT_CHUNK_SIZE, processes=1):
+        """Histogram of a file of any size, see count_file."""
+        return cls(letters=count_file(file_name, chunk_size, processes))
+
+    @cached_property
+    def freq_dict(self):
+        """{letter: list with one entry per occurrence of the letter}, rendered on first use"""
         self.initialize_dict()
         self.populate_dict()
+        return self.__dict__['freq_dict']
 
     def initialize_dict(self):
         """initialize dictionary with english letters"""
-        num_letters = 26
-        first_letter = ord("a")
-        letters = {chr(i): [] for i in range(first_letter, first_letter + num_letters)}
-        self.freq_dict = letters
+        self.freq_dict = {c: [] for c in ALPHABET}
 
     def populate_dict(self):
-        """populate the ordered dict"""
-        for c in self.sentence:
-            # only add letters to frequency distribution
-            if c in self.freq_dict:
-                self.freq_dict[c].append(c)
+        """populate the ordered dict from the letter counts"""
+        for c, count in self.letters.items():
+            self.freq_dict[c].extend(c * count)
 
     def print_dict(self):
         print(f'\nOriginal sentence: \n{self.sentence}')
         pp.pprint(self.freq_dict)
 
+    def print_bars(self, width=60):
+        """Print a bar chart of the letter counts scaled to width characters, for texts of any length."""
+        largest = max(self.letters.counts) or 1
+        for c, count in zip(ALPHABET, self.letters.counts):
+            print(f'{c} {count:>12,} {"#" * round(count * width / largest)}')
+
 
 if __name__ == '__main__':
-    sentence1 = "Like the castle in its corner in a medieval game, " \
-                "I foresee terrible trouble and I stay here just the same"
-    lh_1 = LetterHistogram(sentence1)
-    lh_1.print_dict()
+    parser = argparse.ArgumentParser(description='Letter usage histogram')
+    parser.add_argument('-f', '--file', help="count the letters of this file instead of the example sentence")
+    parser.add_argument('-p', '--processes', type=int, default=1, help="worker processes for --file")
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE, help="bytes read at a time")
+    args = parser.parse_args()
+
+    if args.file is not None:
+        time_start = time.perf_counter()
+        histogram = LetterHistogram.from_file(args.file, args.chunk_size, args.processes)
+        seconds = time.perf_counter() - time_start
+        print(f'{os.path.getsize(args.file):,} bytes counted in {seconds:.2f} seconds '
+              f'({os.path.getsize(args.file) / max(seconds, 1e-9) / 1e6:.1f} MB/sec)', file=sys.stderr)
+        histogram.print_bars()
+    else:
+        sentence1 = "Like the castle in its corner in a medieval game, " \
+                    "I foresee terrible trouble and I stay here just the same"
+        lh_1 = LetterHistogram(sentence1)
+        lh_1.print_dict()
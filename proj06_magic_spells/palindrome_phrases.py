@@ -0,0 +1,227 @@
+"""
+Generate multi-word palindromic phrases ("a man a plan a canal panama") from a dictionary.
+
+Created by: Tony Held
+Created on: 2021-03-24
+
+References & Acknowledgements:
+1) Inspired by `Impractical Python Projects` chapter 2 (palingrams)
+
+Methodology
+-----------
+A phrase is grown from both ends at once: words are added to the left part (reading forwards)
+or to the right part (reading backwards from the end of the phrase).  The letters of one side
+that the other side has not matched yet are the overhang.
+1. While the left side is ahead, the next word goes on the right; its reversed letters must
+    match the start of the overhang, or the overhang must match the start of its reversed letters.
+2. While the right side is ahead, the next word goes on the left, with the same rule.
+3. Whenever the overhang is itself a palindrome, the phrase is a palindrome.
+The side each word goes on is fixed by the overhang (a balanced phrase always grows on the left),
+so every phrase has exactly one way of being built and is yielded once, without remembering the
+phrases already yielded: memory does not grow with the number of phrases generated.
+
+Candidate words come from sorted lists (and sets) of the words and of the reversed words, so the
+words that start with an overhang are a bisect range and the words that are a prefix of it are
+set lookups.  The last word of a phrase is looked up in an index of {start: words that are start
+followed by a palindrome}, so finishing a phrase never scans a range.
+
+An overhang state (side, letters) that was fully explored without reaching a palindrome is
+remembered as a dead end, together with the number of words it was given, so it is never
+explored again with the same or fewer words.
+
+Usage
+-----
+    python palindrome_phrases.py -k 3 -t 10
+"""
+from bisect import bisect_left
+import argparse
+import time
+
+from palindrome_v01 import DEFAULT_DICTIONARY, load_dictionary
+
+
+class PalindromePhrases:
+    """Index of a word list for generating palindromic phrases."""
+
+    def __init__(self, words):
+        """words : list[str] - dictionary words, words that are not purely alphabetic are skipped"""
+        self.words = sorted({w for w in words if w.isalpha()})
+        self.word_set = set(self.words)
+        self.reversed_words = sorted(w[::-1] for w in self.words)
+        self.reversed_set = set(self.reversed_words)
+        self.max_length = max(map(len, self.words), default=0)
+        self.extensions = self._palindromic_extensions(self.words)
+        self.reversed_extensions = self._palindromic_extensions(self.reversed_words)
+        self.dead = {}
+        self.deadline = None
+        self.expired = False
+
+    @staticmethod
+    def _palindromic_extensions(sorted_words):
+        """Return {start: [word, ...]} for every split of every word into a start
+        and a non-empty palindromic end, used to finish a phrase with a single word."""
+        extensions = {}
+        for word in sorted_words:
+            for i in range(len(word)):
+                end = word[i:]
+                if end == end[::-1]:
+                    extensions.setdefault(word[:i], []).append(word)
+        return extensions
+
+    @staticmethod
+    def _starting_with(sorted_words, prefix):
+        """Yield the words in sorted_words that start with prefix (and are longer than it)."""
+        i = bisect_left(sorted_words, prefix)
+        if i < len(sorted_words) and sorted_words[i] == prefix:
+            i += 1
+        for word in sorted_words[i:]:
+            if not word.startswith(prefix):
+                break
+            yield word
+
+    def _candidates(self, left_ahead, overhang):
+        """Yield (word, goes_left, left_ahead, overhang) for every word that can be added next.
+
+        left_ahead : bool
+            True if overhang is unmatched letters of the left side (the next word goes on the right),
+            False if it is the unmatched letters of the right side, reversed (the next word goes on the left).
+        """
+        if left_ahead:
+            word_set, sorted_words = self.reversed_set, self.reversed_words
+        else:
+            word_set, sorted_words = self.word_set, self.words
+
+        # words (reversed for the right side) that are the start of the overhang
+        for k in range(1, min(len(overhang), self.max_length) + 1):
+            piece = overhang[:k]
+            if piece in word_set:
+                word = piece[::-1] if left_ahead else piece
+                yield word, not left_ahead, left_ahead, overhang[k:]
+
+        # words (reversed for the right side) that start with the overhang, the rest flips sides
+        if overhang:
+            for piece in self._starting_with(sorted_words, overhang):
+                word = piece[::-1] if left_ahead else piece
+                yield word, not left_ahead, not left_ahead, piece[len(overhang):]
+
+    def _last_words(self, left_ahead, overhang):
+        """Yield (word, goes_left) for every single word that completes a palindrome."""
+        if left_ahead:
+            word_set, extensions = self.reversed_set, self.reversed_extensions
+        else:
+            word_set, extensions = self.word_set, self.extensions
+
+        # words that are the start of the overhang, leaving a palindrome
+        for k in range(1, min(len(overhang), self.max_length) + 1):
+            piece = overhang[:k]
+            if piece in word_set:
+                rest = overhang[k:]
+                if rest == rest[::-1]:
+                    yield (piece[::-1] if left_ahead else piece), not left_ahead
+
+        # words that are the overhang followed by a palindrome
+        for piece in extensions.get(overhang, ()):
+            yield (piece[::-1] if left_ahead else piece), not left_ahead
+
+    def _search(self, left, right, left_ahead, overhang, words_left, min_words):
+        """Yield the palindromic phrases that extend left + right and return True if any
+        palindrome (of any length) was reached below this state."""
+        found = overhang == overhang[::-1]
+        if found and len(left) + len(right) >= min_words:
+            yield tuple(left) + tuple(reversed(right))
+        if words_left == 0:
+            return found
+
+        if not overhang:
+            # Balanced: extend with a new word on the left
+            left_ahead = False
+        key = (left_ahead, overhang)
+        if self.dead.get(key, -1) >= words_left:
+            return False
+
+        if words_left == 1:
+            # Only a palindrome completing word can be added, look those up directly
+            for word, goes_left in self._last_words(left_ahead, overhang):
+                found = True
+                phrase = (tuple(left) + (word,) + tuple(reversed(right)) if goes_left
+                          else tuple(left) + tuple(reversed(right + [word])))
+                if len(phrase) >= min_words:
+                    yield phrase
+            if not found:
+                self.dead[key] = words_left
+            return found
+
+        if not overhang:
+            candidates = ((w, True, True, w) for w in self.words)
+        else:
+            candidates = self._candidates(left_ahead, overhang)
+
+        for word, goes_left, next_left_ahead, next_overhang in candidates:
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                self.expired = True
+            if self.expired:
+                return found
+            if goes_left:
+                left.append(word)
+            else:
+                right.append(word)
+            found |= yield from self._search(left, right, next_left_ahead, next_overhang,
+                                             words_left - 1, min_words)
+            if goes_left:
+                left.pop()
+            else:
+                right.pop()
+
+        if not found and not self.expired:
+            self.dead[key] = words_left
+        return found
+
+    def phrases(self, max_words=3, min_words=2, time_budget=None):
+        """
+        Lazily generate palindromic phrases.
+
+        Parameters
+        ----------
+        max_words : int
+            maximum number of words in a phrase (k)
+        min_words : int
+            minimum number of words in a phrase
+        time_budget : float | None
+            stop generating after this many seconds, None for no limit
+
+        Returns
+        -------
+        generator of tuple[str]
+            each phrase is a tuple of words whose letters read the same forwards and backwards,
+            every phrase is yielded once
+        """
+        self.deadline = None if time_budget is None else time.perf_counter() + time_budget
+        self.expired = False
+        yield from self._search([], [], False, '', max_words, min_words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Palindromic phrase generator.')
+    parser.add_argument('-d', '--dictionary', default=DEFAULT_DICTIONARY)
+    parser.add_argument('-k', '--max_words', type=int, default=3, help="maximum words per phrase")
+    parser.add_argument('-t', '--time_budget', type=float, default=10.0, help="seconds to search")
+    parser.add_argument('-n', '--show', type=int, default=20, help="number of phrases to print")
+    args = parser.parse_args()
+
+    generator = PalindromePhrases(load_dictionary(args.dictionary))
+
+    time_start = time.perf_counter()
+    count = 0
+    for phrase in generator.phrases(args.max_words, time_budget=args.time_budget):
+        if count < args.show:
+            print(' '.join(phrase))
+        count += 1
+    time_diff = time.perf_counter() - time_start
+
+    status = 'time budget reached' if generator.expired else 'search complete'
+    print(f'\n{count} phrases of up to {args.max_words} words in {time_diff:.2f} seconds ({status}), '
+          f'{len(generator.dead)} dead-end states memoized.')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,16 +6,40 @@ Created on: 2021-03-15
 
 References & Acknowledgements:
 1) Inspired by `Impractical Python Projects` chapter 2
+
+Notes
+-----
+1) find_palingrams run modes:
+    'sets'  - slice every word at every split point and look up the pieces in a set.
+    'lists' - same as 'sets' but looks up the pieces in a list (very slow).
+    'index' - only try the splits of each word that can leave a palindromic start or end,
+              and look the other piece up in an index of reversed words (see find_palingrams_index).
+    compare_run_modes() checks that 'index' matches 'sets' and reports its speedup.
+2) find_palingrams(words, run_mode, top_n=N) only searches the N most common words and
+    ranked=True orders the palingrams from most to least common (see common/word_frequency.py).
+    compare_top_n() reports the speedup of common cutoffs.
+3) The load, index, search, sort and output stages are instrumented (see common/instrumentation.py),
+    run with --instrument (or --instrument memory) to print their timings at exit.
 """
+import argparse
+import os
+import sys
 import time
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.instrumentation import add_arguments, enable_from_args, instrument, stage
+from common.lexicon import find_dictionaries, load_words
+from common.word_frequency import load_word_frequency
+
+DICTIONARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dictionaries')
+DEFAULT_DICTIONARY = os.path.join(DICTIONARY_DIR, '12dicts-6.0.2', 'International', '2of4brif.txt')
+RUN_MODES = ('sets', 'lists', 'index')
 
-def load_dictionary():
-    file_name = 'dictionaries/12dicts-6.0.2/International/2of4brif.txt'
 
-    with open(file_name) as fn:
-        words_raw = fn.readlines()
-    words = [i.strip().lower() for i in words_raw]
+@instrument('palindromes.load')
+def load_dictionary(file_name=DEFAULT_DICTIONARY):
+    """Return the unique, lower case words of a dictionary in any 12dicts format (see common/lexicon.py)."""
+    words = load_words(file_name)
 
     print(f'Dictionary with {len(words)} entries loaded.')
     print(f'The first and last 5 entries are:')
@@ -25,59 +49,203 @@ def load_dictionary():
 
 
 def find_palindromes(words):
-    # reverse letters in all words
-    r_words = [i[::-1] for i in words];
+    with stage('palindromes.search.palindromes'):
+        # reverse letters in all words
+        r_words = [i[::-1] for i in words];
 
-    # find palindromes in dictionary
-    palindromes = [i for i, j in zip(words, r_words) if i == j]
-    print(f'{len(palindromes)} palindromes detected. The are: \n{palindromes}')
+        # find palindromes in dictionary
+        palindromes = [i for i, j in zip(words, r_words) if i == j]
 
+    with stage('palindromes.output.palindromes'):
+        print(f'{len(palindromes)} palindromes detected. The are: \n{palindromes}')
 
-def find_palingrams(words, run_mode):
-    """Find dictionary palingrams.
-        run_mode = 'sets' | 'lists'
-    """
-    print(f'Finding palingrams using {run_mode}.')
-    time_start1 = time.time()
 
-    if run_mode == 'sets':
+def find_palingrams_index(words):
+    """Return the unsorted palingram pairs of words, exactly as the 'sets' run mode finds them.
+
+    For each word and each split of it into a start and an end:
+    1. If the end is a palindrome and the start reversed is a word, (word, start reversed) is a palingram.
+    2. If the start is a palindrome and the end reversed is a word, (end reversed, word) is a palingram.
+
+    Rather than slicing every word at every split point:
+    - A palindromic end must begin with the last letter of the word (and a palindromic start must
+        finish with the first letter), so only those split points are located, with str.find.
+    - The other piece is looked up directly in an index of reversed words, which avoids reversing it.
+    - The palindrome check is only made for the rare splits where that lookup succeeds.
+    """
+    with stage('palindromes.index.reversed_words'):
         words = set(words)
+        reversed_get = {word[::-1]: word for word in words}.get
+    return palingram_pairs(words, reversed_get)
+
 
+@instrument('palindromes.search.palingrams_index')
+def palingram_pairs(words, reversed_get):
+    """Return the unsorted palingram pairs found for each of words (see find_palingrams_index).
+
+    words : iterable of the words to split
+    reversed_get : function returning the dictionary word spelled by a reversed piece, or None
+    """
     pali_list = []
+    append = pali_list.append
     for word in words:
         end = len(word)
-        rev_word = word[::-1]
         if end > 1:
-            for i in range(end):
-                if word[i:] == rev_word[:end - i] and rev_word[end - i:] in words:
-                    pali_list.append((word, rev_word[end - i:]))
-                if word[:i] == rev_word[end - i:] and rev_word[:end - i] in words:
-                    pali_list.append((rev_word[:end - i], word))
+            # 1. split points i where word[i:] may be a palindrome
+            last = word[-1]
+            i = word.find(last)
+            while i != -1:
+                other = reversed_get(word[:i])
+                if other is not None and (i == end - 1 or word[i:] == word[:i - 1 if i else None:-1]):
+                    append((word, other))
+                i = word.find(last, i + 1)
+
+            # 2. split points where word[:i] may be a palindrome (i = 0, or word[i - 1] == first letter)
+            other = reversed_get(word)
+            if other is not None:
+                append((other, word))
+            first = word[0]
+            i = word.find(first, 0, end - 1)
+            while i != -1:
+                other = reversed_get(word[i + 1:])
+                if other is not None and (i == 0 or word[i::-1] == word[:i + 1]):
+                    append((other, word))
+                i = word.find(first, i + 1, end - 1)
+
+    return pali_list
+
+
+def find_palingrams(words, run_mode, verbose=True, top_n=None, ranked=False):
+    """Find dictionary palingrams.
+        run_mode = 'sets' | 'lists' | 'index'
+        verbose = print the palingrams that are found
+        top_n = only search the words that are among the top_n most common words (None searches every word)
+        ranked = sort the palingrams by the rank of their least common word instead of alphabetically
+    """
+    print(f'Finding palingrams using {run_mode}.')
+    time_start1 = time.time()
+
+    if top_n is not None:
+        with stage('palindromes.index.most_common'):
+            words = load_word_frequency().prune(words, top_n)
+
+    if run_mode == 'sets':
+        with stage('palindromes.index.word_set'):
+            words = set(words)
+
+    if run_mode == 'index':
+        pali_list = find_palingrams_index(words)
+    else:
+        with stage(f'palindromes.search.palingrams_{run_mode}'):
+            pali_list = []
+            for word in words:
+                end = len(word)
+                rev_word = word[::-1]
+                if end > 1:
+                    for i in range(end):
+                        if word[i:] == rev_word[:end - i] and rev_word[end - i:] in words:
+                            pali_list.append((word, rev_word[end - i:]))
+                        if word[:i] == rev_word[end - i:] and rev_word[:end - i] in words:
+                            pali_list.append((rev_word[:end - i], word))
 
     # sort palingrams on first word
-    palingrams_sorted = sorted(pali_list)
+    with stage('palindromes.sort.palingrams'):
+        if ranked:
+            palingrams_sorted = load_word_frequency().ranked(pali_list, key=lambda pair: pair)
+        else:
+            palingrams_sorted = sorted(pali_list)
 
     time_end1 = time.time()
     time_diff1 = time_end1 - time_start1
     print(f'Simulation using {run_mode} complete in {time_diff1} seconds.')
 
     # display list of palingrams
-    print("\nNumber of palingrams = {}\n".format(len(palingrams_sorted)))
-    for first, second in palingrams_sorted:
-        print("{} {}".format(first, second))
+    with stage('palindromes.output.palingrams'):
+        print("\nNumber of palingrams = {}\n".format(len(palingrams_sorted)))
+        if verbose:
+            for first, second in palingrams_sorted:
+                print("{} {}".format(first, second))
 
     return palingrams_sorted
 
+
+def compare_run_modes(file_names=None, repeat=3):
+    """Check that the 'index' run mode finds the same palingrams as 'sets' and report its speedup.
+
+    file_names : list of dictionaries to compare, defaults to every dictionary in DICTIONARY_DIR
+    repeat : number of times each run mode is timed, the best time is kept
+    """
+    if file_names is None:
+        file_names = find_dictionaries(DICTIONARY_DIR)
+
+    results = []
+    for file_name in file_names:
+        words = load_dictionary(file_name)
+        timings = {}
+        palingrams = {}
+        for run_mode in ('sets', 'index'):
+            timings[run_mode] = float('inf')
+            for _ in range(repeat):
+                time_start = time.perf_counter()
+                palingrams[run_mode] = find_palingrams(words, run_mode, verbose=False)
+                timings[run_mode] = min(timings[run_mode], time.perf_counter() - time_start)
+        if palingrams['sets'] != palingrams['index']:
+            raise AssertionError(f"'sets' and 'index' palingrams differ for {file_name}")
+        results.append((file_name, len(words), len(palingrams['index']), timings))
+
+    print(f'\n{"dictionary":<55} {"words":>7} {"pairs":>6} {"sets (s)":>9} {"index (s)":>9} {"speedup":>8}')
+    for file_name, num_words, num_pairs, timings in results:
+        print(f'{os.path.relpath(file_name, DICTIONARY_DIR):<55} {num_words:>7} {num_pairs:>6} '
+              f'{timings["sets"]:>9.3f} {timings["index"]:>9.3f} {timings["sets"] / timings["index"]:>7.1f}x')
+
+    return results
+
+def compare_top_n(words, cutoffs=(2_000, 5_000, 10_000, 20_000), run_mode='sets', repeat=3):
+    """Time find_palingrams on the top_n most common words for each cutoff, against every word.
+
+    Returns
+    -------
+    timings : dict
+        key is the cutoff (None for every word), value is the best time in seconds
+    """
+    load_word_frequency()   # built once, not part of the timings
+    timings = {}
+    found = {}
+    for top_n in (None, *cutoffs):
+        timings[top_n] = float('inf')
+        for _ in range(repeat):
+            time_start = time.perf_counter()
+            found[top_n] = find_palingrams(words, run_mode, verbose=False, top_n=top_n)
+            timings[top_n] = min(timings[top_n], time.perf_counter() - time_start)
+
+    print(f'\nPalingrams ({run_mode}) of the most common of {len(words)} words (best of {repeat}):')
+    print(f'{"top_n":>10} {"pairs":>6} {"seconds":>9} {"speedup":>8}')
+    for top_n, seconds in timings.items():
+        print(f'{str(top_n or "all"):>10} {len(found[top_n]):>6} {seconds:>9.3f} {timings[None] / seconds:>7.1f}x')
+    return timings
+
+
 def main():
     words = load_dictionary()
     find_palindromes(words)
 
-    # Determine if you wish to run the palingrams using lists or sets
-    run_modes = ['sets', 'lists']
+    # Determine if you wish to run the palingrams using sets, lists or the reversed-word index
+    run_modes = RUN_MODES
 
     find_palingrams(words, run_modes[0])
     # find_palingrams(words, run_modes[1])
+    find_palingrams(words, run_modes[2], verbose=False)
+
+    # The most common palingrams first
+    palingrams = find_palingrams(words, run_modes[2], verbose=False, top_n=20_000, ranked=True)
+    print(f'The 10 most common palingrams are: {palingrams[:10]}')
+    compare_top_n(words)
+
+    compare_run_modes()
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Palindrome and palingram finder.')
+    add_arguments(parser)
+    enable_from_args(parser.parse_args())
     main()
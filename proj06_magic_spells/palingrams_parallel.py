@@ -0,0 +1,167 @@
+"""
+Parallel palingram search over the combined lexicon of every bundled dictionary.
+
+Created by: Tony Held
+Created on: 2021-03-25
+
+References & Acknowledgements:
+1) Inspired by `Impractical Python Projects` chapter 2
+
+Methodology
+-----------
+1. Merge every dictionary under dictionaries/ into one sorted, deduplicated lexicon of
+    alphabetic words, once, in the parent process.
+2. Write the lexicon as packed words (common/packed_words.py), and its hash index
+    (PackedWordIndex), to read-only files that each worker memory-maps, so the word list and the
+    lookup table are built once and shared through the page cache instead of being rebuilt as a
+    dict of str in every worker.  A reversed piece of a word is looked up with the index.
+3. Split the outer loop (the word being split, see palindrome_v01.palingram_pairs) into
+    chunks of the sorted lexicon and search the chunks across a process pool.
+4. Each chunk returns its pairs sorted.  In order, the chunks are combined with a k-way merge,
+    which needs every chunk (any of them may hold the smallest pair), otherwise the pairs of each
+    chunk are yielded as soon as it finishes.
+
+Usage
+-----
+    python palingrams_parallel.py -p 4
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import heapq
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.lexicon import ALPHABET, find_dictionaries, iter_words
+from common.packed_words import PackedWordIndex, PackedWords
+from palindrome_v01 import DICTIONARY_DIR, palingram_pairs
+
+# Per-process lexicon and its hash index, set by _init_worker
+_words = PackedWords.from_words([])
+_index = PackedWordIndex.build(_words)
+
+
+def build_lexicon(file_names=None):
+    """Return the sorted, deduplicated words (of the letters a-z) of a list of dictionaries
+    (default: every dictionary under dictionaries/)."""
+    if file_names is None:
+        file_names = find_dictionaries(DICTIONARY_DIR)
+    lexicon = set()
+    for file_name in file_names:
+        lexicon.update(iter_words(file_name, alphabet=ALPHABET))
+    return sorted(lexicon)
+
+
+def write_lexicon(words):
+    """Write words and their hash index to temporary files, return (words path, index path)."""
+    paths = []
+    for suffix in ('.lexicon', '.lexicon_index'):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        paths.append(path)
+    packed = PackedWords.from_words(words)
+    packed.save(paths[0])
+    PackedWordIndex.build(packed).save(paths[1])
+    return tuple(paths)
+
+
+def _init_worker(words_path, index_path):
+    """Map the shared lexicon and its hash index."""
+    global _words, _index
+    _words = PackedWords.open(words_path)
+    _index = PackedWordIndex.open(index_path, _words)
+
+
+def _reversed_get(piece):
+    """Return the lexicon word spelled by piece reversed, None if there is none."""
+    word = piece[::-1]
+    return word if _index.index(word) >= 0 else None
+
+
+def _search_chunk(start, stop):
+    """Return the sorted palingram pairs of the words in lexicon[start:stop]."""
+    return sorted(palingram_pairs(_words[start:stop], _reversed_get))
+
+
+def find_palingrams_parallel(words, processes=None, chunks_per_process=8, ordered=True):
+    """
+    Generate the palingrams of a sorted, deduplicated word list, using a process pool.
+
+    Parameters
+    ----------
+    words : list[str]
+        sorted and deduplicated words, e.g. from build_lexicon
+    processes : int | None
+        number of worker processes, None uses os.cpu_count()
+    chunks_per_process : int
+        number of chunks the outer loop is split into per process (smaller chunks balance better)
+    ordered : bool
+        if True, yield the pairs in sorted order once every chunk is done,
+        otherwise yield the (sorted) pairs of each chunk as soon as it is done
+
+    Returns
+    -------
+    generator of tuple[str, str]
+        the same pairs find_palingrams(words, 'sets') returns, in the same order if ordered
+    """
+    processes = processes or os.cpu_count() or 1
+    num_chunks = max(1, processes * chunks_per_process)
+    bounds = [len(words) * i // num_chunks for i in range(num_chunks + 1)]
+
+    paths = write_lexicon(words)
+    try:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=paths) as executor:
+            futures = [executor.submit(_search_chunk, start, stop)
+                       for start, stop in zip(bounds, bounds[1:]) if stop > start]
+            if ordered:
+                yield from heapq.merge(*(_chunk_result(future) for future in futures))
+            else:
+                for future in as_completed(futures):
+                    yield from future.result()
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+def _chunk_result(future):
+    """Yield the pairs of a chunk once it is complete."""
+    yield from future.result()
+
+
+def scaling_report(words, max_processes=None):
+    """Time find_palingrams_parallel with 1 to max_processes workers and print the speedup."""
+    max_processes = max_processes or os.cpu_count() or 1
+    results = []
+    for processes in range(1, max_processes + 1):
+        time_start = time.perf_counter()
+        count = sum(1 for _ in find_palingrams_parallel(words, processes, ordered=False))
+        results.append((processes, time.perf_counter() - time_start, count))
+
+    print(f'\nPalingram search over {len(words)} words (os.cpu_count() = {os.cpu_count()}):')
+    print(f'{"processes":>10} {"seconds":>9} {"speedup":>8} {"pairs":>7}')
+    for processes, seconds, count in results:
+        print(f'{processes:>10} {seconds:>9.3f} {results[0][1] / seconds:>7.2f}x {count:>7}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel palingram search over all dictionaries.')
+    parser.add_argument('-p', '--processes', type=int, help="maximum number of worker processes")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every palingram")
+    args = parser.parse_args()
+
+    time_start = time.perf_counter()
+    words = build_lexicon()
+    print(f'Combined lexicon of {len(words)} words built in {time.perf_counter() - time_start:.2f} seconds.')
+
+    if args.verbose:
+        for first, second in find_palingrams_parallel(words, args.processes):
+            print(f'{first} {second}')
+
+    scaling_report(words, args.processes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+Long-lived anagram query daemon serving preloaded word lists over a Unix socket.
+
+Created by: Tony Held
+Created on: 2021-03-23
+
+Loading a WordList costs far more than answering a single query, so callers that run many
+short queries can start the daemon once and send it requests instead.
+
+Protocol
+--------
+One JSON object per line in each direction.  Requests:
+    {"op": "anagrams", "word": "bear"}
+    {"op": "contained", "word": "tacotime"}
+    {"op": "phrases", "word": "tony held", "min_length": 3, "max_words": 3, "limit": 100, "timeout": 5}
+    {"op": "stats"}
+    {"op": "dictionaries"}
+Optional request keys are "id" (echoed back) and "dictionary" (name of a loaded word list,
+defaults to the first one).  Responses are {"id": ..., "ok": true, "result": ..., "ms": ...}
+or {"id": ..., "ok": false, "error": "..."}.
+
+Queries run on executor threads, so the event loop keeps reading and answering other clients while
+a search runs.  A phrase search stops with an error after "timeout" seconds (at most PHRASE_TIMEOUT, the default),
+so a slow request can not hold up the phrase requests queued behind it.  Request lines longer
+than MAX_REQUEST_BYTES are discarded and answered with an error.
+
+Usage
+-----
+    python anagram_daemon.py serve -d dictionaries/2of4brif.txt
+    python anagram_daemon.py query anagrams bear
+    python anagram_daemon.py query phrases "tony held" --max_words 2
+    python anagram_daemon.py loadtest --clients 20 --requests 500
+"""
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from itertools import islice
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import statistics
+import sys
+import time
+
+from anagrams_v01 import WordList
+
+DEFAULT_SOCKET = '/tmp/anagram_daemon.sock'
+STATS_WINDOW = 10_000   # latencies kept per operation
+PHRASE_TIMEOUT = 10.0   # seconds, longest phrase search
+MAX_REQUEST_BYTES = 1 << 16
+MAX_RESPONSE_BYTES = 1 << 26
+
+
+def latency_summary(latencies):
+    """Return count, mean and percentiles (in ms) of a sequence of latencies in seconds."""
+    if not latencies:
+        return {'count': 0}
+    ms = sorted(i * 1000 for i in latencies)
+    quantiles = statistics.quantiles(ms, n=100, method='inclusive') if len(ms) > 1 else ms * 99
+    return {'count': len(ms), 'mean': statistics.fmean(ms), 'p50': quantiles[49],
+            'p95': quantiles[94], 'p99': quantiles[98], 'max': ms[-1]}
+
+
+async def read_line(reader):
+    """Return the next line of a stream, b'' at its end.
+
+    Raises ValueError for a line longer than the stream limit, after discarding the line so that
+    reading can carry on at the next one.
+    """
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b'\n')
+            break
+        except asyncio.IncompleteReadError:
+            break
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+    raise ValueError(f'request line longer than {MAX_REQUEST_BYTES} bytes')
+
+
+class AnagramDaemon:
+    """Serve anagram queries for a set of preloaded word lists."""
+
+    def __init__(self, file_names, phrase_timeout=PHRASE_TIMEOUT):
+        """
+        file_names : list[str] - word lists to load, each is served under its file name without extension
+        phrase_timeout : float - seconds a phrase search may take, requests can only ask for less
+        """
+        self.phrase_timeout = phrase_timeout
+        self.word_lists = {}
+        for file_name in file_names:
+            name = os.path.splitext(os.path.basename(file_name))[0]
+            with redirect_stdout(sys.stderr):
+                self.word_lists[name] = WordList(file_name, engine='trie', use_index=True)
+                # Build the lookup tables now rather than on the first query
+                self.word_lists[name].letter_trie
+                self.word_lists[name].anagram_table
+        self.default = next(iter(self.word_lists))
+        # Anagram and containment searches only read the tables built above, so they can run in any thread
+        self.search_executor = ThreadPoolExecutor()
+        # The phrase solver is single-threaded: a search keeps its state in the _solver_* module globals
+        # of anagrams_v01, so phrase requests must run one at a time, in this executor's only thread
+        self.phrase_executor = ThreadPoolExecutor(max_workers=1)
+        self.latencies = defaultdict(lambda: deque(maxlen=STATS_WINDOW))
+        self.operations = {
+            'anagrams': self.op_anagrams,
+            'contained': self.op_contained,
+            'phrases': self.op_phrases,
+            'stats': self.op_stats,
+            'dictionaries': self.op_dictionaries,
+        }
+        # Operations that search run off the event loop, the others answer from memory at once
+        self.executors = {
+            'anagrams': self.search_executor,
+            'contained': self.search_executor,
+            'phrases': self.phrase_executor,
+        }
+
+    def op_anagrams(self, words, request):
+        return words.lookup_anagrams([request['word']])[request['word']]
+
+    def op_contained(self, words, request):
+        return words.find_contained(request['word'])[1]
+
+    def op_phrases(self, words, request):
+        timeout = min(float(request.get('timeout', self.phrase_timeout)), self.phrase_timeout)
+        phrases = words.find_phrases(request['word'], request.get('min_length', 1),
+                                     request.get('max_words'), processes=1, timeout=timeout)
+        return [' '.join(phrase) for phrase in islice(phrases, request.get('limit', 100))]
+
+    def op_stats(self, words, request):
+        return {op: latency_summary(latencies) for op, latencies in self.latencies.items()}
+
+    def op_dictionaries(self, words, request):
+        return {name: len(word_list.words) for name, word_list in self.word_lists.items()}
+
+    async def handle_request(self, request):
+        """Return the response to a single decoded request."""
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': f'request must be a JSON object, not {type(request).__name__}'}
+        response = {'id': request.get('id')}
+        op = request.get('op')
+        try:
+            operation = self.operations[op]
+            words = self.word_lists[request.get('dictionary', self.default)]
+        except (KeyError, TypeError) as e:
+            # TypeError: an unhashable op or dictionary (e.g. a list)
+            response.update(ok=False, error=f'unknown operation or dictionary: {e}')
+            return response
+
+        time_start = time.perf_counter()
+        try:
+            executor = self.executors.get(op)
+            if executor is None:
+                result = operation(words, request)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(executor, operation, words, request)
+        except Exception as e:
+            response.update(ok=False, error=f'{type(e).__name__}: {e}')
+            return response
+        elapsed = time.perf_counter() - time_start
+
+        self.latencies[op].append(elapsed)
+        response.update(ok=True, result=result, ms=elapsed * 1000)
+        return response
+
+    async def handle_client(self, reader, writer):
+        """Answer requests from one client until it disconnects."""
+        try:
+            while True:
+                try:
+                    line = await read_line(reader)
+                except ValueError as e:
+                    response = {'id': None, 'ok': False, 'error': str(e)}
+                else:
+                    if not line:
+                        break
+                    try:
+                        request = json.loads(line)
+                    except ValueError as e:
+                        # json.JSONDecodeError, or UnicodeDecodeError for bytes that are not utf-8
+                        response = {'id': None, 'ok': False, 'error': f'invalid JSON: {e}'}
+                    else:
+                        response = await self.handle_request(request)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path=DEFAULT_SOCKET):
+        """Serve clients on a Unix socket until cancelled (or sent SIGTERM)."""
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(self.handle_client, socket_path, limit=MAX_REQUEST_BYTES)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        print(f'Serving {", ".join(self.word_lists)} on {socket_path}', file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+class AnagramClient:
+    """Minimal client for AnagramDaemon, one request at a time over a single connection."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    @classmethod
+    async def connect(cls, socket_path=DEFAULT_SOCKET):
+        return cls(*await asyncio.open_unix_connection(socket_path, limit=MAX_RESPONSE_BYTES))
+
+    async def request(self, op, **kwargs):
+        """Send a request and return the decoded response."""
+        self.next_id += 1
+        request = {'id': self.next_id, 'op': op, **kwargs}
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def query(socket_path, op, word, **kwargs):
+    """Send a single request and print the response."""
+    client = await AnagramClient.connect(socket_path)
+    try:
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        if word is not None:
+            kwargs['word'] = word
+        print(json.dumps(await client.request(op, **kwargs), indent=2))
+    finally:
+        await client.close()
+
+
+async def load_test(socket_path, clients, requests, words):
+    """Run clients concurrent connections that each send requests random queries, and report latency."""
+    latencies = []
+
+    async def run_client():
+        client = await AnagramClient.connect(socket_path)
+        try:
+            for _ in range(requests):
+                op = random.choice(('anagrams', 'anagrams', 'contained'))
+                time_start = time.perf_counter()
+                response = await client.request(op, word=random.choice(words))
+                latencies.append(time.perf_counter() - time_start)
+                if not response['ok']:
+                    raise RuntimeError(response['error'])
+        finally:
+            await client.close()
+
+    time_start = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(clients)))
+    time_diff = time.perf_counter() - time_start
+
+    summary = latency_summary(latencies)
+    print(f'{len(latencies)} requests from {clients} clients in {time_diff:.2f} seconds '
+          f'({len(latencies) / time_diff:,.0f} requests/sec)')
+    print('Round trip latency (ms): ' + ', '.join(f'{k}={v:.2f}' for k, v in summary.items() if k != 'count'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Anagram query daemon.')
+    parser.add_argument('-s', '--socket', default=DEFAULT_SOCKET, help="Unix socket path")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="load word lists and serve queries")
+    serve_parser.add_argument('-d', '--dictionary', action='append',
+                              help="word list to load, may be repeated")
+    serve_parser.add_argument('--phrase_timeout', type=float, default=PHRASE_TIMEOUT,
+                              help="seconds a phrase search may take")
+
+    query_parser = subparsers.add_parser('query', help="send a single query")
+    query_parser.add_argument('op', choices=('anagrams', 'contained', 'phrases', 'stats', 'dictionaries'))
+    query_parser.add_argument('word', nargs='?')
+    query_parser.add_argument('-d', '--dictionary')
+    query_parser.add_argument('--min_length', type=int)
+    query_parser.add_argument('--max_words', type=int)
+    query_parser.add_argument('--limit', type=int)
+    query_parser.add_argument('--timeout', type=float)
+
+    load_parser = subparsers.add_parser('loadtest', help="send concurrent random queries")
+    load_parser.add_argument('-c', '--clients', type=int, default=10)
+    load_parser.add_argument('-n', '--requests', type=int, default=200, help="requests per client")
+    load_parser.add_argument('-w', '--words', default='dictionaries/2of4brif.txt',
+                             help="file of words to query")
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        daemon = AnagramDaemon(args.dictionary or ['dictionaries/2of4brif.txt'], args.phrase_timeout)
+        try:
+            asyncio.run(daemon.serve(args.socket))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+    elif args.command == 'query':
+        asyncio.run(query(args.socket, args.op, args.word, dictionary=args.dictionary,
+                          min_length=args.min_length, max_words=args.max_words, limit=args.limit,
+                          timeout=args.timeout))
+    else:
+        # The dictionaries are ISO-8859-1, like every 12dicts file (see common/lexicon.py)
+        with open(args.words, encoding='latin-1') as fn:
+            words = [w.strip() for w in fn if w.strip()]
+        asyncio.run(load_test(args.socket, args.clients, args.requests, words))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,17 +10,72 @@ References & Acknowledgements:
 
 Notes
 -----
-
+1) Four engines are available for finding the words contained in a search word:
+    'counter' - compare collections.Counter objects word by word (original implementation).
+    'multiset' - compare the LetterMultiset (common/letter_multiset.py) of each word, one integer operation per word.
+    'matrix'  - compare rows of a dense N x 26 letter count matrix.
+    'trie'    - walk a trie of each word's letters in TRIE_ORDER, only visiting branches
+                that the search word has letters for.
+    Select the engine with WordList(file_name, engine=...) and compare them with compare_engines().
+2) WordList.find_phrases yields every multi-word anagram of a phrase.
+    The search runs on anagram classes (words sharing the same letters) and the remaining letters
+    are tracked as a packed count integer, which doubles as the memoization key.
+3) WordList(file_name, use_index=True) loads the word list from a compiled index saved next to
+    the dictionary, which is much faster than rebuilding it from text (see word_index.py).
+4) Large numbers of words can be resolved with WordList.lookup_anagrams / iter_anagrams / stream_anagrams,
+    or from the command line with: python anagrams_v01.py --batch words.txt
+5) find_contained(word, top_n=N) only searches the N most common words (see common/word_frequency.py),
+    and ranked=True orders the words found from most to least common.
+6) The load, index, search, sort and output stages are instrumented (see common/instrumentation.py),
+    run with --instrument (or --instrument memory) to print their timings at exit.
 """
+from array import array
+from bisect import bisect_left
 from collections import defaultdict, Counter
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from itertools import combinations_with_replacement, groupby, permutations, product
+import argparse
+import io
+import os
 import random
+import sys
+import time
+
+from word_index import open_index, write_index
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.instrumentation import add_arguments, enable_from_args, instrument, stage
+from common.letter_multiset import LetterMultiset
+from common.lexicon import load_words
+from common.word_frequency import load_word_frequency
+
+# Letters tracked by the count matrix engine
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+NUM_LETTERS = len(ALPHABET)
+LETTER_CODES = {c: i for i, c in enumerate(ALPHABET)}
+
+# Each matrix row is packed into an integer with one 8-bit lane per letter.
+# The high bit of each lane is a guard bit that catches lane underflow during subtraction.
+LANE_MAX = 0x7f
+GUARD_BITS = int.from_bytes(b'\x80' * NUM_LETTERS, 'little')
+
+# Canonical letter order of the trie engine, rarest letters first (measured on 2of4brif.txt)
+# so branches for letters missing from a search word are cut off near the root.
+TRIE_ORDER = 'jqxzwkvfybhmpgudclotnraise'
+TRIE_RANK = {c: i for i, c in enumerate(TRIE_ORDER)}
 
+ENGINES = ('counter', 'multiset', 'matrix', 'trie')
 
+# Chunks of top-level branches submitted per worker process by find_phrases
+PHRASE_CHUNKS_PER_PROCESS = 4
+
+
+@instrument('anagrams.load')
 def load_dictionary(file_name):
-    """load contents of text file into attribute self.words"""
-    with open(file_name) as fn:
-        words_raw = fn.readlines()
-    words = [i.strip().lower() for i in words_raw]
+    """Return the unique, lower case words of a dictionary in any 12dicts format (see common/lexicon.py)."""
+    words = load_words(file_name)
 
     print(f'Dictionary with {len(words)} entries loaded.')
     print(f'The first and last 5 entries are:')
@@ -28,6 +83,7 @@ def load_dictionary(file_name):
 
     return words
 
+@instrument('anagrams.index.sorted_letters')
 def listify_words(words):
     """Take a list of words and convert to a list of tuple of letters.
      The letters in the tuple are sorted alphabetically."""
@@ -39,6 +95,7 @@ def listify_words(words):
 
     return words_sorted
 
+@instrument('anagrams.index.anagram_classes')
 def index_list(words):
     """Create a dictionary of occurrences of a list, and the frequency of each word,
     to speed up future searches.
@@ -63,13 +120,15 @@ def index_list(words):
         print(f'{k}: {v}')
 
     """Find the most n most frequently occurring words"""
-    frequencies = sorted(dict_words.values(), key=lambda x: len(x), reverse=True)
+    with stage('anagrams.sort.frequencies'):
+        frequencies = sorted(dict_words.values(), key=lambda x: len(x), reverse=True)
 
     print(f'The 5 most frequent entries are:')
     print(f'{frequencies[:5]}')
 
     return dict_words, frequencies
 
+@instrument('anagrams.index.letter_counts')
 def create_letter_counts(words):
     """Return of list of letter counts for each word in words"""
     letter_counts = [Counter(i) for i in words]
@@ -129,28 +188,608 @@ def list_contains(word_list, letter_freq_list, single_word):
 
     return indices, words
 
+@instrument('anagrams.index.letter_multisets')
+def create_letter_multisets(words):
+    """Return the LetterMultiset of each word, None for words with characters outside of a-z
+    (LetterMultiset only counts a-z, these words are compared with Counter objects instead)."""
+    return [LetterMultiset(w) if w.isascii() and w.isalpha() and w.islower() else None for w in words]
+
+def multiset_contains(word_list, multisets, letter_freq_list, single_word):
+    """
+    Find the members of the WordList that are contained in single_word using LetterMultisets.
+
+    Returns the same result as list_contains.
+
+    Parameters
+    ----------
+    word_list : list[str]
+        list of words in plain text associated with multisets
+
+    multisets : list[LetterMultiset | None]
+        letter multisets created by create_letter_multisets
+
+    letter_freq_list : list[collections.Counter]
+        letter frequencies associated with word_list, used for the words without a multiset
+
+    single_word : str
+        word to search
+
+    Returns
+    -------
+    indices : list[int]
+        indices of words that are contained in single word
+
+    words : list[str]
+        words that are contained in single_word
+    """
+    # Count a-z exactly as Counter does (LetterMultiset(word) would fold upper case letters)
+    query = LetterMultiset.from_counts(single_word.count(c) for c in ALPHABET)
+    contains = query.contains
+    single_counter = None
+    indices = []
+    for i, multiset in enumerate(multisets):
+        if multiset is not None:
+            if contains(multiset):
+                indices.append(i)
+        else:
+            if single_counter is None:
+                single_counter = Counter(single_word)
+            if word1_contains_word2(single_counter, letter_freq_list[i]):
+                indices.append(i)
+
+    words = [word_list[i] for i in indices]
+
+    return indices, words
+
+@instrument('anagrams.index.count_matrix')
+def create_count_matrix(words):
+    """Create a dense N x 26 letter count matrix and a 26-bit letter presence mask for each word.
+
+    Parameters
+    ----------
+    words : list[str]
+        list of words in plain text
+
+    Returns
+    -------
+    matrix : array.array
+        flattened unsigned byte matrix, row i holds the a-z letter counts of words[i]
+    masks : array.array
+        bit j of masks[i] is set if letter j occurs in words[i]
+    irregular : list[int]
+        indices of words with characters outside of a-z (or very large letter counts)
+        which can not be represented by the matrix
+    """
+    matrix = array('B', bytes(NUM_LETTERS * len(words)))
+    masks = array('L', bytes(array('L').itemsize * len(words)))
+    irregular = []
+
+    for i, word in enumerate(words):
+        row = i * NUM_LETTERS
+        mask = 0
+        for c in word:
+            code = LETTER_CODES.get(c)
+            if code is None or matrix[row + code] == LANE_MAX:
+                irregular.append(i)
+                break
+            matrix[row + code] += 1
+            mask |= 1 << code
+        masks[i] = mask
+
+    return matrix, masks, irregular
+
+@instrument('anagrams.index.packed_rows')
+def pack_rows(matrix):
+    """Pack each row of the count matrix into an integer with one 8-bit lane per letter."""
+    mv = memoryview(matrix).cast('B')
+    return [int.from_bytes(mv[i:i + NUM_LETTERS], 'little')
+            for i in range(0, len(mv), NUM_LETTERS)]
+
+def pack_word(word):
+    """Return the (packed letter counts, presence mask) of a search word.
+
+    Counts are clamped to the lane size, which is safe because no matrix row exceeds it.
+    Characters outside of a-z are ignored.
+    """
+    counts = [0] * NUM_LETTERS
+    for c in word:
+        code = LETTER_CODES.get(c)
+        if code is not None and counts[code] < LANE_MAX:
+            counts[code] += 1
+    mask = 0
+    for code, count in enumerate(counts):
+        if count:
+            mask |= 1 << code
+    return int.from_bytes(bytes(counts), 'little'), mask
+
+def matrix_contains(word_list, packed_rows, masks, irregular, letter_freq_list, single_word):
+    """
+    Find the members of the WordList that are contained in single_word using the count matrix.
+
+    Returns the same result as list_contains.
+
+    Parameters
+    ----------
+    word_list : list[str]
+        list of words in plain text associated with packed_rows
+
+    packed_rows : list[int]
+        rows of the letter count matrix packed by pack_rows
+
+    masks : array.array
+        letter presence mask of each word
+
+    irregular : list[int]
+        indices of words that can not be represented in the matrix,
+        these are checked with word1_contains_word2 instead
+
+    letter_freq_list : list[collections.Counter] | None
+        letter frequencies associated with word_list, only needed if irregular is not empty
+
+    single_word : str
+        word to search
+
+    Returns
+    -------
+    indices : list[int]
+        indices of words that are contained in single word
+
+    words : list[str]
+        words that are contained in single_word
+
+    Methodology
+    ------------
+    1.  Prefilter: a word can only be contained if its letters are a subset of the search word's letters.
+    2.  Set the guard bit in every lane of the search word and subtract the packed row.
+        A lane underflows (clearing its guard bit) only if the row needs more of that letter
+        than the search word has, so all 26 letters are compared in a single subtraction.
+    """
+    query, query_mask = pack_word(single_word)
+    query |= GUARD_BITS
+    missing = ~query_mask
+
+    indices = [i for i, mask in enumerate(masks)
+               if not mask & missing and (query - packed_rows[i]) & GUARD_BITS == GUARD_BITS]
+
+    if irregular:
+        single_counter = Counter(single_word)
+        irregular_indices = [i for i in irregular
+                             if word1_contains_word2(single_counter, letter_freq_list[i])]
+        irregular_set = set(irregular)
+        indices = sorted([i for i in indices if i not in irregular_set] + irregular_indices)
+
+    words = [word_list[i] for i in indices]
+
+    return indices, words
+
+def trie_key(word):
+    """Return the letters of word in the canonical trie order (other characters go last)."""
+    return sorted(word, key=lambda c: (TRIE_RANK.get(c, NUM_LETTERS), c))
+
+@instrument('anagrams.index.letter_trie')
+def create_letter_trie(words):
+    """Create a trie of the letters of each word in canonical trie order.
+
+    Each node is a list [children, indices] where children maps a letter to the child node
+    and indices holds the indices of the words that end at the node.
+    """
+    root = [{}, []]
+    for i, word in enumerate(words):
+        node = root
+        for c in trie_key(word):
+            child = node[0].get(c)
+            if child is None:
+                child = node[0][c] = [{}, []]
+            node = child
+        node[1].append(i)
+    return root
+
+def trie_contains(word_list, letter_trie, single_word):
+    """
+    Find the members of the WordList that are contained in single_word using the letter trie.
+
+    Returns the same result as list_contains.  Only branches of the trie that can be spelled
+    with the letters in single_word are visited, so the cost grows with the number of
+    matches rather than the size of the dictionary.
+
+    Parameters
+    ----------
+    word_list : list[str]
+        list of words in plain text associated with letter_trie
+
+    letter_trie : list
+        trie created by create_letter_trie
+
+    single_word : str
+        word to search
+
+    Returns
+    -------
+    indices : list[int]
+        indices of words that are contained in single word
+
+    words : list[str]
+        words that are contained in single_word
+    """
+    available = Counter(single_word)
+    indices = []
+
+    def walk(node):
+        children, ends = node
+        indices.extend(ends)
+        for c, child in children.items():
+            count = available[c]
+            if count:
+                available[c] = count - 1
+                walk(child)
+                available[c] = count
+
+    walk(letter_trie)
+    indices.sort()
+    words = [word_list[i] for i in indices]
+
+    return indices, words
+
+def anagram_key(word):
+    """Return the canonical anagram key of a word: its lower case letters in sorted order.
+
+    Words are anagrams of each other if and only if they have the same key.
+    """
+    return ''.join(sorted(word.strip().lower()))
+
 def remove_letters(word, letters):
     """
     Remove single occurrence of letter from word for each occurrence of letter in letters.
+
+    Every character counts (accents, apostrophes, spaces, upper case), the first occurrences are removed,
+    and the remaining characters keep their order in word.  Raises ValueError if letters is not contained in word.
     """
-    remaining_letters_list = list(word)
-    for i in letters:
-        remaining_letters_list.pop(remaining_letters_list.index(i))
+    to_remove = Counter(letters)
+    remaining_letters_list = []
+    for c in word:
+        if to_remove[c]:
+            to_remove[c] -= 1
+        else:
+            remaining_letters_list.append(c)
+    missing = +to_remove
+    if missing:
+        raise ValueError(f'{"".join(missing.elements())!r} not contained in {word!r}')
     remaining_letters = "".join(remaining_letters_list)
     return remaining_letters, remaining_letters_list
 
 
+# Per-process state of the phrase solver, set by _init_phrase_solver
+_solver_rows = []
+_solver_lengths = []
+_solver_lookup = {}
+_solver_memo = {}
+_solver_deadline = None     # time.perf_counter() after which _solve_phrase gives up, None for no limit
+
+def _init_phrase_solver(rows, lengths):
+    """Store the candidate anagram classes for _solve_phrase (also used as a process pool initializer)."""
+    global _solver_rows, _solver_lengths, _solver_lookup, _solver_memo
+    _solver_rows = rows
+    _solver_lengths = lengths
+    _solver_lookup = {row: c for c, row in enumerate(rows)}
+    _solver_memo = {}
+
+def _set_solver_deadline(timeout):
+    """Make _solve_phrase raise TimeoutError once timeout seconds have passed, None for no limit."""
+    global _solver_deadline
+    _solver_deadline = None if timeout is None else time.perf_counter() + timeout
+
+def _solve_phrase(remaining, remaining_len, candidates, words_left):
+    """Return every combination of candidate classes, in non-decreasing class order,
+    that uses up exactly the remaining letters with at most words_left words.
+
+    Parameters
+    ----------
+    remaining : int
+        packed letter count of the remaining letters (see pack_word)
+    remaining_len : int
+        number of remaining letters
+    candidates : list[int]
+        classes to consider, must include every class contained in remaining
+    words_left : int
+        maximum number of words
+
+    Returns
+    -------
+    solutions : tuple[tuple[int]]
+        combinations sorted by their first class
+    firsts : list[int]
+        first class of each combination, for bisecting solutions
+
+    The results are memoized on (remaining, words_left).
+    Raises TimeoutError if the deadline set by _set_solver_deadline has passed.
+    """
+    words_left = min(words_left, remaining_len)
+    key = (remaining, words_left)
+    result = _solver_memo.get(key)
+    if result is not None:
+        return result
+    if _solver_deadline is not None and time.perf_counter() > _solver_deadline:
+        raise TimeoutError('phrase search exceeded its time limit')
+
+    solutions = []
+    if words_left == 1:
+        # The remaining letters must form a single word
+        c = _solver_lookup.get(remaining)
+        if c is not None:
+            solutions.append((c,))
+    elif words_left > 1:
+        query = remaining | GUARD_BITS
+        contained = [j for j in candidates if (query - _solver_rows[j]) & GUARD_BITS == GUARD_BITS]
+        # Prune if even the longest words can not use up the remaining letters
+        if contained and max(_solver_lengths[j] for j in contained) * words_left < remaining_len:
+            contained = []
+        for j in contained:
+            rest = (query - _solver_rows[j]) ^ GUARD_BITS
+            if rest == 0:
+                solutions.append((j,))
+            elif words_left == 2:
+                # Inline the single word lookup to skip a recursive call per candidate
+                c = _solver_lookup.get(rest)
+                if c is not None and c >= j:
+                    solutions.append((j, c))
+            else:
+                tails, firsts = _solve_phrase(rest, remaining_len - _solver_lengths[j],
+                                              contained, words_left - 1)
+                for tail in tails[bisect_left(firsts, j):]:
+                    solutions.append((j,) + tail)
+
+    result = tuple(solutions), [combo[0] for combo in solutions]
+    _solver_memo[key] = result
+    return result
+
+def _solve_branch(first, remaining, remaining_len, words_left):
+    """Solve a single top-level branch (phrases whose first class is first), run in a worker process."""
+    rest = ((remaining | GUARD_BITS) - _solver_rows[first]) ^ GUARD_BITS
+    if rest == 0:
+        return [(first,)]
+    if words_left <= 1:
+        return []
+    tails, firsts = _solve_phrase(rest, remaining_len - _solver_lengths[first],
+                                  list(range(len(_solver_rows))), words_left - 1)
+    return [(first,) + tail for tail in tails[bisect_left(firsts, first):]]
+
+def _solve_branches(firsts, remaining, remaining_len, words_left, timeout=None):
+    """Solve a chunk of consecutive top-level branches, in order, run in a worker process."""
+    _set_solver_deadline(timeout)
+    try:
+        return [combo for first in firsts for combo in _solve_branch(first, remaining, remaining_len, words_left)]
+    finally:
+        _set_solver_deadline(None)
+
+def expand_classes(class_members, class_combo, unique=True):
+    """Yield the word index tuples of a combination of anagram classes.
+
+    Parameters
+    ----------
+    class_members : list[list[int]]
+        word indices of each anagram class
+    class_combo : tuple[int]
+        class indices in non-decreasing order
+    unique : bool
+        if True, yield each set of words once,
+        otherwise yield every ordering of the words
+
+    Returns
+    -------
+    generator of tuple[int]
+    """
+    groups = [combinations_with_replacement(class_members[c], len(list(run)))
+              for c, run in groupby(class_combo)]
+    for parts in product(*groups):
+        phrase = tuple(i for part in parts for i in part)
+        if unique:
+            yield phrase
+        else:
+            yield from dict.fromkeys(permutations(phrase))
+
+def find_phrases(word_list, words_indexed, phrase, min_length=1, max_words=None, unique=True, processes=1,
+                 timeout=None):
+    """
+    Generate every multi-word anagram of phrase.
+
+    Parameters
+    ----------
+    word_list : list[str]
+        list of words in plain text
+
+    words_indexed : dict
+        anagram classes of word_list as returned by index_list
+
+    phrase : str
+        phrase to rearrange, characters other than letters are ignored
+
+    min_length : int
+        minimum number of letters in each word
+
+    max_words : int | None
+        maximum number of words in a phrase, None for no limit
+
+    unique : bool
+        if True, permutations of the same words are yielded once (in dictionary order),
+        otherwise every ordering is yielded
+
+    processes : int | None
+        number of worker processes that the top-level branches are split across.
+        1 (the default) solves in the current process, None uses os.cpu_count().
+        A process pool is only worth starting for long searches.
+        The phrases come out in the same order either way, and closing the generator early
+        cancels the branches that have not started yet.
+
+    timeout : float | None
+        seconds the search may take before TimeoutError is raised, None for no limit.
+        The time spent by the caller between phrases is not counted.
+
+    Returns
+    -------
+    generator of tuple[str]
+        each phrase is a tuple of words that use all the letters in phrase exactly once
+
+    Methodology
+    ------------
+    1.  Only anagram classes that are contained in phrase (and are long enough) are candidates.
+    2.  Words are chosen in non-decreasing class order so each combination is found once.
+    3.  Sub-results are memoized on the remaining letters and the number of words left.
+    4.  The branches for the first word are fanned out across a process pool in chunks of
+        consecutive classes (PHRASE_CHUNKS_PER_PROCESS per process), collected in submission order.
+    """
+    letters = ''.join(c for c in phrase.lower() if c.isalpha())
+    if not letters:
+        return
+    query, query_mask = pack_word(letters)
+    max_words = len(letters) if max_words is None else max_words
+
+    # Candidate anagram classes, stored as packed letter counts
+    class_members = []
+    rows = []
+    for members in words_indexed.values():
+        word = word_list[members[0]]
+        if len(word) < min_length:
+            continue
+        if not all(c in LETTER_CODES for c in word):
+            continue
+        row, mask = pack_word(word)
+        if mask & ~query_mask or ((query | GUARD_BITS) - row) & GUARD_BITS != GUARD_BITS:
+            continue
+        class_members.append(sorted(members))
+        rows.append(row)
+
+    # Order classes by their first word so unique phrases come out in dictionary order
+    order = sorted(range(len(rows)), key=lambda c: word_list[class_members[c][0]])
+    class_members = [class_members[c] for c in order]
+    rows = [rows[c] for c in order]
+    lengths = [len(word_list[members[0]]) for members in class_members]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes <= 1:
+        _init_phrase_solver(rows, lengths)
+        _set_solver_deadline(timeout)
+        try:
+            combos, _ = _solve_phrase(query, len(letters), list(range(len(rows))), max_words)
+        finally:
+            _init_phrase_solver([], [])
+            _set_solver_deadline(None)
+        for combo in combos:
+            for phrase_indices in expand_classes(class_members, combo, unique):
+                yield tuple(word_list[i] for i in phrase_indices)
+        return
+
+    chunk_size = max(1, -(-len(rows) // (processes * PHRASE_CHUNKS_PER_PROCESS)))
+    executor = ProcessPoolExecutor(processes, initializer=_init_phrase_solver, initargs=(rows, lengths))
+    completed = False
+    waited = 0.0
+    try:
+        futures = [executor.submit(_solve_branches, range(start, min(start + chunk_size, len(rows))),
+                                   query, len(letters), max_words, timeout)
+                   for start in range(0, len(rows), chunk_size)]
+        for future in futures:
+            time_start = time.perf_counter()
+            combos = future.result(None if timeout is None else max(0.0, timeout - waited))
+            waited += time.perf_counter() - time_start
+            for combo in combos:
+                for phrase_indices in expand_classes(class_members, combo, unique):
+                    yield tuple(word_list[i] for i in phrase_indices)
+        completed = True
+    finally:
+        # A generator closed early does not wait for (or run) the chunks that are left
+        executor.shutdown(wait=completed, cancel_futures=not completed)
+
+
 class WordList:
     """Stores a list of words that are indexed and easy to search for anagrams"""
 
-    def __init__(self, file_name):
-        """file_name : location of file with a word list"""
+    def __init__(self, file_name, engine='counter', use_index=False, words=None):
+        """
+        file_name : location of file with a word list
+        engine : 'counter' | 'multiset' | 'matrix' | 'trie' - default engine used by find_contained
+        use_index : if True, load the word list from its compiled index (see word_index.py),
+            the index is (re)built if it is missing or the word list has changed
+        words : list[str] | None - if given, the word list is made of these words instead of
+            the contents of file_name (and use_index is ignored)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f'engine must be one of {ENGINES}, not {engine!r}')
         self.file_name = file_name
-        self.words = load_dictionary(self.file_name)
+        self.engine = engine
+        self.index = None
+        self.subsets = {}
+        if use_index and words is None:
+            with stage('anagrams.load.compiled_index'):
+                self.index = open_index(self.file_name)
+
+        if self.index is not None:
+            # Remaining tables are created on first use from the index
+            self.words = self.index.words()
+            self.count_matrix = self.index.counts
+            self.letter_masks = self.index.masks
+            self.irregular = self.index.irregular.tolist()
+            print(f'Dictionary with {len(self.words)} entries loaded from {self.index.path}.')
+            return
+
+        self.words = load_dictionary(self.file_name) if words is None else list(words)
         self.words_sorted = listify_words(self.words)
         self.words_indexed, self.frequencies = index_list(self.words_sorted)
         self.letter_counts = create_letter_counts(self.words)
-
+        self.count_matrix, self.letter_masks, self.irregular = create_count_matrix(self.words)
+        self.packed_rows = pack_rows(self.count_matrix)
+
+        if use_index:
+            with stage('anagrams.index.compiled_index'):
+                path = write_index(self.file_name, self.words, self.words_indexed, self.frequencies,
+                                   self.count_matrix, self.letter_masks, self.irregular)
+            print(f'Compiled index saved to {path}.')
+
+    @cached_property
+    def words_sorted(self):
+        return [tuple(sorted(i)) for i in self.words]
+
+    @cached_property
+    def words_indexed(self):
+        return {tuple(key): self.index.members(c) for c, key in enumerate(self.index.class_keys())}
+
+    @cached_property
+    def frequencies(self):
+        return [self.index.members(c) for c in self.index.class_order]
+
+    @cached_property
+    def letter_counts(self):
+        return create_letter_counts(self.words)
+
+    @cached_property
+    def letter_multisets(self):
+        return create_letter_multisets(self.words)
+
+    @cached_property
+    def packed_rows(self):
+        return pack_rows(self.count_matrix)
+
+    @cached_property
+    def letter_trie(self):
+        return create_letter_trie(self.words)
+
+    @cached_property
+    def frequency(self):
+        """WordFrequency index used to prune and rank searches"""
+        return load_word_frequency()
+
+    def most_common(self, top_n):
+        """Return (word_list, indices): a WordList of the words of this list that are among the
+        top_n most common words, and the index in this list of each of its words.
+        The subset is built once per top_n."""
+        if top_n not in self.subsets:
+            indices = self.frequency.prune_indices(self.words, top_n)
+            with redirect_stdout(io.StringIO()):
+                subset = WordList(self.file_name, self.engine, words=[self.words[i] for i in indices])
+            self.subsets[top_n] = subset, indices
+        return self.subsets[top_n]
+
+    @instrument('anagrams.output.most_frequent')
     def print_most_frequent(self, n):
         print(f'\nThe {n} most frequently occurring anagrams in the word list are:')
 
@@ -159,23 +798,164 @@ class WordList:
             for i in words:
                 print(f'\t{self.words[i]}')
 
+    @cached_property
+    @instrument('anagrams.index.anagram_table')
+    def anagram_table(self):
+        """dict - the key is an anagram_key, the value is the tuple of words with that key"""
+        words = self.words if isinstance(self.words, list) else self.words.tolist()
+        if self.index is not None:
+            return {key: tuple(words[i] for i in self.index.members(c))
+                    for c, key in enumerate(self.index.class_keys())}
+        return {''.join(key): tuple(words[i] for i in members)
+                for key, members in self.words_indexed.items()}
+
+    @instrument('anagrams.search.anagrams')
     def find_anagrams(self, word):
         """find the anagrams for a given word"""
         print(f'\nAnagrams for the word: {word}')
-        word_sorted_tuple = tuple(sorted(word.strip().lower()))
-        matches = self.words_indexed.get(word_sorted_tuple, [])
+        matches = self.anagram_table.get(anagram_key(word), ())
         if matches:
-            for i, index in enumerate(matches):
-                print(f'\t{i+1}) {self.words[index]}')
+            for i, match in enumerate(matches):
+                print(f'\t{i+1}) {match}')
         else:
             print('\tWord not found in dictionary.')
 
-    def find_contained(self, word):
-        """Wrapper for list_contains"""
-        indices, words = list_contains(self.words, self.letter_counts, Counter(word))
+    def iter_anagrams(self, words):
+        """Yield (word, anagrams) for each word in an iterable of words.
+
+        anagrams is the tuple of dictionary words (including word itself) with the same letters,
+        it is empty if there are none.
+        """
+        table_get = self.anagram_table.get
+        for word in words:
+            yield word, table_get(anagram_key(word), ())
+
+    def lookup_anagrams(self, words):
+        """Return a dict mapping each word in an iterable of words to its tuple of anagrams."""
+        return dict(self.iter_anagrams(words))
+
+    def stream_anagrams(self, stream):
+        """Yield (word, anagrams) for each non-blank line of a text stream (e.g. a file or sys.stdin)."""
+        yield from self.iter_anagrams(word for word in map(str.strip, stream) if word)
+
+    @instrument('anagrams.search.contained')
+    def find_contained(self, word, engine=None, top_n=None, ranked=False):
+        """Wrapper for list_contains / multiset_contains / matrix_contains / trie_contains.
+
+        engine : 'counter' | 'multiset' | 'matrix' | 'trie' | None
+            engine used for the search, None uses self.engine
+        top_n : int | None
+            only search the words that are among the top_n most common words (see most_common)
+        ranked : bool
+            order the results from the most to the least common word, instead of by index
+        """
+        if top_n is not None:
+            subset, subset_indices = self.most_common(top_n)
+            indices, words = subset.find_contained(word, engine)
+            indices = [subset_indices[i] for i in indices]
+        else:
+            indices, words = self._find_contained(word, engine)
+
+        if ranked:
+            rank = self.frequency.rank
+            indices = sorted(indices, key=lambda i: (rank(self.words[i]), i))
+            words = [self.words[i] for i in indices]
         return indices, words
 
-    def input_loop(self, name=None):
+    def _find_contained(self, word, engine=None):
+        engine = self.engine if engine is None else engine
+        if engine == 'counter':
+            indices, words = list_contains(self.words, self.letter_counts, Counter(word))
+        elif engine == 'multiset':
+            indices, words = multiset_contains(self.words, self.letter_multisets, self.letter_counts, word)
+        elif engine == 'matrix':
+            letter_counts = self.letter_counts if self.irregular else None
+            indices, words = matrix_contains(self.words, self.packed_rows, self.letter_masks,
+                                             self.irregular, letter_counts, word)
+        elif engine == 'trie':
+            indices, words = trie_contains(self.words, self.letter_trie, word)
+        else:
+            raise ValueError(f'engine must be one of {ENGINES}, not {engine!r}')
+        return indices, words
+
+    def find_phrases(self, phrase, min_length=1, max_words=None, unique=True, processes=1, timeout=None):
+        """Wrapper for find_phrases, yields every multi-word anagram of phrase as a tuple of words."""
+        yield from find_phrases(self.words, self.words_indexed, phrase,
+                                min_length, max_words, unique, processes, timeout)
+
+    def compare_engines(self, search_words, repeat=3):
+        """Time find_contained for each engine and check that the engines agree.
+
+        Parameters
+        ----------
+        search_words : list[str]
+            words to search
+        repeat : int
+            number of times each search is repeated, the best time is kept
+
+        Returns
+        -------
+        timings : dict
+            key is the engine name, value is the best total time in seconds for all search_words
+        """
+        timings = {}
+        results = {}
+        for engine in ENGINES:
+            best = float('inf')
+            for _ in range(repeat):
+                time_start = time.perf_counter()
+                results[engine] = [self.find_contained(w, engine) for w in search_words]
+                best = min(best, time.perf_counter() - time_start)
+            timings[engine] = best
+
+        for engine in ENGINES:
+            if results[engine] != results['counter']:
+                raise AssertionError(f'counter and {engine} engines returned different results')
+
+        print(f'\nfind_contained timing for {len(search_words)} search words (best of {repeat}):')
+        for engine, seconds in timings.items():
+            print(f'\t{engine:>8}: {seconds * 1000:.1f} ms '
+                  f'(speedup: {timings["counter"] / seconds:.1f}x)')
+
+        return timings
+
+    def compare_top_n(self, search_words, cutoffs=(2_000, 5_000, 10_000, 20_000), engine=None, repeat=3):
+        """Time find_contained on the top_n most common words for each cutoff, against the full list.
+
+        The time to build each pruned subset is reported separately, it is only paid once per cutoff.
+
+        Returns
+        -------
+        timings : dict
+            key is the cutoff (None for the full list), value is the best total search time in seconds
+        """
+        timings = {}
+        build_times = {}
+        found = {}
+        for top_n in (None, *cutoffs):
+            if top_n is not None:
+                self.subsets.pop(top_n, None)
+                time_start = time.perf_counter()
+                self.most_common(top_n)
+                build_times[top_n] = time.perf_counter() - time_start
+            best = float('inf')
+            for _ in range(repeat):
+                time_start = time.perf_counter()
+                results = [self.find_contained(w, engine, top_n) for w in search_words]
+                best = min(best, time.perf_counter() - time_start)
+            timings[top_n] = best
+            found[top_n] = sum(len(indices) for indices, _ in results)
+
+        print(f'\nfind_contained on the most common words, {len(search_words)} search words (best of {repeat}):')
+        print(f'{"top_n":>10} {"words":>7} {"found":>7} {"search (ms)":>12} {"speedup":>8} {"build (ms)":>11}')
+        for top_n, seconds in timings.items():
+            size = len(self.words) if top_n is None else len(self.most_common(top_n)[1])
+            build = '' if top_n is None else f'{build_times[top_n] * 1000:.1f}'
+            print(f'{str(top_n or "all"):>10} {size:>7} {found[top_n]:>7} {seconds * 1000:>12.1f} '
+                  f'{timings[None] / seconds:>7.1f}x {build:>11}')
+        return timings
+
+    def input_loop(self, name=None, top_n=None):
         """Main loop to allow user to select anagram choices
         or have the selected automatically.
 
@@ -185,6 +965,8 @@ class WordList:
             Name used in anagram generation.
             If specified, word choices will be selected automatically.
             If None, user will be prompted for name.
+        top_n = int | None
+            only offer words that are among the top_n most common words, most common first
 
         Returns
         -------
@@ -211,7 +993,7 @@ class WordList:
         while working_word:
 
             print(f'\nRemaining letters we have to work with: *{working_word}*')
-            my_indices, my_words = self.find_contained(working_word)
+            my_indices, my_words = self.find_contained(working_word, top_n=top_n, ranked=top_n is not None)
 
             if not my_words:
                 print('The remaining letters are exhausted or they do not contain possible words')
@@ -232,12 +1014,12 @@ class WordList:
 
         return name, selected_words, working_word
 
-    def user_interface(self, name=None):
+    def user_interface(self, name=None, top_n=None):
         """Point of entry for the anagram selection routines"""
 
         print(f"\n{'*'*50}\nWelcome to the anagram creator! \n{'*'*50}")
 
-        name, selected_words, working_word = self.input_loop(name)
+        name, selected_words, working_word = self.input_loop(name, top_n)
 
         print(f'\nYour name is: {name}')
         print(f'Phrase contained within your name: {selected_words}')
@@ -248,7 +1030,7 @@ class WordList:
 
 def main():
     file_name = 'dictionaries/2of4brif.txt'
-    words = WordList(file_name)
+    words = WordList(file_name, engine='trie', use_index=True)
     words.print_most_frequent(5)
     words.find_anagrams('bear')
     words.find_anagrams('qwertyuiop')
@@ -257,10 +1039,77 @@ def main():
     my_indices, my_words = words.find_contained(search_word)
     print(f'\nWords that can be found in *{search_word}*:\n{my_words}')
 
+    words.compare_engines([search_word, 'elizabethstryjewski', 'anagram', 'qwertyuiop'])
+
+    # Most common words first, from the 5000 most common words only
+    my_indices, my_words = words.find_contained(search_word, top_n=5_000, ranked=True)
+    print(f'\nCommon words that can be found in *{search_word}*:\n{my_words}')
+    words.compare_top_n([search_word, 'elizabethstryjewski', 'anagram', 'qwertyuiop'])
+
+    # List every anagram phrase of a name
+    name = 'elizabeth stryjewski'
+    time_start = time.perf_counter()
+    with stage('anagrams.search.phrases'):
+        phrases = list(words.find_phrases(name, min_length=3, max_words=3))
+    time_diff = time.perf_counter() - time_start
+    print(f'\n{len(phrases)} phrases of up to 3 words found for *{name}* in {time_diff:.2f} seconds')
+    for phrase in phrases[:10]:
+        print(f'\t{" ".join(phrase)}')
+
     # Run anagram assist with and without default names
     words.user_interface('elizabeth stryjewski')
+    words.user_interface('elizabeth stryjewski', top_n=10_000)
     words.user_interface()
 
+def batch_main(file_name, source, output=sys.stdout, chunk_size=10_000):
+    """Resolve the anagrams of every word in source (one per line) and write them to output.
+
+    Each output line is the word, a tab, and its space separated anagrams.
+    Load messages are sent to stderr so output can be piped.
+    """
+    with redirect_stdout(sys.stderr):
+        words = WordList(file_name, use_index=True)
+
+    time_start = time.perf_counter()
+    count = 0
+    lines = []
+    for word, anagrams in words.stream_anagrams(source):
+        lines.append(f'{word}\t{" ".join(anagrams)}\n')
+        if len(lines) >= chunk_size:
+            with stage('anagrams.output.batch'):
+                output.writelines(lines)
+            count += len(lines)
+            lines = []
+    with stage('anagrams.output.batch'):
+        output.writelines(lines)
+    count += len(lines)
+    output.flush()
+
+    time_diff = time.perf_counter() - time_start
+    print(f'{count} words resolved in {time_diff:.2f} seconds '
+          f'({count / max(time_diff, 1e-9):,.0f} words/sec)', file=sys.stderr)
+
 
 if __name__ == '__main__':
-    main()
+    """
+    Example usage:
+        python anagrams_v01.py
+        python anagrams_v01.py --batch words.txt
+        cat words.txt | python anagrams_v01.py --batch - > anagrams.txt
+    """
+    parser = argparse.ArgumentParser(description='Anagram finder.')
+    parser.add_argument('-b', '--batch', metavar='FILE',
+                        help="resolve the anagrams of each word in FILE (one per line), use - for stdin")
+    parser.add_argument('-d', '--dictionary', default='dictionaries/2of4brif.txt',
+                        help="word list used to find anagrams")
+    add_arguments(parser)
+    args = parser.parse_args()
+    enable_from_args(args)
+
+    if args.batch is None:
+        main()
+    elif args.batch == '-':
+        batch_main(args.dictionary, sys.stdin)
+    else:
+        with open(args.batch) as fn:
+            batch_main(args.dictionary, fn)
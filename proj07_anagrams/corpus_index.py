@@ -0,0 +1,238 @@
+"""
+Build anagram classes from very large word corpora with a streaming map-reduce.
+
+Created by: Tony Held
+Created on: 2021-03-21
+
+anagrams_v01.index_list needs the whole word list in memory and sorts every class to find
+the largest ones.  This module instead:
+1. Reads the corpus in chunks cut at white space, so no word is split between two chunks.
+2. Maps each chunk in a worker process to a partial table of {anagram key: words}.
+    Tokens are lower cased and stripped of punctuation, tokens that are not latin-1 are skipped.
+3. Merges the partial tables, spilling sorted runs to disk when too many words are held in memory.
+4. Merges the runs back into one stream of classes sorted by (key, word), keeping a heap of the top k classes.
+5. Streams the distinct words (grouped by class) to the latin-1 word list, and their compiled index
+    (see word_index.IndexWriter) to disk, so the result loads with WordList(output, use_index=True).
+Memory therefore depends on max_words, not on the size of the corpus's vocabulary.
+
+Usage
+-----
+    python corpus_index.py corpus.txt dictionaries/corpus_words.txt --top 10
+"""
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+import argparse
+import heapq
+import os
+import re
+import tempfile
+import time
+
+from anagrams_v01 import create_count_matrix
+from word_index import IndexWriter
+
+# Word lists are latin-1, as common/lexicon.py reads them
+ENCODING = 'latin-1'
+# Punctuation (and symbols, and _) removed from tokens, letters and digits are kept
+PUNCTUATION_PATTERN = re.compile(r'[\W_]+')
+# Token that may continue in the next chunk (ASCII white space never occurs inside a utf-8 character)
+PARTIAL_TOKEN_PATTERN = re.compile(rb'\S*\Z')
+
+
+def read_chunks(file_name, chunk_size=1 << 24):
+    """Yield the contents of a file in chunks of about chunk_size bytes that end on white space.
+
+    The token cut off at the end of a chunk is carried over to the next one, so a corpus
+    without line breaks is still read chunk_size bytes at a time.
+    """
+    with open(file_name, 'rb') as fn:
+        partial = b''
+        while True:
+            chunk = fn.read(chunk_size)
+            if not chunk:
+                break
+            chunk = partial + chunk
+            cut = PARTIAL_TOKEN_PATTERN.search(chunk).start()
+            partial = chunk[cut:]
+            if cut:
+                yield chunk[:cut]
+        if partial:
+            yield partial
+
+def clean_token(token):
+    """Return a lower case token stripped of punctuation, or '' if it can not be written as latin-1."""
+    word = PUNCTUATION_PATTERN.sub('', token.lower())
+    try:
+        word.encode(ENCODING)
+    except UnicodeEncodeError:
+        return ''
+    return word
+
+def map_chunk(chunk, min_length=1):
+    """Return the partial anagram class table {key: sorted list of words} of a chunk of text.
+
+    Words are separated by white space, converted to lower case and stripped of punctuation (see clean_token).
+    """
+    table = defaultdict(list)
+    words = set(map(clean_token, set(chunk.decode('utf-8', errors='ignore').split())))
+    for word in words:
+        if word and len(word) >= min_length:
+            table[''.join(sorted(word))].append(word)
+    for words in table.values():
+        words.sort()
+    return table
+
+
+class ClassTableBuilder:
+    """Merge partial anagram class tables with bounded memory.
+
+    Up to max_words words are held in memory, beyond that the table is written to a sorted
+    run file in spill_dir and cleared.
+    """
+
+    def __init__(self, max_words=2_000_000, spill_dir=None):
+        self.max_words = max_words
+        self.spill_dir = spill_dir
+        self.table = defaultdict(set)
+        self.num_words = 0
+        self.runs = []
+
+    def add(self, partial):
+        """Merge a partial table {key: words} into the builder."""
+        table = self.table
+        for key, words in partial.items():
+            members = table[key]
+            before = len(members)
+            members.update(words)
+            self.num_words += len(members) - before
+        if self.num_words > self.max_words:
+            self.spill()
+
+    @staticmethod
+    def _line_key(line):
+        """Sort key of a 'key<tab>word' line, (key, word) like the in-memory table."""
+        key, word = line.rstrip('\n').split('\t', 1)
+        return key, word
+
+    def _sorted_lines(self):
+        """Yield 'key<tab>word' lines of the in-memory table in (key, word) order."""
+        for key in sorted(self.table):
+            for word in sorted(self.table[key]):
+                yield f'{key}\t{word}\n'
+
+    def spill(self):
+        """Write the in-memory table to a sorted run file and clear it."""
+        with tempfile.NamedTemporaryFile('w', suffix='.run', dir=self.spill_dir, delete=False,
+                                         encoding='utf-8') as fn:
+            fn.writelines(self._sorted_lines())
+            self.runs.append(fn.name)
+        self.table = defaultdict(set)
+        self.num_words = 0
+
+    def classes(self):
+        """Yield (key, words) for every anagram class in key order, merging any spilled runs.
+
+        Run files are deleted once they have been read.
+        """
+        files = [open(run, encoding='utf-8') for run in self.runs]
+        try:
+            lines = heapq.merge(self._sorted_lines(), *files, key=self._line_key)
+            for key, group in groupby(lines, key=lambda line: line.split('\t', 1)[0]):
+                words = [line.rstrip('\n').split('\t', 1)[1] for line in group]
+                yield key, list(dict.fromkeys(words))
+        finally:
+            for fn in files:
+                fn.close()
+            for run in self.runs:
+                os.remove(run)
+            self.runs = []
+
+
+def build_corpus_index(corpus, output, chunk_size=1 << 24, processes=None,
+                       max_words=2_000_000, min_length=1, top_k=5, spill_dir=None):
+    """
+    Build the anagram classes of a corpus and save them as a WordList compatible word list and index.
+
+    Parameters
+    ----------
+    corpus : str
+        location of the corpus, a text file of white space separated words
+    output : str
+        location of the word list to write, the index is written next to it
+    chunk_size : int
+        approximate number of bytes of corpus handed to a worker at a time
+    processes : int | None
+        number of worker processes, None uses os.cpu_count()
+    max_words : int
+        maximum number of distinct words held in memory before spilling to disk
+    min_length : int
+        minimum word length
+    top_k : int
+        number of largest anagram classes to return
+    spill_dir : str | None
+        directory for spilled runs, None uses the system temporary directory
+
+    Returns
+    -------
+    top : list[tuple[int, str, list[str]]]
+        (size, key, words) of the top_k largest classes, largest first,
+        classes of the same size in key order (the first keys win a tie for the last places)
+    """
+    builder = ClassTableBuilder(max_words, spill_dir)
+    processes = processes or os.cpu_count() or 1
+
+    # Keep a bounded number of chunks in flight so the corpus is never read far ahead of the workers
+    with ProcessPoolExecutor(processes) as executor:
+        pending = []
+        for chunk in read_chunks(corpus, chunk_size):
+            pending.append(executor.submit(map_chunk, chunk, min_length))
+            if len(pending) >= 2 * processes:
+                builder.add(pending.pop(0).result())
+        for future in pending:
+            builder.add(future.result())
+
+    # Stream the word list and its index, only the current class and the top k are held in memory
+    writer = IndexWriter(spill_dir)
+    top = []
+    with open(output, 'w', encoding=ENCODING) as fn:
+        for position, (key, members) in enumerate(builder.classes()):
+            fn.writelines(f'{word}\n' for word in members)
+            writer.add_class(key, members, *create_count_matrix(members))
+
+            # Classes arrive in key order, -position makes the heap drop the latest key of the smallest size
+            entry = (len(members), -position, key, members)
+            if len(top) < top_k:
+                heapq.heappush(top, entry)
+            elif entry[0] > top[0][0]:
+                heapq.heapreplace(top, entry)
+
+    writer.close(output)
+
+    return [(size, key, members) for size, _, key, members in sorted(top, key=lambda x: (-x[0], x[2]))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build anagram classes from a large corpus.')
+    parser.add_argument('corpus', help="text file of white space separated words")
+    parser.add_argument('output', help="word list to write, its index is written next to it")
+    parser.add_argument('-p', '--processes', type=int, help="number of worker processes")
+    parser.add_argument('-c', '--chunk_mb', type=int, default=16, help="chunk size in MB")
+    parser.add_argument('-m', '--max_words', type=int, default=2_000_000,
+                        help="distinct words held in memory before spilling to disk")
+    parser.add_argument('-t', '--top', type=int, default=5, help="number of largest classes to report")
+    args = parser.parse_args()
+
+    time_start = time.perf_counter()
+    top = build_corpus_index(args.corpus, args.output, args.chunk_mb << 20, args.processes,
+                             args.max_words, top_k=args.top)
+    time_diff = time.perf_counter() - time_start
+
+    print(f'Anagram classes of {args.corpus} built in {time_diff:.2f} seconds.')
+    print(f'The {args.top} largest classes are:')
+    for size, key, members in top:
+        print(f'{size} anagrams were found for {key}: {" ".join(members)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+"""
+Compiled on-disk index for anagram word lists.
+
+Created by: Tony Held
+Created on: 2021-03-20
+
+Building a WordList re-reads the text dictionary and recreates every lookup table.
+This module saves those tables to a binary file next to the dictionary (<dictionary>.idx)
+so later runs can memory-map them instead of rebuilding them.
+
+File Layout
+-----------
+1. Header: magic, version, number of words, number of classes,
+    and the size, mtime and sha256 of the source dictionary.
+2. Section table: (offset, length) in bytes of each section in SECTIONS.
+3. Sections, each aligned to 8 bytes:
+    word_offsets  - uint32[N+1], start of each word in word_blob
+    word_blob     - utf-8 words, each followed by a newline
+    counts        - uint8[N x 26], letter count matrix
+    masks         - uint32[N], letter presence masks
+    irregular     - uint32[], words that do not fit in the count matrix
+    class_offsets - uint32[C+1], start of each anagram class in class_members
+    class_members - uint32[N], word indices grouped by anagram class
+    class_order   - uint32[C], classes sorted from the most to the least members
+    key_offsets   - uint32[C+1], start of each class key in key_blob
+    key_blob      - utf-8 class keys (the sorted letters of the class)
+
+The index is valid while the source dictionary has the same size and either the same mtime
+or the same sha256, otherwise it is rebuilt.  When only the mtime has changed (the file was
+touched or copied) the new mtime is written to the header, so the next load does not hash it again.
+Sections are little-endian, on big-endian hosts the uint32 sections are byteswapped into memory
+when the index is opened.
+
+Usage
+-----
+    python word_index.py dictionaries/2of4brif.txt
+"""
+from array import array
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.packed_words import PackedWords
+
+MAGIC = b'ANAGRIDX'
+VERSION = 2
+HEADER = struct.Struct('<8sIIIQq32s')
+SECTIONS = ('word_offsets', 'word_blob', 'counts', 'masks', 'irregular',
+            'class_offsets', 'class_members', 'class_order', 'key_offsets', 'key_blob')
+SECTION_ENTRY = struct.Struct('<QQ')
+ALIGNMENT = 8
+
+
+def index_path(file_name):
+    """Return the location of the compiled index for a dictionary file."""
+    return f'{file_name}.idx'
+
+def file_digest(file_name):
+    """Return the sha256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as fn:
+        for chunk in iter(lambda: fn.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+def source_signature(file_name):
+    """Return the (size, mtime in ns) of a dictionary file."""
+    stat = os.stat(file_name)
+    return stat.st_size, stat.st_mtime_ns
+
+def _uint32(values):
+    """Return values as a little-endian uint32 array."""
+    result = array('I', values)
+    if sys.byteorder == 'big':
+        result.byteswap()
+    return result
+
+def _join(strings):
+    """Return (offsets, blob) for a list of strings, each followed by a newline in blob."""
+    offsets = [0]
+    chunks = []
+    for s in strings:
+        chunk = (s + '\n').encode()
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return _uint32(offsets), b''.join(chunks)
+
+def write_index(file_name, words, words_indexed, frequencies, count_matrix, letter_masks, irregular):
+    """
+    Write the compiled index of a dictionary next to the dictionary.
+
+    Parameters
+    ----------
+    file_name : str
+        location of the source dictionary
+    words : list[str]
+        words in the dictionary
+    words_indexed : dict
+        anagram classes as returned by anagrams_v01.index_list
+    frequencies : list[list[int]]
+        anagram classes sorted by size as returned by anagrams_v01.index_list
+    count_matrix, letter_masks, irregular :
+        letter counts as returned by anagrams_v01.create_count_matrix
+
+    Returns
+    -------
+    path : str
+        location of the index
+    """
+    size, mtime_ns = source_signature(file_name)
+    digest = file_digest(file_name)
+
+    class_keys = [''.join(key) for key in words_indexed]
+    class_lists = list(words_indexed.values())
+    class_number = {id(members): c for c, members in enumerate(class_lists)}
+
+    class_offsets = [0]
+    for members in class_lists:
+        class_offsets.append(class_offsets[-1] + len(members))
+
+    word_offsets, word_blob = _join(words)
+    key_offsets, key_blob = _join(class_keys)
+    sections = {
+        'word_offsets': word_offsets,
+        'word_blob': word_blob,
+        'counts': bytes(count_matrix),
+        'masks': _uint32(letter_masks),
+        'irregular': _uint32(irregular),
+        'class_offsets': _uint32(class_offsets),
+        'class_members': _uint32([i for members in class_lists for i in members]),
+        'class_order': _uint32([class_number[id(members)] for members in frequencies]),
+        'key_offsets': key_offsets,
+        'key_blob': key_blob,
+    }
+
+    header = HEADER.pack(MAGIC, VERSION, len(words), len(class_lists), size, mtime_ns, digest)
+    position = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        position += -position % ALIGNMENT
+        length = len(sections[name]) * getattr(sections[name], 'itemsize', 1)
+        table.append((position, length))
+        position += length
+
+    path = index_path(file_name)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as fn:
+        fn.write(header)
+        for entry in table:
+            fn.write(SECTION_ENTRY.pack(*entry))
+        for name, (offset, _) in zip(SECTIONS, table):
+            fn.write(bytes(offset - fn.tell()))
+            fn.write(sections[name])
+    os.replace(temp_path, path)
+
+    return path
+
+
+class IndexWriter:
+    """Write a compiled index one anagram class at a time, in bounded memory.
+
+    Every section is streamed to its own temporary file as classes are added, and close()
+    joins them into the index.  Only class_order needs all the classes, it is filled in by
+    a counting sort over the class sizes into a memory-mapped temporary file.
+    The words must be added in the order they are written to the word list.
+    """
+
+    def __init__(self, spill_dir=None):
+        self.spill_dir = spill_dir
+        self.files = {name: tempfile.TemporaryFile(dir=spill_dir) for name in SECTIONS if name != 'class_order'}
+        self.num_words = 0
+        self.num_classes = 0
+        self.word_position = 0
+        self.key_position = 0
+        self.class_sizes = {}       # class size -> number of classes of that size
+        self.files['word_offsets'].write(_uint32([0]))
+        self.files['class_offsets'].write(_uint32([0]))
+        self.files['key_offsets'].write(_uint32([0]))
+
+    def add_class(self, key, words, count_matrix, letter_masks, irregular):
+        """Add the words of an anagram class, with their letter counts (as returned by
+        anagrams_v01.create_count_matrix(words), irregular indices are relative to words)."""
+        start = self.num_words
+        word_offsets, word_blob = _join(words)
+        self.files['word_offsets'].write(_uint32([self.word_position + o for o in word_offsets[1:]]))
+        self.files['word_blob'].write(word_blob)
+        self.word_position += len(word_blob)
+        self.files['counts'].write(bytes(count_matrix))
+        self.files['masks'].write(_uint32(letter_masks))
+        self.files['irregular'].write(_uint32([start + i for i in irregular]))
+        self.files['class_members'].write(_uint32(range(start, start + len(words))))
+        self.num_words += len(words)
+        self.files['class_offsets'].write(_uint32([self.num_words]))
+
+        key_blob = (key + '\n').encode()
+        self.files['key_blob'].write(key_blob)
+        self.key_position += len(key_blob)
+        self.files['key_offsets'].write(_uint32([self.key_position]))
+        self.class_sizes[len(words)] = self.class_sizes.get(len(words), 0) + 1
+        self.num_classes += 1
+
+    def _class_order(self):
+        """Return a temporary file of the classes sorted from the most to the least members
+        (classes of the same size in class order, as the stable sort of write_index)."""
+        starts = {}
+        position = 0
+        for size in sorted(self.class_sizes, reverse=True):
+            starts[size] = position
+            position += self.class_sizes[size]
+
+        order = tempfile.TemporaryFile(dir=self.spill_dir)
+        if not self.num_classes:
+            return order
+        order.truncate(4 * self.num_classes)
+        with mmap.mmap(order.fileno(), 4 * self.num_classes) as buffer:
+            offsets = self.files['class_offsets']
+            offsets.seek(0)
+            previous = None
+            c = 0
+            for chunk in iter(lambda: offsets.read(1 << 20), b''):
+                values = array('I')
+                values.frombytes(chunk)
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                for value in values:
+                    if previous is not None:
+                        size = value - previous
+                        struct.pack_into('<I', buffer, 4 * starts[size], c)
+                        starts[size] += 1
+                        c += 1
+                    previous = value
+        return order
+
+    def close(self, file_name):
+        """Join the sections into the index of the word list file_name and return its path."""
+        self.files['class_order'] = self._class_order()
+        size, mtime_ns = source_signature(file_name)
+        digest = file_digest(file_name)
+        header = HEADER.pack(MAGIC, VERSION, self.num_words, self.num_classes, size, mtime_ns, digest)
+
+        position = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+        table = []
+        for name in SECTIONS:
+            position += -position % ALIGNMENT
+            length = self.files[name].seek(0, os.SEEK_END)
+            table.append((position, length))
+            position += length
+
+        path = index_path(file_name)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as fn:
+            fn.write(header)
+            for entry in table:
+                fn.write(SECTION_ENTRY.pack(*entry))
+            for name, (offset, _) in zip(SECTIONS, table):
+                fn.write(bytes(offset - fn.tell()))
+                section = self.files[name]
+                section.seek(0)
+                shutil.copyfileobj(section, fn)
+        os.replace(temp_path, path)
+
+        for section in self.files.values():
+            section.close()
+        self.files = {}
+        return path
+
+
+class WordIndex:
+    """Read-only view of a compiled index, backed by a memory map of the index file."""
+
+    def __init__(self, path):
+        """path : location of the index file"""
+        self.path = path
+        with open(path, 'rb') as fn:
+            self.buffer = mmap.mmap(fn.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.buffer)
+
+        (magic, version, self.num_words, self.num_classes,
+         self.source_size, self.source_mtime_ns, self.source_digest) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} word list index')
+
+        self.sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(view, HEADER.size + i * SECTION_ENTRY.size)
+            section = view[offset:offset + length]
+            if name not in ('word_blob', 'counts', 'key_blob'):
+                if sys.byteorder == 'big':
+                    # The sections are little-endian, swap a copy instead of viewing the map
+                    values = array('I')
+                    values.frombytes(section)
+                    values.byteswap()
+                    section.release()
+                    section = memoryview(values)
+                else:
+                    section = section.cast('I')
+            self.sections[name] = section
+
+        self.word_offsets = self.sections['word_offsets']
+        self.counts = self.sections['counts']
+        self.masks = self.sections['masks']
+        self.irregular = self.sections['irregular']
+        self.class_offsets = self.sections['class_offsets']
+        self.class_members = self.sections['class_members']
+        self.class_order = self.sections['class_order']
+        self.key_offsets = self.sections['key_offsets']
+
+    def is_current(self, file_name):
+        """Return True if the index was built from the current contents of file_name.
+
+        If the contents are the same but the mtime is not, the mtime in the header is updated.
+        """
+        size, mtime_ns = source_signature(file_name)
+        if size != self.source_size:
+            return False
+        if mtime_ns == self.source_mtime_ns:
+            return True
+        if file_digest(file_name) != self.source_digest:
+            return False
+        self._update_mtime(mtime_ns)
+        return True
+
+    def _update_mtime(self, mtime_ns):
+        """Write a new source mtime to the header of the index file, if the file can be written."""
+        header = HEADER.pack(MAGIC, VERSION, self.num_words, self.num_classes, self.source_size, mtime_ns,
+                             self.source_digest)
+        try:
+            with open(self.path, 'r+b') as fn:
+                fn.write(header)
+        except OSError:
+            # e.g. a read-only directory, the index is still valid but will be hashed again next time
+            return
+        self.source_mtime_ns = mtime_ns
+
+    def words(self):
+        """Return the words as a PackedWords view of the index (the words are not copied)."""
+        return PackedWords(self.sections['word_blob'], self.word_offsets)
+
+    def word(self, i):
+        """Return word i."""
+        start, end = self.word_offsets[i], self.word_offsets[i + 1] - 1
+        return bytes(self.sections['word_blob'][start:end]).decode()
+
+    def class_keys(self):
+        """Return the list of anagram class keys (sorted letters of each class)."""
+        return bytes(self.sections['key_blob']).decode().split('\n')[:-1]
+
+    def members(self, c):
+        """Return the word indices in anagram class c."""
+        return self.class_members[self.class_offsets[c]:self.class_offsets[c + 1]].tolist()
+
+    def close(self):
+        """Release the memory map, views returned by this index must not be used afterwards."""
+        for section in self.sections.values():
+            section.release()
+        self.sections = {}
+        self.buffer.close()
+
+
+def open_index(file_name):
+    """Return the WordIndex of a dictionary if it exists and is current, otherwise None."""
+    path = index_path(file_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        index = WordIndex(path)
+    except (ValueError, struct.error):
+        return None
+    if not index.is_current(file_name):
+        index.close()
+        return None
+    return index
+
+
+def main(file_name):
+    """Report the startup time and memory of a WordList built from text (cold) and loaded from the index (warm)."""
+    from anagrams_v01 import WordList
+
+    path = index_path(file_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+    tracemalloc.start()
+    time_start = time.perf_counter()
+    cold = WordList(file_name, use_index=True)
+    time_cold = time.perf_counter() - time_start
+    memory_cold = tracemalloc.get_traced_memory()[0]
+    del cold
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    time_start = time.perf_counter()
+    warm = WordList(file_name, use_index=True)
+    time_warm = time.perf_counter() - time_start
+    memory_warm = tracemalloc.get_traced_memory()[0]
+    del warm
+    tracemalloc.stop()
+
+    print(f'\nStartup time and memory for {file_name}:')
+    print(f'\tcold build: {time_cold * 1000:.1f} ms, {memory_cold / 2 ** 20:.2f} MiB')
+    print(f'\twarm mmap:  {time_warm * 1000:.1f} ms, {memory_warm / 2 ** 20:.2f} MiB '
+          f'(words packed in the mapped index, other tables built on first use)')
+    print(f'Index file: {path} ({os.path.getsize(path) / 1024:.0f} kB)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'dictionaries/2of4brif.txt')
@@ -0,0 +1,20 @@
+"""
+Tests of the word projects.
+
+Run from the repository root:
+    python -m pytest tests
+
+The project scripts import each other by module name (as when they are run from their own
+directory), so every project directory is put on sys.path here, like benchmarks/benchmark_suite.py does.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+PROJECTS = ('proj01_dugeons_and_dragons/old', 'proj03_silly_names', 'proj04_pig_latin', 'proj05_letter_histogram',
+            'proj06_magic_spells', 'proj07_anagrams', 'benchmarks')
+sys.path.append(ROOT)
+for project in PROJECTS:
+    sys.path.append(os.path.join(ROOT, *project.split('/')))
+
+ANAGRAM_DICTIONARY = os.path.join(ROOT, 'proj07_anagrams', 'dictionaries', '2of4brif.txt')
@@ -0,0 +1,137 @@
+"""
+AnagramDaemon over a Unix socket: answers match WordList, and bad requests get an error without
+dropping the connection.
+"""
+from contextlib import redirect_stdout
+import asyncio
+import io
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+from anagram_daemon import MAX_REQUEST_BYTES, AnagramClient, AnagramDaemon, latency_summary
+from anagrams_v01 import WordList
+
+
+@pytest.fixture(scope='module')
+def dictionary(tmp_path_factory):
+    """A copy of the dictionary, so its compiled index is saved in a temporary directory."""
+    path = tmp_path_factory.mktemp('daemon') / os.path.basename(ANAGRAM_DICTIONARY)
+    shutil.copy(ANAGRAM_DICTIONARY, path)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def daemon(dictionary):
+    with redirect_stdout(io.StringIO()):
+        return AnagramDaemon([dictionary], phrase_timeout=2.0)
+
+
+@pytest.fixture(scope='module')
+def word_list(dictionary):
+    with redirect_stdout(io.StringIO()):
+        return WordList(dictionary)
+
+
+def talk(daemon, socket_path, conversation):
+    """Serve on socket_path while conversation(client, reader, writer) runs, and return its result."""
+    async def run():
+        server = asyncio.create_task(daemon.serve(socket_path))
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        client = await AnagramClient.connect(socket_path)
+        try:
+            return await conversation(client)
+        finally:
+            await client.close()
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'daemon.sock')
+
+
+def test_queries_match_word_list(daemon, word_list, socket_path):
+    async def conversation(client):
+        return [await client.request('anagrams', word='bear'),
+                await client.request('contained', word='tacotime'),
+                await client.request('phrases', word='tony held', min_length=3, max_words=2, limit=5),
+                await client.request('dictionaries'),
+                await client.request('stats')]
+    anagrams, contained, phrases, dictionaries, stats = talk(daemon, socket_path, conversation)
+    assert all(response['ok'] for response in (anagrams, contained, phrases, dictionaries, stats))
+    assert anagrams['id'] == 1 and stats['id'] == 5
+    assert anagrams['result'] == list(word_list.lookup_anagrams(['bear'])['bear'])
+    assert contained['result'] == list(word_list.find_contained('tacotime')[1])
+    assert 0 < len(phrases['result']) <= 5
+    assert list(dictionaries['result'].values()) == [len(word_list.words)]
+    assert stats['result']['anagrams']['count'] >= 1
+
+
+def test_bad_requests_keep_the_connection(daemon, socket_path):
+    async def conversation(client):
+        responses = [await client.request('shuffle', word='bear'),
+                     await client.request('anagrams', word='bear', dictionary='klingon'),
+                     await client.request(['anagrams'], word='bear'),
+                     await client.request('anagrams')]
+        for line in (b'not json\n', b'[1, 2]\n', b'\xff\xfe\n', b'x' * (2 * MAX_REQUEST_BYTES) + b'\n'):
+            client.writer.write(line)
+            responses.append(json.loads(await client.reader.readline()))
+        responses.append(await client.request('anagrams', word='bear'))
+        return responses
+    *errors, last = talk(daemon, socket_path, conversation)
+    assert not any(response['ok'] for response in errors)
+    assert last['ok'] and last['result']
+
+
+def test_phrase_timeout(daemon, socket_path):
+    async def conversation(client):
+        return await client.request('phrases', word='elizabeth stryjewski anagrams', max_words=6, timeout=0.01)
+    response = talk(daemon, socket_path, conversation)
+    assert not response['ok'] and 'TimeoutError' in response['error']
+
+
+def test_latency_summary():
+    assert latency_summary([]) == {'count': 0}
+    summary = latency_summary([0.001, 0.002, 0.003])
+    assert summary['count'] == 3 and summary['p50'] == pytest.approx(2.0) and summary['max'] == pytest.approx(3.0)
+    assert latency_summary([0.005])['p99'] == pytest.approx(5.0)
+
+
+def test_searches_run_off_the_event_loop(dictionary, socket_path):
+    """A search that blocks its thread does not stop the daemon answering other requests."""
+    with redirect_stdout(io.StringIO()):
+        daemon = AnagramDaemon([dictionary])
+    release = threading.Event()
+    search_threads = []
+
+    def blocking_contained(words, request):
+        search_threads.append(threading.current_thread())
+        assert release.wait(5)
+        return words.find_contained(request['word'])[1]
+
+    daemon.operations['contained'] = blocking_contained
+
+    async def conversation(client):
+        other = await AnagramClient.connect(socket_path)
+        try:
+            blocked = asyncio.create_task(client.request('contained', word='tacotime'))
+            anagrams = await asyncio.wait_for(other.request('anagrams', word='bear'), 2)
+            stats = await asyncio.wait_for(other.request('stats'), 2)
+            release.set()
+            return await blocked, anagrams, stats
+        finally:
+            release.set()
+            await other.close()
+
+    contained, anagrams, stats = talk(daemon, socket_path, conversation)
+    assert contained['ok'] and anagrams['ok'] and stats['ok']
+    assert 'contained' not in stats['result']
+    assert search_threads and search_threads[0] is not threading.main_thread()
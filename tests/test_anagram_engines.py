@@ -0,0 +1,120 @@
+"""
+find_contained engines ('multiset', 'matrix', 'trie') against the original 'counter' engine,
+and the LetterMultiset they build on.
+"""
+from collections import Counter
+from contextlib import redirect_stdout
+import io
+import random
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+from anagrams_v01 import ENGINES, WordList, remove_letters
+from common.letter_multiset import LANE_MAX, LetterMultiset
+
+# Words the 'counter' engine handles by plain character counts: upper case, apostrophes, accents, repeats
+SMALL_WORDS = ['a', 'an', 'ant', 'tan', 'nat', 'banana', 'nab', 'bananas', "can't", 'cant', 'Ant', 'café',
+               'face', 'aaaa', 'aaaaaaaaaaaaaaaaaaaa', 'zz', 'zzz', 'q']
+SEARCH_WORDS = ['', 'a', 'banana', 'bananas', 'tacnan', "can't", 'Ant', 'café', 'cafe', 'a' * 20, 'a' * 19,
+                'zzzz', 'quiz', 'ANT']
+
+
+@pytest.fixture(scope='module')
+def small_list():
+    with redirect_stdout(io.StringIO()):
+        return WordList('small', words=SMALL_WORDS)
+
+
+@pytest.fixture(scope='module')
+def dictionary_list():
+    with redirect_stdout(io.StringIO()):
+        return WordList(ANAGRAM_DICTIONARY)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('word', SEARCH_WORDS)
+def test_engines_match_counter_on_edge_cases(small_list, engine, word):
+    assert small_list.find_contained(word, engine) == small_list.find_contained(word, 'counter')
+
+
+def test_counter_engine_is_letter_containment(small_list):
+    indices, words = small_list.find_contained('bananas', 'counter')
+    expected = [i for i, w in enumerate(SMALL_WORDS) if not Counter(w) - Counter('bananas')]
+    assert indices == expected
+    assert words == [SMALL_WORDS[i] for i in expected]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engines_match_counter_on_dictionary(dictionary_list, engine):
+    rng = random.Random(2021)
+    search_words = rng.sample(dictionary_list.words, 25) + ['elizabethstryjewski', 'qwertyuiop', 'aeiouaeiou']
+    for word in search_words:
+        assert dictionary_list.find_contained(word, engine) == dictionary_list.find_contained(word, 'counter')
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        WordList('small', engine='abacus', words=SMALL_WORDS)
+
+
+def pop_letters(word, letters):
+    """The original remove_letters: one list.pop per letter."""
+    remaining = list(word)
+    for c in letters:
+        remaining.pop(remaining.index(c))
+    return ''.join(remaining), remaining
+
+
+@pytest.mark.parametrize('word, letters', [('banana', 'nab'), ('café au lait', 'cat'), ("can't stop", "n't"),
+                                           ('Naïve Ann', 'Nn'), ('café', 'café'), ('abc', '')])
+def test_remove_letters_keeps_other_characters_in_order(word, letters):
+    assert remove_letters(word, letters) == pop_letters(word, letters)
+
+
+def test_remove_letters_examples():
+    assert remove_letters('banana', 'nab') == ('ana', ['a', 'n', 'a'])
+    assert remove_letters('café au lait', 'cat')[0] == 'fé au lai'
+
+
+@pytest.mark.parametrize('letters', ['bz', 'nnn', 'é', 'B'])
+def test_remove_letters_not_contained(letters):
+    with pytest.raises(ValueError):
+        remove_letters('banana', letters)
+
+
+class TestLetterMultiset:
+    def test_counts_match_counter(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            word = ''.join(rng.choices('abcdefghijklmnopqrstuvwxyzABC -', k=rng.randrange(30)))
+            counts = Counter(c for c in word.lower() if c.isalpha())
+            assert dict(LetterMultiset(word).items()) == dict(sorted(counts.items()))
+            assert len(LetterMultiset(word)) == sum(counts.values())
+
+    def test_contains_and_subtract(self):
+        big, small = LetterMultiset('bananas'), LetterMultiset('nab')
+        assert big.contains(small) and not small.contains(big)
+        assert str(big - small) == 'aans'
+        with pytest.raises(ValueError):
+            small - big
+
+    def test_lanes_widen_past_lane_max(self):
+        wide = LetterMultiset('e' * (LANE_MAX + 1) + 'x')
+        assert wide['e'] == LANE_MAX + 1 and wide['x'] == 1
+        assert wide.lane_bits > LetterMultiset('e').lane_bits
+
+    def test_addition_overflow_is_canonical(self):
+        half = LetterMultiset.from_counts([LANE_MAX] + [1] * 25)
+        total = half + half
+        assert total.counts == tuple(2 * c for c in half.counts)
+        # the same multiset built directly has the same signature, width and hash
+        assert total == LetterMultiset.from_counts(total.counts)
+        assert hash(total) == hash(LetterMultiset.from_counts(total.counts))
+        assert total - half == half
+        assert (total - half).lane_bits == half.lane_bits
+        assert total.contains(half) and not half.contains(total)
+
+    def test_negative_counts(self):
+        with pytest.raises(ValueError):
+            LetterMultiset.from_counts([-1] + [0] * 25)
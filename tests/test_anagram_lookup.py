@@ -0,0 +1,93 @@
+"""
+Bulk anagram lookups (lookup_anagrams, stream_anagrams, batch_main) against the interactive find_anagrams.
+"""
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import random
+import shutil
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+from anagrams_v01 import WordList, batch_main
+
+LOOKUP_WORDS = ['bear', 'BARE', 'listen', 'silent', 'a', 'zzzzz', 'xqzvj', ' stone', 'notes ', "can't", 'café', '']
+
+
+def find_anagrams(word_list, word):
+    """Return the anagrams printed by find_anagrams, as a tuple."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        word_list.find_anagrams(word)
+    lines = output.getvalue().splitlines()[2:]
+    if lines == ['\tWord not found in dictionary.']:
+        return ()
+    return tuple(line.split(') ', 1)[1] for line in lines)
+
+
+@pytest.fixture(scope='module')
+def dictionary_list():
+    with redirect_stdout(io.StringIO()):
+        return WordList(ANAGRAM_DICTIONARY)
+
+
+@pytest.fixture(scope='module')
+def sample_words(dictionary_list):
+    rng = random.Random(17)
+    return rng.sample(dictionary_list.words, 300) + LOOKUP_WORDS
+
+
+def test_lookup_anagrams(dictionary_list, sample_words):
+    anagrams = dictionary_list.lookup_anagrams(sample_words)
+    assert list(anagrams) == list(dict.fromkeys(sample_words))
+    for word in sample_words:
+        assert anagrams[word] == find_anagrams(dictionary_list, word)
+    assert set(anagrams['bear']) >= {'bear', 'bare'} and anagrams['BARE'] == anagrams['bear']
+    assert anagrams['xqzvj'] == () and anagrams[' stone'] == anagrams['notes ']
+
+
+def test_lookup_generator(dictionary_list):
+    assert dictionary_list.lookup_anagrams(w for w in ('bear', 'bear')) == \
+        {'bear': dictionary_list.lookup_anagrams(['bear'])['bear']}
+    assert dictionary_list.lookup_anagrams([]) == {}
+
+
+def test_stream_anagrams(dictionary_list, sample_words):
+    stream = io.StringIO('\n'.join(sample_words) + '\n\n   \n')
+    results = list(dictionary_list.stream_anagrams(stream))
+    # lines are stripped and blank lines skipped
+    expected_words = [w.strip() for w in sample_words if w.strip()]
+    assert [word for word, _ in results] == expected_words
+    for word, anagrams in results:
+        assert anagrams == find_anagrams(dictionary_list, word)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 10_000])
+def test_batch_main(tmp_path, dictionary_list, sample_words, chunk_size):
+    dictionary = tmp_path / 'words.txt'
+    shutil.copyfile(ANAGRAM_DICTIONARY, dictionary)
+    source = io.StringIO('\n'.join(sample_words))
+    output = io.StringIO()
+    messages = io.StringIO()
+    with redirect_stderr(messages), redirect_stdout(messages):
+        batch_main(str(dictionary), source, output, chunk_size)
+
+    lines = output.getvalue().splitlines()
+    expected_words = [w.strip() for w in sample_words if w.strip()]
+    assert len(lines) == len(expected_words)
+    for line, word in zip(lines, expected_words):
+        assert line == f'{word}\t{" ".join(find_anagrams(dictionary_list, word))}'
+    assert f'{len(expected_words)} words resolved' in messages.getvalue()
+
+
+def test_batch_main_uses_index(tmp_path):
+    dictionary = tmp_path / 'words.txt'
+    dictionary.write_text('bear\nbare\nnotes\nstone\n', encoding='latin-1')
+    for _ in range(2):
+        output = io.StringIO()
+        messages = io.StringIO()
+        with redirect_stderr(messages), redirect_stdout(messages):
+            batch_main(str(dictionary), io.StringIO('bear\nonset\nzebra\n'), output)
+        assert output.getvalue() == 'bear\tbear bare\nonset\tnotes stone\nzebra\t\n'
+    # the second run loads the index written by the first
+    assert (tmp_path / 'words.txt.idx').exists() and 'loaded from' in messages.getvalue()
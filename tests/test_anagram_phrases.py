@@ -0,0 +1,101 @@
+"""
+Multi-word anagram phrases (find_phrases) against brute force search, and the process pool against
+the single process solver.
+"""
+from collections import Counter
+from contextlib import redirect_stdout
+from itertools import permutations
+import io
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+from anagrams_v01 import WordList, anagram_key
+
+SMALL_WORDS = ['a', 'i', 'an', 'at', 'ta', 'it', 'ti', 'in', 'act', 'ant', 'can', 'cat', 'nat', 'tan', 'tic',
+               'tin', 'nit', 'tact', 'cant', 'taint', 'attic', 'tacit', "can't", 'zoo']
+PHRASES = ['tacit ant', 'a cat', 'tin', 'Tact, Nit!', 'zz', 'aaa']
+
+
+@pytest.fixture(scope='module')
+def small_list():
+    with redirect_stdout(io.StringIO()):
+        return WordList('small', words=SMALL_WORDS)
+
+
+@pytest.fixture(scope='module')
+def dictionary_list():
+    with redirect_stdout(io.StringIO()):
+        return WordList(ANAGRAM_DICTIONARY)
+
+
+def brute_force(words, phrase, min_length=1, max_words=None):
+    """Every multiset of words (as a sorted tuple) that uses the letters of phrase exactly once,
+    tried word by word in list order, stopping at words that do not fit the letters left."""
+    words = [w for w in words if len(w) >= min_length and w.isalpha()]
+    letters = Counter(c for c in phrase.lower() if c.isalpha())
+    max_words = sum(letters.values()) if max_words is None else max_words
+    found = set()
+
+    def extend(start, left, chosen):
+        if not left:
+            if chosen:
+                found.add(tuple(sorted(chosen)))
+            return
+        if len(chosen) == max_words:
+            return
+        for i in range(start, len(words)):
+            counts = Counter(words[i])
+            if not counts - left:
+                extend(i, left - counts, chosen + [words[i]])
+
+    extend(0, letters, [])
+    return found
+
+
+@pytest.mark.parametrize('phrase', PHRASES)
+@pytest.mark.parametrize('min_length, max_words', [(1, None), (1, 2), (2, 3), (3, None), (1, 1)])
+def test_unique_phrases_match_brute_force(small_list, phrase, min_length, max_words):
+    phrases = list(small_list.find_phrases(phrase, min_length, max_words))
+    assert len(phrases) == len(set(map(tuple, map(sorted, phrases))))
+    assert {tuple(sorted(p)) for p in phrases} == brute_force(SMALL_WORDS, phrase, min_length, max_words)
+    assert all(len(p) <= (max_words or len(phrase)) and min(map(len, p)) >= min_length for p in phrases)
+
+
+@pytest.mark.parametrize('phrase', ['tacit ant', 'a cat'])
+def test_every_ordering(small_list, phrase):
+    ordered = list(small_list.find_phrases(phrase, max_words=3, unique=False))
+    expected = {p for words in brute_force(SMALL_WORDS, phrase, max_words=3) for p in permutations(words)}
+    assert len(ordered) == len(set(ordered)) and set(ordered) == expected
+
+
+def test_no_letters(small_list):
+    assert list(small_list.find_phrases('')) == [] and list(small_list.find_phrases('42 !')) == []
+
+
+@pytest.mark.parametrize('unique', [True, False])
+def test_processes_give_the_same_phrases_in_order(small_list, unique):
+    single = list(small_list.find_phrases('tacit ant', unique=unique))
+    assert single and list(small_list.find_phrases('tacit ant', unique=unique, processes=2)) == single
+
+
+def test_two_word_phrases_of_dictionary(dictionary_list):
+    """Every pair is a contained word plus an anagram of the letters left over."""
+    phrase = 'tony held'
+    words = dictionary_list.words
+    table = dictionary_list.anagram_table
+    expected = set()
+    for word in dictionary_list.find_contained('tonyheld')[1]:
+        rest = ''.join((Counter('tonyheld') - Counter(word)).elements())
+        if not rest:
+            expected.add((word,))
+        for other in table.get(anagram_key(rest), ()) if rest else ():
+            expected.add(tuple(sorted((word, other))))
+    phrases = list(dictionary_list.find_phrases(phrase, max_words=2))
+    assert {tuple(sorted(p)) for p in phrases} == expected and len(phrases) == len(expected)
+    assert all(w in words for p in phrases for w in p)
+
+
+def test_dictionary_processes_match(dictionary_list):
+    single = list(dictionary_list.find_phrases('elizabeth stryjewski', 3, 3))
+    assert single == list(dictionary_list.find_phrases('elizabeth stryjewski', 3, 3, processes=2))
@@ -0,0 +1,51 @@
+"""
+Smoke test of the benchmark suite: filtered runs, and the baseline comparison.
+"""
+from contextlib import redirect_stdout
+import io
+import json
+import sys
+
+import pytest
+
+import benchmark_suite
+from benchmark_suite import compare_to_baseline, run_suite, summarize
+
+DICTIONARY = 'proj07_anagrams/dictionaries/2of4brif'
+
+
+def quiet(function, *args, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def test_run_suite_filters():
+    results = quiet(run_suite, 'pig_sentence|find_palindromes', DICTIONARY, warmup=0, repeat=1)
+    assert sorted(results['results']) == [f'find_palindromes[{DICTIONARY}.txt]', f'pig_sentence[{DICTIONARY}.txt]']
+    for summary in results['results'].values():
+        assert summary['runs'] == 1 and summary['min'] == summary['median'] == summary['max'] > 0
+    assert results['meta']['repeat'] == 1
+
+
+def test_summarize():
+    summary = summarize([3.0, 1.0, 2.0])
+    assert (summary['min'], summary['median'], summary['max'], summary['mean']) == (1.0, 2.0, 3.0, 2.0)
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {'results': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'gone': {'median': 1.0}}}
+    results = {'results': {'a': {'median': 1.2}, 'b': {'median': 1.3}, 'new': {'median': 9.0}}}
+    regressions = quiet(compare_to_baseline, results, baseline, 0.25)
+    assert regressions == [('b', 1.0, 1.3)]
+
+
+def test_main_exits_on_regression(tmp_path, monkeypatch):
+    output, baseline = tmp_path / 'latest.json', tmp_path / 'baseline.json'
+    key = f'pig_sentence[{DICTIONARY}.txt]'
+    baseline.write_text(json.dumps({'results': {key: {'median': 1e-9}}}))
+    monkeypatch.setattr(sys, 'argv', ['benchmark_suite.py', '-k', 'pig_sentence', '-d', DICTIONARY, '-w', '0',
+                                      '-r', '1', '-o', str(output), '-b', str(baseline)])
+    with pytest.raises(SystemExit) as exit_info:
+        quiet(benchmark_suite.main)
+    assert exit_info.value.code == 1
+    assert list(json.loads(output.read_text())['results']) == [key]
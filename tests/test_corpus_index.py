@@ -0,0 +1,124 @@
+"""
+Streaming map-reduce of anagram classes (corpus_index.py) against WordList built from the text of the word list.
+"""
+from collections import defaultdict
+from contextlib import redirect_stdout
+import io
+import os
+import random
+
+import pytest
+
+from anagrams_v01 import WordList, index_list, listify_words
+from corpus_index import ClassTableBuilder, build_corpus_index, clean_token, map_chunk, read_chunks
+
+# Anagram classes of several sizes (with ties), accents, digits, punctuation and upper case
+TOKENS = ['listen', 'silent', 'enlist', 'tinsel', 'inlets', 'stone', 'notes', 'onset', 'tones', 'Steno.',
+          'evil', 'vile', 'live', 'veil', 'rat', 'tar', 'art', 'star', 'rats', 'arts', 'tsar', 'café', 'face',
+          "can't", 'cant', 'r2d2', 'd2r2', '--', 'b', 'a', 'ab', 'ba', 'zebra', 'Zebra!', 'straße', '中文']
+
+
+def write_corpus(path, seed, line_breaks=True):
+    rng = random.Random(seed)
+    separators = [' ', ' ', '\t', '\n'] if line_breaks else [' ', '\t']
+    path.write_text(''.join(rng.choice(TOKENS) + rng.choice(separators) for _ in range(3000)), encoding='utf-8')
+    return path
+
+
+def expected_classes(text):
+    classes = defaultdict(set)
+    for token in text.split():
+        word = clean_token(token)
+        if word:
+            classes[''.join(sorted(word))].add(word)
+    return {key: sorted(words) for key, words in classes.items()}
+
+
+def quiet(function, *args, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 1 << 20])
+@pytest.mark.parametrize('line_breaks', [True, False])
+def test_read_chunks_never_split_tokens(tmp_path, chunk_size, line_breaks):
+    path = write_corpus(tmp_path / 'corpus.txt', 1, line_breaks)
+    chunks = list(read_chunks(path, chunk_size))
+    data = path.read_bytes()
+    assert b''.join(chunks) == data
+    assert [t for chunk in chunks for t in chunk.split()] == data.split()
+    if not line_breaks and chunk_size < 100:
+        # the chunks are cut at spaces, not at the (missing) line breaks
+        assert len(chunks) > 100
+
+
+def test_map_chunk():
+    table = map_chunk('Listen, silent! TINSEL zebra 中文 a'.encode(), min_length=2)
+    assert dict(table) == {'eilnst': ['listen', 'silent', 'tinsel'], 'aberz': ['zebra']}
+
+
+def test_class_table_builder_spills(tmp_path):
+    builder = ClassTableBuilder(max_words=2, spill_dir=tmp_path)
+    builder.add({'art': ['art', 'rat'], 'eilv': ['evil']})
+    builder.add({'art': ['rat', 'tar'], 'ab': ['ab']})
+    builder.add({'eilv': ['live', 'vile']})
+    assert len(builder.runs) == 2
+    assert list(builder.classes()) == [('ab', ['ab']), ('art', ['art', 'rat', 'tar']), ('eilv', ['evil', 'live', 'vile'])]
+    assert not list(tmp_path.iterdir()) and not builder.runs
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    return write_corpus(tmp_path_factory.mktemp('corpus') / 'corpus.txt', 2021, line_breaks=False)
+
+
+@pytest.fixture(scope='module')
+def built(corpus, tmp_path_factory):
+    """Build with several spills and 2 processes, return (output, spill_dir, top)."""
+    directory = tmp_path_factory.mktemp('built')
+    spill_dir = directory / 'spill'
+    spill_dir.mkdir()
+    output = directory / 'words.txt'
+    top = build_corpus_index(corpus, output, chunk_size=500, processes=2, max_words=5, top_k=4,
+                             spill_dir=spill_dir)
+    return output, spill_dir, top
+
+
+def test_word_list_matches_the_corpus(corpus, built):
+    output, spill_dir, top = built
+    classes = expected_classes(corpus.read_text(encoding='utf-8'))
+    words = output.read_text(encoding='latin-1').split()
+    assert words == [word for key in sorted(classes) for word in classes[key]]
+    # nothing is left of the spilled runs
+    assert not [name for name in os.listdir(spill_dir) if name.endswith('.run')]
+
+
+def test_index_matches_text_build(built):
+    output = str(built[0])
+    indexed = quiet(WordList, output, use_index=True)
+    assert indexed.index is not None
+    text = quiet(WordList, output, use_index=False)
+    assert list(indexed.words) == text.words
+    assert indexed.words_indexed == dict(text.words_indexed)
+    assert sorted(map(sorted, indexed.frequencies)) == sorted(map(sorted, text.frequencies))
+    words_indexed, frequencies = quiet(index_list, listify_words(text.words))
+    assert indexed.words_indexed == dict(words_indexed)
+
+
+def test_top_classes(corpus, built):
+    classes = expected_classes(corpus.read_text(encoding='utf-8'))
+    ranked = sorted(classes.items(), key=lambda item: (-len(item[1]), item[0]))
+    assert built[2] == [(len(words), key, words) for key, words in ranked[:4]]
+
+
+@pytest.mark.parametrize('top_k', [1, 2, 3, 5, 8, 100])
+def test_top_k_ties_are_stable(corpus, tmp_path, top_k):
+    """The classes of size 4 ('eilv', 'arst', ...) tie, the first keys win whatever the spills and processes."""
+    classes = expected_classes(corpus.read_text(encoding='utf-8'))
+    ranked = sorted(classes.items(), key=lambda item: (-len(item[1]), item[0]))
+    expected = [(len(words), key, words) for key, words in ranked[:top_k]]
+    for processes, max_words in [(1, 1_000_000), (2, 3)]:
+        top = build_corpus_index(corpus, tmp_path / f'words{processes}.txt', chunk_size=300,
+                                 processes=processes, max_words=max_words, top_k=top_k, spill_dir=tmp_path)
+        assert top == expected
+    assert not list(tmp_path.glob('*.run'))
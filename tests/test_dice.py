@@ -0,0 +1,135 @@
+"""
+Batched and exact D&D character rolls against the sequential one-attempt-at-a-time loop.
+
+The rolls are random, so the samplers are compared by distribution (with fixed seeds, so the
+tests always see the same draws).
+"""
+from contextlib import redirect_stdout
+from fractions import Fraction
+from itertools import product
+import io
+import math
+import statistics
+
+import pytest
+
+import d_and_d
+from d_and_d import (CODE_SUMS, DChar, character_odds, chi_square_p_value, compare_samplers, decode_dice,
+                     roll_batched, roll_exact, sum_counts, threshold_probability)
+from common.random_streams import RandomStream
+
+
+def make_character(rng):
+    """A DChar that has not rolled yet (DChar() rolls and prints on creation)."""
+    character = DChar.__new__(DChar)
+    character.player_name = 'test'
+    character.rng = rng
+    character.characteristics = {}
+    return character
+
+
+def test_sum_counts_match_brute_force():
+    for num_dice, num_sides in [(1, 6), (2, 4), (3, 6), (4, 3)]:
+        brute = [0] * (num_dice * num_sides + 1)
+        for dice in product(range(1, num_sides + 1), repeat=num_dice):
+            brute[sum(dice)] += 1
+        counts = sum_counts(num_dice, num_sides)
+        assert counts[:len(brute)] == brute and not any(counts[len(brute):])
+
+
+def test_threshold_probability_and_odds():
+    assert threshold_probability(3) == 1 and threshold_probability(18) == Fraction(1, 216)
+    assert threshold_probability(19) == 0
+    probability, expected = character_odds(16)
+    assert probability == threshold_probability(16) ** 6 and expected == 1 / probability
+    assert character_odds(19) == (0, math.inf)
+
+
+def test_dice_codes():
+    for code in range(216):
+        a, b, c = decode_dice(code)
+        assert 36 * (a - 1) + 6 * (b - 1) + (c - 1) == code
+        assert CODE_SUMS[code] == a + b + c
+
+
+def test_batched_is_reproducible_and_passes():
+    first = roll_batched(RandomStream(5, ('dice',)), 14)
+    assert first == roll_batched(RandomStream(5, ('dice',)), 14)
+    attempts, rolls, passed = first
+    assert passed and attempts >= 1 and len(rolls) == 6 and min(rolls) >= 14
+
+
+def test_batched_first_attempt_always_passes_at_minimum():
+    attempts, rolls, passed = roll_batched(RandomStream(1), 3)
+    assert (attempts, passed) == (1, True) and all(3 <= r <= 18 for r in rolls)
+
+
+def test_batched_gives_up_after_max_attempts():
+    attempts, rolls, passed = roll_batched(RandomStream(1), 18, max_attempts=1000, block_size=300)
+    assert (attempts, passed) == (1000, False) and len(rolls) == 6
+
+
+def test_batched_and_sequential_attempts_agree(monkeypatch):
+    """Both samplers need a geometric number of attempts with mean 1 / p, compare their means."""
+    min_roll, characters = 10, 1500
+    probability, expected = character_odds(min_roll)
+    batched_rng, sequential_rng = RandomStream(11).spawn(2)
+    batched = [roll_batched(batched_rng, min_roll, block_size=64)[0] for _ in range(characters)]
+    sequential_character = make_character(sequential_rng)
+    monkeypatch.setattr(DChar, 'MIN_ROLL', min_roll)
+    with redirect_stdout(io.StringIO()):
+        sequential = [sequential_character.roll_sequential()[0] for _ in range(characters)]
+    # standard error of the mean of a geometric distribution
+    error = math.sqrt((1 - probability) / probability ** 2 / characters)
+    for attempts in (batched, sequential):
+        assert abs(statistics.fmean(attempts) - float(expected)) < 4 * error
+    assert abs(statistics.fmean(batched) - statistics.fmean(sequential)) < 4 * math.sqrt(2) * error
+
+
+def test_exact_rolls_are_in_range():
+    rng = RandomStream(3)
+    for min_roll in (3, 12, 17, 18):
+        rolls = roll_exact(rng, min_roll)
+        assert len(rolls) == 6 and all(min_roll <= r <= 18 for r in rolls)
+
+
+def test_exact_matches_rejection_sampling():
+    with redirect_stdout(io.StringIO()):
+        statistic, df, p_value = compare_samplers(min_roll=12, characters=800, rng=RandomStream(2021))
+    assert df == 6 and p_value > 0.001
+
+
+def test_chi_square_p_value():
+    # P(X >= df) for chi-square X with 1 and 2 degrees of freedom
+    assert chi_square_p_value(1.0, 1) == pytest.approx(0.3173105, rel=1e-6)
+    assert chi_square_p_value(2.0, 2) == pytest.approx(math.exp(-1), rel=1e-9)
+    assert chi_square_p_value(0.0, 4) == 1.0
+
+
+@pytest.mark.parametrize('engine', ['auto', 'exact', 'batched', 'sequential'])
+def test_engines_roll_qualifying_characters(monkeypatch, engine):
+    # the default MIN_ROLL needs about 10**8 attempts, too many for the rejection samplers
+    monkeypatch.setattr(DChar, 'MIN_ROLL', 11)
+    with redirect_stdout(io.StringIO()):
+        character = DChar('test', RandomStream(4), engine)
+    assert all(value >= DChar.MIN_ROLL for value in character.characteristics.values())
+
+
+@pytest.mark.parametrize('engine', ['auto', 'exact', 'batched', 'sequential'])
+def test_unreachable_min_roll(monkeypatch, engine):
+    monkeypatch.setattr(DChar, 'MIN_ROLL', 19)
+    with redirect_stdout(io.StringIO()), pytest.raises(ValueError):
+        DChar('test', RandomStream(4), engine)
+    with pytest.raises(ValueError):
+        roll_batched(RandomStream(4), 19)
+    with pytest.raises(ValueError):
+        roll_exact(RandomStream(4), 19)
+
+
+def test_unknown_engine():
+    with redirect_stdout(io.StringIO()), pytest.raises(ValueError):
+        DChar('test', RandomStream(4), 'loaded')
+
+
+def test_import_rolls_nothing():
+    assert not hasattr(d_and_d, 'flach')
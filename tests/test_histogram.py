@@ -0,0 +1,60 @@
+"""
+Letter counting of text, streams and files (in chunks and with worker processes) against a Counter of the text.
+"""
+from collections import Counter
+import io
+import random
+import string
+
+import pytest
+
+from histogram_v01 import LetterHistogram, count_file, count_stream, count_text
+
+TEXT = "The quick brown fox jumps over the lazy dog!  ÉCOLE café naïve straße 42\n" * 3
+
+
+def expected_counts(text):
+    counts = Counter(c for c in text.lower() if c in string.ascii_lowercase)
+    return [counts[c] for c in string.ascii_lowercase]
+
+
+@pytest.fixture(scope='module')
+def big_text():
+    rng = random.Random(12)
+    return ''.join(rng.choices(string.ascii_letters + ' .,\né', k=200_000))
+
+
+def test_count_text():
+    assert list(count_text(TEXT).counts) == expected_counts(TEXT)
+    assert list(count_text('').counts) == [0] * 26
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 1 << 22])
+def test_count_stream_matches_text(chunk_size):
+    data = TEXT.encode('utf-8')
+    assert count_stream(io.BytesIO(data), chunk_size) == count_text(TEXT)
+
+
+def test_count_stream_limit():
+    data = b'aaaabbbb'
+    assert count_stream(io.BytesIO(data), 3, limit=5) == count_text('aaaab')
+
+
+@pytest.mark.parametrize('processes', [1, 2, 3])
+def test_count_file(tmp_path, big_text, processes):
+    path = tmp_path / 'big.txt'
+    path.write_text(big_text, encoding='utf-8')
+    assert list(count_file(path, chunk_size=4096, processes=processes).counts) == expected_counts(big_text)
+
+
+def test_freq_dict():
+    histogram = LetterHistogram('Banana!')
+    assert histogram.freq_dict['a'] == ['a'] * 3 and histogram.freq_dict['n'] == ['n'] * 2
+    assert histogram.freq_dict['b'] == ['b'] and histogram.freq_dict['z'] == []
+    assert list(histogram.freq_dict) == list(string.ascii_lowercase)
+
+
+def test_from_file(tmp_path):
+    path = tmp_path / 'text.txt'
+    path.write_text(TEXT, encoding='utf-8')
+    assert LetterHistogram.from_file(path).letters == LetterHistogram(TEXT).letters
@@ -0,0 +1,160 @@
+"""
+Stage recording of common/instrumentation.py: off by default, nested runs and memory tracing.
+"""
+import io
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+from common import instrumentation
+from common.instrumentation import instrument, stage
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.enable(report_at_exit=False)
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@instrument('test.recursive')
+def countdown(n):
+    return countdown(n - 1) + 1 if n else 0
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    assert not instrumentation.is_enabled()
+    with stage('test.off'):
+        pass
+    assert countdown(3) == 3
+    assert instrumentation.summary() == {}
+
+
+def test_stages_are_recorded(instrumented):
+    for _ in range(3):
+        with stage('test.block'):
+            pass
+    summary = instrumentation.summary()
+    assert summary['test.block']['calls'] == 3 and summary['test.block']['seconds'] >= 0
+    assert summary['test.block']['peak_bytes'] is None
+
+
+def test_nested_runs_are_recorded_once(instrumented):
+    assert countdown(5) == 5
+    with stage('test.outer'):
+        with stage('test.outer'):
+            pass
+    summary = instrumentation.summary()
+    assert summary['test.recursive']['calls'] == 1 and summary['test.outer']['calls'] == 1
+
+
+def test_exceptions_close_the_stage(instrumented):
+    with pytest.raises(KeyError):
+        with stage('test.raises'):
+            raise KeyError
+    with stage('test.raises'):
+        pass
+    assert instrumentation.summary()['test.raises']['calls'] == 2
+
+
+def test_memory(instrumented):
+    instrumentation.enable('memory', report_at_exit=False)
+    with stage('test.outer'):
+        with stage('test.inner'):
+            data = bytearray(1 << 20)
+        del data
+    summary = instrumentation.summary()
+    assert summary['test.inner']['peak_bytes'] >= 1 << 20
+    assert summary['test.outer']['peak_bytes'] >= summary['test.inner']['peak_bytes']
+    instrumentation.disable()
+    assert not tracemalloc.is_tracing()
+
+
+def test_disable_keeps_tracing_started_elsewhere(instrumented):
+    tracemalloc.start()
+    try:
+        instrumentation.enable('memory', report_at_exit=False)
+        instrumentation.disable()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_bad_mode():
+    with pytest.raises(ValueError):
+        instrumentation.enable('cycles', report_at_exit=False)
+
+
+def test_report_and_json(instrumented, tmp_path):
+    with stage('test.report'):
+        pass
+    output = io.StringIO()
+    instrumentation.report(output)
+    assert 'test.report' in output.getvalue()
+    path = tmp_path / 'summary.json'
+    instrumentation.dump_json(path)
+    assert json.loads(path.read_text()) == instrumentation.summary()
+
+
+def test_threads_do_not_share_open_stages(instrumented):
+    """A run of a stage in one thread is not a nested run of the same stage open in another."""
+    entered, release = threading.Event(), threading.Event()
+
+    def worker():
+        with stage('test.threads'):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    try:
+        assert entered.wait(5)
+        with stage('test.threads'):
+            with stage('test.threads'):
+                pass
+    finally:
+        release.set()
+        thread.join()
+    assert instrumentation.summary()['test.threads']['calls'] == 2
+
+
+def test_threads_do_not_share_memory_stacks(instrumented):
+    instrumentation.enable('memory', report_at_exit=False)
+    entered, release = threading.Event(), threading.Event()
+
+    def worker():
+        with stage('test.worker'):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    try:
+        assert entered.wait(5)
+        with stage('test.main'):
+            data = bytearray(1 << 20)
+        del data
+    finally:
+        release.set()
+        thread.join()
+    summary = instrumentation.summary()
+    assert summary['test.main']['peak_bytes'] >= 1 << 20
+    assert summary['test.worker']['calls'] == 1 and summary['test.worker']['peak_bytes'] is not None
+
+
+def test_disable_inside_a_stage(instrumented):
+    instrumentation.enable('memory', report_at_exit=False)
+    with stage('test.disabled'):
+        instrumentation.disable()
+    instrumentation.enable('memory', report_at_exit=False)
+    with stage('test.outer'):
+        with stage('test.inner'):
+            pass
+    summary = instrumentation.summary()
+    assert summary['test.disabled']['calls'] == 1 and summary['test.disabled']['peak_bytes'] is None
+    assert summary['test.outer']['peak_bytes'] is not None
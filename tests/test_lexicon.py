@@ -0,0 +1,183 @@
+"""
+The word list formats of common.lexicon on small fixture files: format detection, plain, lemmatized,
+frequency and agid entries, annotation marker stripping and the iter_words filters.
+"""
+import pytest
+
+from common.lexicon import ALPHABET, LexiconEntry, detect_format, iter_entries, iter_words, load_words, normalize
+
+# Annotation markers of 2of12inf.txt, 6of12.txt, 3of6game.txt and 3esl.txt, a repeated word, an accented word,
+# a phrase, an apostrophe and blank lines
+PLAIN = """\
+abandonments%
+abductor=
+abaci$
+Apple
+apple
+banana!
+café
+can't
+New York
+zebra#
+
+x
+"""
+
+LEMMATIZED = """\
+abide
+    abided, abides, abiding, abidingly, abode -> [abode]
+abode -> [abide]
+abstract
+    abstracted -> [abstracted], abstracting, abstractly, abstracts
+Ohio
+go
+    goes, going, gone, went
+"""
+
+FREQUENCY = """\
+----- 1 -----
+be
+    am, are, been, is, was, were
+the
+----- 2 -----
+a
+    an
+I
+    me
+(American)
+good
+    best*, better*, goodness
+her*
+"""
+
+AGID = """\
+Automatically Generated Inflection Database (AGID)
+
+August 19, 2000
+
+  <word> [{explanation}] <POS>: <inflected forms>
+The "|" and "/" symbols separate variants, this line is documentation: not an entry.
+
+abandon V: abandoned | abandoning | abandons
+dive V: dived / dove  diving  dives
+hang V: hung {suspend} | hanged {execute}  hanging  hangs
+hoof N: hoofs / hooves~
+good A: better  best
+"""
+
+
+@pytest.fixture
+def word_list(tmp_path):
+    """Write text to a word list in tmp_path and return its path."""
+    def write(text, name='words.txt'):
+        path = tmp_path / name
+        path.write_text(text, encoding='latin-1')
+        return str(path)
+    return write
+
+
+@pytest.mark.parametrize('text, fmt', [(PLAIN, 'plain'), (LEMMATIZED, 'lemmatized'), (FREQUENCY, 'frequency'),
+                                       (AGID, 'agid'), ('', 'plain')])
+def test_detect_format(word_list, text, fmt):
+    assert detect_format(word_list(text)) == fmt
+
+
+@pytest.mark.parametrize('token, word', [('abandonments%', 'abandonments'), ('abductor=', 'abductor'),
+                                         ('abaci$', 'abaci'), ('her*', 'her'), ('(American)', 'american'),
+                                         ('  abode -> [abide]', 'abode'), ('^~!&+:;<>#', ''),
+                                         ("can't", "can't"), ('New York\n', 'new york')])
+def test_normalize(token, word):
+    assert normalize(token) == word
+
+
+def test_normalize_keeps_case():
+    assert normalize('(American)*', lower=False) == 'American'
+
+
+class TestPlain:
+    def test_words(self, word_list):
+        path = word_list(PLAIN)
+        assert load_words(path) == ['abandonments', 'abductor', 'abaci', 'apple', 'banana', 'café', "can't",
+                                    'new york', 'zebra', 'x']
+        assert load_words(path, lower=False, unique=False)[3:5] == ['Apple', 'apple']
+
+    def test_entries_match_fast_path(self, word_list):
+        """iter_words reads plain files without building entries, both must give the same words."""
+        path = word_list(PLAIN + '(aside)\nabode -> [abide]\n')
+        assert [e.word for e in iter_entries(path)] == list(iter_words(path, unique=False))
+        assert all(e.word == e.lemma and e.rank is None for e in iter_entries(path))
+
+    def test_alphabet(self, word_list):
+        path = word_list(PLAIN)
+        assert load_words(path, alphabet=ALPHABET) == ['abandonments', 'abductor', 'abaci', 'apple', 'banana',
+                                                       'zebra', 'x']
+        assert load_words(path, alphabet=ALPHABET + "' ") == ['abandonments', 'abductor', 'abaci', 'apple',
+                                                               'banana', "can't", 'new york', 'zebra', 'x']
+        assert load_words(path, alphabet='abci') == ['abaci']
+
+    def test_lengths(self, word_list):
+        path = word_list(PLAIN)
+        assert load_words(path, min_length=6, max_length=8) == ['abductor', 'banana', 'new york']
+        assert load_words(path, max_length=1) == ['x']
+
+
+class TestLemmatized:
+    def test_entries(self, word_list):
+        entries = list(iter_entries(word_list(LEMMATIZED)))
+        assert entries[:7] == [LexiconEntry('abide', 'abide', None), LexiconEntry('abided', 'abide', None),
+                               LexiconEntry('abides', 'abide', None), LexiconEntry('abiding', 'abide', None),
+                               LexiconEntry('abidingly', 'abide', None), LexiconEntry('abode', 'abide', None),
+                               LexiconEntry('abode', 'abode', None)]
+        assert LexiconEntry('abstracting', 'abstract', None) in entries
+        assert LexiconEntry('went', 'go', None) == entries[-1]
+
+    def test_words(self, word_list):
+        path = word_list(LEMMATIZED)
+        assert load_words(path) == ['abide', 'abided', 'abides', 'abiding', 'abidingly', 'abode', 'abstract',
+                                    'abstracted', 'abstracting', 'abstractly', 'abstracts', 'ohio', 'go', 'goes',
+                                    'going', 'gone', 'went']
+        assert load_words(path, inflections=False) == ['abide', 'abode', 'abstract', 'ohio', 'go']
+        assert load_words(path, lower=False, inflections=False)[3] == 'Ohio'
+
+
+class TestFrequency:
+    def test_entries(self, word_list):
+        entries = list(iter_entries(word_list(FREQUENCY)))
+        assert entries[:3] == [LexiconEntry('be', 'be', 1), LexiconEntry('am', 'be', 1),
+                               LexiconEntry('are', 'be', 1)]
+        assert LexiconEntry('the', 'the', 1) in entries and LexiconEntry('me', 'i', 2) in entries
+        # parentheses and '*' markers are unwrapped
+        assert LexiconEntry('american', 'american', 2) in entries
+        assert entries[-3:] == [LexiconEntry('better', 'good', 2), LexiconEntry('goodness', 'good', 2),
+                                LexiconEntry('her', 'her', 2)]
+
+    def test_words(self, word_list):
+        path = word_list(FREQUENCY)
+        assert load_words(path, inflections=False) == ['be', 'the', 'a', 'i', 'american', 'good', 'her']
+        # section lines are not words
+        assert not any('-' in word or word.isdigit() for word in load_words(path))
+
+
+class TestAgid:
+    def test_entries(self, word_list):
+        entries = list(iter_entries(word_list(AGID)))
+        # documentation lines are skipped
+        assert entries[0] == LexiconEntry('abandon', 'abandon', None)
+        assert [e.word for e in entries if e.lemma == 'abandon'] == ['abandon', 'abandoned', 'abandoning',
+                                                                       'abandons']
+        assert [e.word for e in entries if e.lemma == 'dive'] == ['dive', 'dived', 'dove', 'diving', 'dives']
+        # explanations are dropped
+        assert [e.word for e in entries if e.lemma == 'hang'] == ['hang', 'hung', 'hanged', 'hanging', 'hangs']
+        # '~' marks a questionable form, the word is kept
+        assert [e.word for e in entries if e.lemma == 'hoof'] == ['hoof', 'hoofs', 'hooves']
+        assert all(e.rank is None for e in entries)
+
+    def test_words(self, word_list):
+        path = word_list(AGID)
+        assert load_words(path, inflections=False) == ['abandon', 'dive', 'hang', 'hoof', 'good']
+        assert load_words(path, max_length=4) == ['dive', 'dove', 'hang', 'hung', 'hoof', 'good', 'best']
+
+
+def test_unknown_format(word_list):
+    with pytest.raises(ValueError):
+        list(iter_entries(word_list(PLAIN), fmt='csv'))
@@ -0,0 +1,163 @@
+"""
+NGramTables against brute force counts of the n-grams of padded words, streaming vs whole-text counting,
+saving and loading, and the validation of words and queries.
+"""
+from collections import Counter
+import io
+import random
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+from common.lexicon import load_words
+from common.ngrams import ALPHABET, BASE, BOUNDARY, MAX_N, NGramTables, gram_index
+
+SMALL_WORDS = ['a', 'i', 'cat', 'cats', 'scat', 'act', 'tact', 'aaaaa', 'queue', 'rhythm', 'zz', 'strengths']
+
+
+def brute_force_counts(words, n):
+    """Counter of the n-grams of the words padded with BOUNDARY at both ends."""
+    counts = Counter()
+    for word in words:
+        padded = f'{BOUNDARY}{word}{BOUNDARY}'
+        counts.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return counts
+
+
+@pytest.fixture(scope='module')
+def dictionary_words():
+    return load_words(ANAGRAM_DICTIONARY, alphabet=ALPHABET)
+
+
+@pytest.fixture(scope='module')
+def dictionary_ngrams(dictionary_words):
+    return NGramTables.from_words(dictionary_words)
+
+
+@pytest.mark.parametrize('max_n', range(1, MAX_N + 1))
+def test_tables_match_brute_force(max_n):
+    ngrams = NGramTables.from_words(SMALL_WORDS, max_n)
+    assert ngrams.words == len(SMALL_WORDS)
+    for n in range(1, max_n + 1):
+        expected = brute_force_counts(SMALL_WORDS, n)
+        assert sum(ngrams.tables[n - 1]) == sum(expected.values())
+        for gram, count in expected.items():
+            assert ngrams.count(gram) == count
+
+
+def test_dictionary_tables_match_brute_force(dictionary_words, dictionary_ngrams):
+    rng = random.Random(4)
+    for n in range(1, MAX_N + 1):
+        expected = brute_force_counts(dictionary_words, n)
+        assert sum(dictionary_ngrams.tables[n - 1]) == sum(expected.values())
+        for gram in rng.sample(sorted(expected), min(500, len(expected))):
+            assert dictionary_ngrams.count(gram) == expected[gram]
+
+
+def test_gram_index():
+    assert gram_index(BOUNDARY) == 0 and gram_index('a') == 1 and gram_index('z') == BASE - 1
+    assert gram_index('ba') == 2 * BASE + 1
+    # characters coded below BASE by their code point are not symbols either
+    for gram in ('A', 'é', '-', 'a b', '\x00', 'a\x01', '\x1a', '\x1b', 'ĀĀ', '€'):
+        with pytest.raises(ValueError):
+            gram_index(gram)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 64, 1 << 20])
+def test_stream_matches_whole_text(chunk_size):
+    text = "The cat's CATS scattered, tact-fully!\nRhythm & queues: 42 strengths... a I zz"
+    streamed = NGramTables().add_stream(io.StringIO(text), chunk_size)
+    whole = NGramTables().add_text(text)
+    assert streamed.tables == whole.tables and streamed.words == whole.words == 13
+
+
+def test_add_text_finds_lower_case_words():
+    assert NGramTables().add_text('Cat, cat! CAT').tables == NGramTables.from_words(['cat'] * 3).tables
+
+
+def test_save_and_load(tmp_path):
+    for max_n in (1, MAX_N):
+        ngrams = NGramTables.from_words(SMALL_WORDS, max_n)
+        path = tmp_path / f'ngrams{max_n}.bin'
+        ngrams.save(path)
+        loaded = NGramTables.load(path)
+        assert loaded.max_n == max_n and loaded.tables == ngrams.tables
+        assert loaded.words == ngrams.words == len(SMALL_WORDS)
+
+
+def test_save_and_load_text(tmp_path):
+    ngrams = NGramTables().add_text('The cat sat on the mat.')
+    ngrams.save(tmp_path / 'text.bin')
+    assert NGramTables.load(tmp_path / 'text.bin').words == 6
+
+
+@pytest.mark.parametrize('contents', [b'x' * 64, b'', b'NGRAMS02', b'NGRAMS01\x04' + b'x' * 64])
+def test_load_rejects_other_files(tmp_path, contents):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(contents)
+    with pytest.raises(ValueError):
+        NGramTables.load(path)
+
+
+class TestValidation:
+    @pytest.mark.parametrize('max_n', [0, MAX_N + 1])
+    def test_max_n(self, max_n):
+        with pytest.raises(ValueError):
+            NGramTables(max_n)
+
+    @pytest.mark.parametrize('word', ['', 'Cat', "can't", 'café', 'two words', 'a_b'])
+    def test_bad_words(self, word):
+        ngrams = NGramTables()
+        with pytest.raises(ValueError):
+            ngrams.add_words(['cat', word, 'dog'])
+        # the words before the bad one stay counted, nothing else
+        assert ngrams.words == 1 and ngrams.tables == NGramTables.from_words(['cat']).tables
+
+    @pytest.mark.parametrize('gram', ['', 'abcde'])
+    def test_gram_length(self, gram):
+        with pytest.raises(ValueError):
+            NGramTables().count(gram)
+
+
+class TestQueries:
+    def test_empty_fragments(self):
+        ngrams = NGramTables.from_words(SMALL_WORDS)
+        assert ngrams.is_plausible('') and ngrams.is_plausible('', start=True)
+        # an empty word never occurs
+        assert not ngrams.is_plausible('', start=True, end=True)
+        assert ngrams.is_plausible_prefix('') and ngrams.is_plausible_suffix('')
+        assert ngrams.score('') == 0.0
+        empty = NGramTables()
+        assert not empty.is_plausible_prefix('') and not empty.is_plausible_suffix('')
+        assert not empty.is_plausible('', start=True)
+
+    @pytest.mark.parametrize('max_n', range(1, MAX_N + 1))
+    def test_words_are_plausible(self, max_n):
+        ngrams = NGramTables.from_words(SMALL_WORDS, max_n)
+        for word in SMALL_WORDS:
+            assert ngrams.is_plausible(word, start=True, end=True)
+            assert ngrams.score(word, start=True, end=True) > -float('inf')
+            for i in range(len(word) + 1):
+                assert ngrams.is_plausible_prefix(word[:i]) and ngrams.is_plausible_suffix(word[i:])
+
+    def test_implausible_fragments(self):
+        ngrams = NGramTables.from_words(SMALL_WORDS)
+        assert not ngrams.is_plausible('xq')
+        assert not ngrams.is_plausible('sc', end=True) and ngrams.is_plausible('sc')
+        assert not ngrams.is_plausible_prefix('ts') and not ngrams.is_plausible_suffix('sc')
+        assert ngrams.score('xq') == -float('inf')
+
+    def test_prefix_and_suffix_agree_with_full_check(self, dictionary_ngrams):
+        """The O(1) checks look at fewer n-grams, so every fragment passing the full check passes them."""
+        rng = random.Random(9)
+        for _ in range(3000):
+            fragment = ''.join(rng.choices('etaoinshrdlucmq', k=rng.randrange(1, 8)))
+            if dictionary_ngrams.is_plausible(fragment, start=True):
+                assert dictionary_ngrams.is_plausible_prefix(fragment)
+            if dictionary_ngrams.is_plausible(fragment, end=True):
+                assert dictionary_ngrams.is_plausible_suffix(fragment)
+
+    def test_score_ranks_common_letters_higher(self, dictionary_ngrams):
+        assert dictionary_ngrams.score('the', start=True) > dictionary_ngrams.score('phl', start=True)
+        assert dictionary_ngrams.score('ing', end=True) > dictionary_ngrams.score('ign', end=True)
+        assert dictionary_ngrams.score('tion') <= 0.0
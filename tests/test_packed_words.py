@@ -0,0 +1,154 @@
+"""
+PackedWords views, saved / memory-mapped and shared memory copies, and PackedWordIndex.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+
+import pytest
+
+from common.packed_words import ITER_CHUNK, PackedWordIndex, PackedWords
+
+WORDS = ['apple', 'banana', 'café', 'naïve', '', 'zebra', 'straße', 'a', 'ab'] + [f'word{i}' for i in range(10_000)]
+
+
+@pytest.fixture
+def packed():
+    return PackedWords.from_words(WORDS)
+
+
+def test_sequence(packed):
+    assert len(packed) == len(WORDS)
+    assert list(packed) == WORDS
+    assert packed.tolist() == WORDS
+    assert packed[2] == 'café' and packed[-1] == WORDS[-1]
+    with pytest.raises(IndexError):
+        packed[len(WORDS)]
+    assert 'naïve' in packed and 'nope' not in packed
+    assert packed.index('zebra') == WORDS.index('zebra')
+
+
+def test_iteration_crosses_chunks(packed):
+    assert len(WORDS) > 2 * ITER_CHUNK
+    assert list(packed[ITER_CHUNK - 3:2 * ITER_CHUNK + 5]) == WORDS[ITER_CHUNK - 3:2 * ITER_CHUNK + 5]
+
+
+@pytest.mark.parametrize('start, stop', [(0, 0), (3, 3), (1, 7), (-5, None), (None, 4), (8, 2), (0, 100_000)])
+def test_slices_are_views(packed, start, stop):
+    view = packed[start:stop]
+    assert list(view) == WORDS[start:stop]
+    assert len(view) == len(WORDS[start:stop])
+    assert view.blob is packed.blob
+    # a view of a view
+    assert list(view[1:3]) == WORDS[start:stop][1:3]
+
+
+def test_stepped_slice(packed):
+    assert packed[1:20:3] == WORDS[1:20:3]
+
+
+def test_empty():
+    empty = PackedWords.from_words([])
+    assert len(empty) == 0 and list(empty) == [] and empty.tolist() == []
+
+
+def test_save_and_open(packed, tmp_path):
+    path = tmp_path / 'words.packed'
+    packed.save(path)
+    opened = PackedWords.open(path)
+    try:
+        assert list(opened) == WORDS
+        assert opened[4] == '' and opened[5] == 'zebra'
+    finally:
+        opened.close()
+
+
+def test_saved_view_is_rebased(packed, tmp_path):
+    path = tmp_path / 'view.packed'
+    packed[100:200].save(path)
+    opened = PackedWords.open(path)
+    try:
+        assert list(opened) == WORDS[100:200]
+    finally:
+        opened.close()
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        PackedWords.open(path)
+
+
+def _attached_words(name, start, stop):
+    """Read words from a shared memory block in another process."""
+    words = PackedWords.attach(name)
+    try:
+        return list(words[start:stop])
+    finally:
+        words.close()
+
+
+def test_shared_memory(packed):
+    block = packed.to_shared_memory()
+    try:
+        attached = PackedWords.attach(block.name)
+        assert list(attached) == WORDS
+        attached.close()
+        with ProcessPoolExecutor(2) as executor:
+            parts = list(executor.map(_attached_words, [block.name] * 3, [0, 5, 9000], [5, 9000, None]))
+        assert parts[0] + parts[1] + parts[2] == WORDS
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_attach_does_not_track_or_patch(packed, monkeypatch):
+    """Attaching leaves the block to its creator, without touching resource_tracker.register."""
+    block = packed.to_shared_memory()
+    registered = []
+    monkeypatch.setattr(resource_tracker, 'register', lambda name, rtype: registered.append(name))
+    try:
+        with ThreadPoolExecutor(4) as executor:
+            attached = list(executor.map(lambda _: PackedWords.attach(block.name), range(8)))
+        assert registered == []
+        assert all(words.tolist() == WORDS for words in attached)
+        for words in attached:
+            words.close()
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_attach_missing_block():
+    with pytest.raises(FileNotFoundError):
+        PackedWords.attach('packed_words_missing_block')
+
+
+class TestPackedWordIndex:
+    def test_index(self, packed):
+        index = PackedWordIndex.build(packed)
+        assert len(index) == len(WORDS)
+        for i in (0, 2, 3, 4, 6, len(WORDS) - 1):
+            assert index.index(WORDS[i]) == i
+        assert index.index('cafe') == -1
+        assert 'straße' in index and 'strasse' not in index
+
+    def test_duplicates_return_the_first(self):
+        index = PackedWordIndex.build(PackedWords.from_words(['x', 'y', 'x']))
+        assert index.index('x') == 0
+
+    def test_empty(self):
+        index = PackedWordIndex.build(PackedWords.from_words([]))
+        assert index.index('a') == -1 and index.index('') == -1
+
+    def test_save_and_open(self, packed, tmp_path):
+        packed.save(tmp_path / 'words.packed')
+        PackedWordIndex.build(packed).save(tmp_path / 'words.index')
+        words = PackedWords.open(tmp_path / 'words.packed')
+        index = PackedWordIndex.open(tmp_path / 'words.index', words)
+        try:
+            assert all(index.index(w) == i for i, w in enumerate(WORDS[:500]))
+            assert 'nope' not in index
+        finally:
+            index.close()
+            words.close()
@@ -0,0 +1,81 @@
+"""
+PalindromePhrases against a brute force search over all tuples of words, and the time budget.
+"""
+import itertools
+import time
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+from palindrome_phrases import PalindromePhrases
+from common.lexicon import ALPHABET, load_words
+
+# Palindromes, reversal pairs, words that only make palindromes with two others, and single letters
+SMALL_WORDS = ['a', 'i', 'aa', 'ab', 'ba', 'aba', 'abba', 'man', 'plan', 'canal', 'panama', 'race', 'car',
+               'ecar', 'racecar', 'no', 'on', 'noon', 'step', 'on', 'pets', 'was', 'it', 'saw', 'top', 'spot',
+               'stop', 'pots', 'x', 'xx', "can't", 'Abba']
+
+
+def brute_force_phrases(words, max_words, min_words):
+    """Every tuple of min_words to max_words words whose letters read the same forwards and backwards."""
+    words = sorted({w for w in words if w.isalpha()})
+    phrases = set()
+    for n in range(min_words, max_words + 1):
+        for phrase in itertools.product(words, repeat=n):
+            letters = ''.join(phrase)
+            if letters == letters[::-1]:
+                phrases.add(phrase)
+    return phrases
+
+
+@pytest.mark.parametrize('max_words, min_words', [(1, 1), (2, 1), (2, 2), (3, 1), (3, 2), (3, 3)])
+def test_matches_brute_force(max_words, min_words):
+    phrases = list(PalindromePhrases(SMALL_WORDS).phrases(max_words, min_words))
+    # built in canonical order: each phrase is yielded exactly once
+    assert len(phrases) == len(set(phrases))
+    assert set(phrases) == brute_force_phrases(SMALL_WORDS, max_words, min_words)
+
+
+def test_searches_can_be_repeated():
+    generator = PalindromePhrases(SMALL_WORDS)
+    first = list(generator.phrases(3))
+    # the dead-end states memoized by the first search are valid for the second
+    assert list(generator.phrases(3)) == first
+    assert sorted(generator.phrases(2)) == sorted(brute_force_phrases(SMALL_WORDS, 2, 2))
+
+
+def test_examples():
+    phrases = set(PalindromePhrases(SMALL_WORDS).phrases(3))
+    assert {('race', 'car'), ('step', 'on', 'no', 'pets'), ('was', 'it', 'a', 'car')} & phrases == \
+        {('race', 'car')}
+    assert ('top', 'spot') in phrases and ('ab', 'ba') in phrases and ('no', 'on') in phrases
+
+
+def test_empty_word_list():
+    generator = PalindromePhrases([])
+    assert list(generator.phrases(3, 1)) == [] and not generator.expired
+
+
+@pytest.fixture(scope='module')
+def dictionary_generator():
+    return PalindromePhrases(load_words(ANAGRAM_DICTIONARY, alphabet=ALPHABET))
+
+
+class TestTimeBudget:
+    def test_expired_budget_stops_search(self, dictionary_generator):
+        time_start = time.perf_counter()
+        phrases = list(dictionary_generator.phrases(3, time_budget=0.0))
+        assert dictionary_generator.expired
+        assert time.perf_counter() - time_start < 1.0
+        assert len(phrases) == len(set(phrases))
+
+    def test_short_budget(self, dictionary_generator):
+        phrases = list(dictionary_generator.phrases(4, time_budget=0.2))
+        assert dictionary_generator.expired and phrases
+        assert all(''.join(p) == ''.join(p)[::-1] for p in phrases)
+
+    def test_expired_search_does_not_poison_memo(self):
+        generator = PalindromePhrases(SMALL_WORDS)
+        assert list(generator.phrases(3, time_budget=0.0)) == [] and generator.expired
+        assert set(generator.phrases(3)) == brute_force_phrases(SMALL_WORDS, 3, 2)
+        assert not generator.expired
@@ -0,0 +1,63 @@
+"""
+Palingram run modes ('index', 'lists') and the parallel search against the original 'sets' mode.
+"""
+from contextlib import redirect_stdout
+import io
+import os
+
+import pytest
+
+from tests import ROOT
+from palindrome_v01 import RUN_MODES, find_palingrams, find_palingrams_index
+from palingrams_parallel import find_palingrams_parallel
+from common.lexicon import ALPHABET, load_words
+
+# Palindromes, words that are palindromes once another word is added before or after them, and single letters
+SMALL_WORDS = sorted({'a', 'i', 'aa', 'ab', 'ba', 'abba', 'nurses', 'run', 'stack', 'cats', 'kayak', 'ak',
+                      'devil', 'lived', 'ned', 'den', 'dennis', 'sinned', 'step', 'pets', 'on', 'no', 'noon',
+                      'x', 'xx', 'xxx', 'race', 'car', 'ecar', 'racecar'})
+DICTIONARY = os.path.join(ROOT, 'proj06_magic_spells', 'dictionaries', '12dicts-6.0.2', 'International',
+                          '2of4brif.txt')
+
+
+def palingrams(words, run_mode):
+    with redirect_stdout(io.StringIO()):
+        return find_palingrams(words, run_mode, verbose=False)
+
+
+@pytest.fixture(scope='module')
+def dictionary_words():
+    return sorted(set(load_words(DICTIONARY, alphabet=ALPHABET)))
+
+
+@pytest.mark.parametrize('run_mode', RUN_MODES)
+def test_run_modes_match_sets_on_edge_cases(run_mode):
+    assert palingrams(SMALL_WORDS, run_mode) == palingrams(SMALL_WORDS, 'sets')
+
+
+def test_known_palingrams():
+    pairs = palingrams(SMALL_WORDS, 'sets')
+    for pair in [('nurses', 'run'), ('stack', 'cats'), ('devil', 'lived'), ('dennis', 'sinned'), ('race', 'car')]:
+        assert pair in pairs
+
+
+def test_index_matches_sets_on_dictionary(dictionary_words):
+    assert palingrams(dictionary_words, 'index') == palingrams(dictionary_words, 'sets')
+    assert sorted(find_palingrams_index(dictionary_words)) == palingrams(dictionary_words, 'sets')
+
+
+def test_empty_word_list():
+    for run_mode in RUN_MODES:
+        assert palingrams([], run_mode) == []
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_parallel_matches_sets_on_edge_cases(ordered):
+    pairs = list(find_palingrams_parallel(SMALL_WORDS, processes=2, chunks_per_process=3, ordered=ordered))
+    if not ordered:
+        pairs.sort()
+    assert pairs == palingrams(SMALL_WORDS, 'sets')
+
+
+def test_parallel_matches_sets_on_dictionary(dictionary_words):
+    assert list(find_palingrams_parallel(dictionary_words, processes=2)) == palingrams(dictionary_words, 'sets')
@@ -0,0 +1,128 @@
+"""
+Streaming pig latin translation (translate_text, translate_stream) against the original PigLatin.pig_sentence,
+and compound word splitting.
+"""
+import io
+import random
+
+import pytest
+
+from pig_latin_v01 import (CompoundSplitter, PigLatin, cache_stats, compound_pig_word, fast_pig_word, iter_chunks,
+                           translate_stream, translate_text)
+
+# Vowels first, qu, y as the only vowel, no vowels at all, capitals and apostrophes
+EDGE_WORDS = ['equal', 'eye', 'apple', 'Queen', 'squeal', 'quiet', 'rhythm', 'by', 'hmm', 'Speaking', 'Pig',
+              'Latin', 'porcine', "can't", "'tis", "rock'n'roll", 'I', 'a', 'y', 'Y', 'QUIZ', 'sTrEeT', 'yes']
+
+
+def random_text(seed, length=5000):
+    """Text of random words, punctuation, apostrophes, digits and line endings."""
+    rng = random.Random(seed)
+    pieces = []
+    while sum(map(len, pieces)) < length:
+        pieces.append(rng.choice(EDGE_WORDS) if rng.random() < 0.5 else
+                      ''.join(rng.choices('abcdefghijklmnopqrstuvwxyzQUY', k=rng.randrange(1, 12))))
+        pieces.append(rng.choice([' ', ' ', ', ', '. ', '!\n', '\r\n', "'", ' 42 ', '-', 'é', '\t']))
+    return ''.join(pieces)
+
+
+def stream(text, **kwargs):
+    output = io.StringIO()
+    stats = translate_stream(io.StringIO(text), output, **kwargs)
+    return output.getvalue(), stats
+
+
+@pytest.mark.parametrize('word', EDGE_WORDS)
+def test_fast_pig_word_matches_pig_word(word):
+    word = word.replace("'", '')
+    assert fast_pig_word(word) == PigLatin.pig_word(word)
+
+
+def test_pig_word_examples():
+    assert PigLatin.pig_word('equal') == 'equalway'
+    assert PigLatin.pig_word('eye') == 'eyeway'
+    assert PigLatin.pig_word('every') == 'everyway' and PigLatin.pig_word('any') == 'anyway'
+    assert PigLatin.pig_word('queen') == 'eenquay'
+    assert PigLatin.pig_word('rhythm') == 'ythmrhay'
+    assert PigLatin.pig_word('hmm') == 'hmmway'
+    assert PigLatin.pig_sentence('Speaking Pig Latin does not make one porcine!') == \
+        'Eakingspay Igpay Atinlay oesday otnay akemay oneway orcinepay!'
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_translate_text_matches_pig_sentence(seed):
+    text = random_text(seed)
+    assert translate_text(text) == PigLatin.pig_sentence(text)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 20])
+def test_stream_matches_whole_text(chunk_size):
+    text = random_text(chunk_size)
+    translated, stats = stream(text, chunk_size=chunk_size)
+    assert translated == PigLatin.pig_sentence(text)
+    assert stats['characters'] == len(text)
+
+
+def test_stream_with_processes():
+    text = random_text(99, length=50_000)
+    translated, stats = stream(text, chunk_size=1000, processes=2)
+    assert translated == PigLatin.pig_sentence(text)
+    assert stats['hits'] + stats['misses'] > 0
+
+
+@pytest.mark.parametrize('text', ['', 'word', "can't", "'", '!!!', 'a b', 'end.\n'])
+def test_stream_short_texts(text):
+    assert stream(text, chunk_size=2)[0] == PigLatin.pig_sentence(text)
+
+
+def test_chunks_never_split_words():
+    text = "one two three can't four"
+    chunks = list(iter_chunks(io.StringIO(text), 4))
+    assert ''.join(chunks) == text
+    assert all(not chunk[-1].isalpha() for chunk in chunks[:-1])
+    assert "can't" in ' '.join(chunks).split()
+
+
+def test_cache_hits():
+    stream('the cat and the hat and the bat', cache_size=10)
+    stats = cache_stats()
+    assert stats['hits'] == 3 and stats['misses'] == 5 and stats['max_size'] == 10
+
+
+@pytest.fixture(scope='module')
+def splitter():
+    return CompoundSplitter(['moon', 'walk', 'car', 'pet', 'carpet', 'base', 'ball', 'to', 'get', 'her', 'a'])
+
+
+class TestCompounds:
+    def test_split(self, splitter):
+        assert splitter.split('moonwalk') == ('moon', 'walk')
+        assert splitter.split('Moonwalk') == ('Moon', 'walk')
+        assert splitter.split('BASEBALL') == ('BASE', 'ball')
+        assert splitter.split('carpetball') == ('carpet', 'ball')
+
+    def test_words_are_kept_whole(self, splitter):
+        assert splitter.split('carpet') == ('carpet',)
+        assert splitter.split('moon') == ('moon',)
+
+    def test_unsplittable_words(self, splitter):
+        # pieces shorter than MIN_PIECE_LENGTH are not used: 'together' is not 'to get her'
+        assert splitter.split('together') == ('together',)
+        assert splitter.split('moonx') == ('moonx',)
+        assert splitter.split('') == ('',)
+
+    def test_pig_word(self, splitter):
+        assert splitter.pig_word('moonwalk') == 'oonmay alkway'
+        assert splitter.pig_word('carpet') == 'arpetcay'
+
+    def test_dictionary(self):
+        assert compound_pig_word('moonwalk') == 'oonmay alkway'
+        for word in ('together', 'carpet', 'mudslide'):
+            assert compound_pig_word(word) == fast_pig_word(word)
+
+    def test_stream_matches_whole_text(self):
+        text = random_text(7, length=3000) + ' moonwalk Moonwalk'
+        expected = translate_text(text, compounds=True)
+        assert 'oonmay alkway' in expected
+        for chunk_size in (5, 1 << 20):
+            assert stream(text, chunk_size=chunk_size, compounds=True)[0] == expected
@@ -0,0 +1,109 @@
+"""
+PigLatinDecoder round trips of fast_pig_word over the dictionary, frequency ranked tie-breaking,
+the rule used for words that are not in the index, and streaming decoding.
+"""
+import io
+import random
+
+import pytest
+
+from pig_latin_decoder import PigLatinDecoder
+from pig_latin_v01 import DEFAULT_DICTIONARY, fast_pig_word, translate_text
+from common.lexicon import ALPHABET, load_words
+from common.word_frequency import WordFrequency, load_word_frequency
+
+SMALL_WORDS = ['wad', 'ad', 'string', 'quick', 'one', 'hello', 'pig', 'latin', 'rhythm', 'apple', 'waddle',
+               'addle', 'swaddle', 'waddles', 'addles']
+
+
+@pytest.fixture(scope='module')
+def dictionary_words():
+    return load_words(DEFAULT_DICTIONARY, alphabet=ALPHABET)
+
+
+@pytest.fixture(scope='module')
+def decoder():
+    return PigLatinDecoder.from_dictionary()
+
+
+class TestRoundTrip:
+    def test_dictionary_sample(self, decoder, dictionary_words):
+        rng = random.Random(31)
+        for word in rng.sample(dictionary_words, 3000):
+            pig_word = fast_pig_word(word)
+            candidates = decoder.candidates(pig_word)
+            assert word in candidates
+            assert decoder.decode_word(pig_word) == candidates[0]
+            if len(candidates) == 1:
+                assert decoder.decode_word(pig_word) == word
+                assert decoder.decode_word(pig_word.capitalize()) == word.capitalize()
+
+    def test_most_words_round_trip(self, decoder, dictionary_words):
+        decoded = sum(decoder.decode_word(fast_pig_word(w)) == w for w in dictionary_words)
+        assert decoded / len(dictionary_words) > 0.99
+
+    def test_decode_text(self, decoder):
+        text = 'Speaking Pig Latin does not make one porcine!\nA quick string, in rhythm.'
+        assert decoder.decode_text(translate_text(text)) == text
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 64, 1 << 20])
+    def test_decode_stream(self, decoder, chunk_size):
+        text = 'Eakingspay Igpay Atinlay oesday otnay akemay oneway orcinepay!\n' * 5
+        output = io.StringIO()
+        stats = decoder.decode_stream(io.StringIO(text), output, chunk_size)
+        assert output.getvalue() == decoder.decode_text(text)
+        assert output.getvalue().startswith('Speaking Pig Latin does not make one porcine!\n')
+        assert stats['characters'] == len(text)
+
+
+class TestTieBreaking:
+    def test_dictionary_order_without_frequency(self):
+        decoder = PigLatinDecoder(SMALL_WORDS)
+        assert decoder.candidates('adway') == ('wad', 'ad')
+        assert decoder.candidates('addlesway') == ('swaddle', 'waddles', 'addles')
+        assert decoder.decode_word('adway') == 'wad'
+
+    def test_frequency_ranked(self, tmp_path):
+        path = tmp_path / 'frq.txt'
+        path.write_text('----- 1 -----\nad\naddles\n----- 2 -----\nwaddles\n', encoding='latin-1')
+        decoder = PigLatinDecoder(SMALL_WORDS, WordFrequency(str(path), None))
+        assert decoder.candidates('adway') == ('ad', 'wad')
+        # unranked words keep their dictionary order, after the ranked ones
+        assert decoder.candidates('addlesway') == ('addles', 'waddles', 'swaddle')
+        assert decoder.decode_word('Adway') == 'Ad'
+
+    def test_dictionary_frequency(self, decoder):
+        frequency = load_word_frequency()
+        assert decoder.candidates('adway') == ('ad', 'wad')
+        for candidates in decoder.index.values():
+            ranks = [frequency.rank(w) for w in candidates]
+            assert ranks == sorted(ranks)
+
+
+@pytest.fixture(scope='module')
+def small_decoder():
+    return PigLatinDecoder(SMALL_WORDS)
+
+
+class TestUnknownWords:
+    def test_onsets(self, small_decoder):
+        assert small_decoder.onsets == {'h', 'l', 'p', 'qu', 'rh', 'str', 'sw', 'w'}
+        assert small_decoder.max_onset == 3
+
+    @pytest.mark.parametrize('pig_word, word', [
+        ('ugway', 'ug'),            # a 'w' onset is not recovered: never 'wug'
+        ('ingsway', 'ings'),        # nor 'sw'
+        ('ingstray', 'string'),     # in the index
+        ('ogblay', 'logb'),         # 'l' is the longest onset that ends the stem
+        ('ingthray', 'ingthr'),     # no onset ends the stem, only 'ay' is dropped
+        ('ogay', 'og'),
+        ('ay', 'ay'), ('way', 'way'), ('hmm', 'hmm'),
+    ])
+    def test_decode_by_rule(self, small_decoder, pig_word, word):
+        assert small_decoder.decode_word(pig_word) == word
+        assert small_decoder.decode_word(pig_word.capitalize()) == word.capitalize()
+
+    @pytest.mark.parametrize('pig_word, word', [('ugway', 'ug'), ('ingthray', 'thring'), ('ogblay', 'blog')])
+    def test_dictionary_onsets(self, decoder, pig_word, word):
+        assert pig_word not in decoder.index
+        assert decoder.decode_by_rule(pig_word) == decoder.decode_word(pig_word) == word
@@ -0,0 +1,82 @@
+"""
+Seeded random streams: reproducible, independent of the worker running them, and unbiased batched draws.
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+
+import pytest
+
+from common.random_streams import RandomStream, derive_seed
+
+
+def _first_draws(stream):
+    return [stream.random() for _ in range(5)]
+
+
+def test_streams_depend_on_seed_and_key_only():
+    assert _first_draws(RandomStream(1, ('a',))) == _first_draws(RandomStream(1, ('a',)))
+    assert _first_draws(RandomStream(1, ('a',))) != _first_draws(RandomStream(2, ('a',)))
+    assert _first_draws(RandomStream(1, ('a',))) != _first_draws(RandomStream(1, ('b',)))
+    root = RandomStream(1)
+    root.random()
+    # drawing from a parent does not change its children
+    assert _first_draws(root.child('a')) == _first_draws(RandomStream(1, ('a',)))
+    assert [s.key for s in root.spawn(3)] == [(0,), (1,), (2,)]
+    assert derive_seed(1, ('a',)) != derive_seed(1, ('a', 0))
+
+
+def test_unseeded_stream_keeps_its_seed():
+    stream = RandomStream()
+    assert _first_draws(RandomStream(stream.root_seed)) == _first_draws(stream)
+
+
+def test_pickle_keeps_key_and_state():
+    stream = RandomStream(7, ('x',))
+    stream.random()
+    copy = pickle.loads(pickle.dumps(stream))
+    assert (copy.root_seed, copy.key) == (7, ('x',))
+    assert _first_draws(copy) == _first_draws(stream)
+
+
+def test_draws_do_not_depend_on_the_number_of_workers():
+    streams = RandomStream(3).spawn(6)
+    results = []
+    for workers in (1, 2):
+        with ProcessPoolExecutor(workers) as executor:
+            results.append(list(executor.map(_first_draws, streams)))
+    assert results[0] == results[1] == [_first_draws(s) for s in RandomStream(3).spawn(6)]
+
+
+@pytest.mark.parametrize('low, high', [(1, 6), (0, 255), (5, 5), (0, 999), (-10, 10), (0, 1 << 40), (-(1 << 70), 0)])
+def test_randints_range(low, high):
+    values = RandomStream(4).randints(low, high, 3000)
+    assert len(values) == 3000 and min(values) >= low and max(values) <= high
+
+
+def test_randints_reproducible():
+    assert RandomStream(4).randints(1, 6, 100) == RandomStream(4).randints(1, 6, 100)
+
+
+def test_randints_empty_range():
+    with pytest.raises(ValueError):
+        RandomStream(4).randints(2, 1, 10)
+
+
+@pytest.mark.parametrize('low, high', [(1, 6), (0, 99), (1000, 1006)])
+def test_randints_unbiased(low, high):
+    """Chi-square test of the counts against the uniform distribution."""
+    size, span = 60_000, high - low + 1
+    counts = Counter(RandomStream(5).randints(low, high, size))
+    assert sorted(counts) == list(range(low, high + 1))
+    expected = size / span
+    statistic = sum((c - expected) ** 2 / expected for c in counts.values())
+    # far in the upper tail of chi-square with span - 1 degrees of freedom
+    assert statistic < span - 1 + 6 * (2 * (span - 1)) ** 0.5
+
+
+def test_dice_and_choose():
+    rng = RandomStream(6)
+    assert set(rng.dice(6, 5000)) == set(range(1, 7))
+    assert set(rng.choose('abc', 1000)) == set('abc')
+    assert rng.choose('abc', 0) == []
@@ -0,0 +1,62 @@
+"""
+Bulk name generation (unique_names, write_names): every combination exactly once, whatever the batching.
+"""
+from itertools import chain, product
+import io
+
+import pytest
+
+from silly_names import first, last, middle, unique_names, write_names
+
+SMALL_PARTS = (('Ann', 'Bob', 'Cy'), ('Lee', 'Max'), ('Ng', 'Oz', 'Po', 'Qi'))
+
+
+def names(*args, **kwargs):
+    return list(chain.from_iterable(unique_names(*args, **kwargs)))
+
+
+def combinations(parts):
+    return {' '.join(p.strip() for p in combo) for combo in product(*parts)}
+
+
+@pytest.mark.parametrize('parts', [SMALL_PARTS, SMALL_PARTS[:1], SMALL_PARTS[:2], SMALL_PARTS + (('X', 'Y'),),
+                                   (first, middle, last)])
+def test_every_combination_once(parts):
+    made = names(seed=3, parts=parts)
+    assert len(made) == len(set(made)) and set(made) == combinations(parts)
+
+
+@pytest.mark.parametrize('batch_size', [1, 5, 7, 24, 1000])
+def test_batching_does_not_change_the_names(batch_size):
+    assert names(seed=8, batch_size=batch_size, parts=SMALL_PARTS) == names(seed=8, parts=SMALL_PARTS)
+    assert all(len(batch) <= batch_size for batch in unique_names(seed=8, batch_size=batch_size, parts=SMALL_PARTS))
+
+
+def test_seed_repeats_the_order():
+    assert names(5000, seed=42) == names(5000, seed=42)
+    assert names(5000, seed=42) != names(5000, seed=43)
+    # a shorter run is the start of a longer one
+    assert names(100, seed=42) == names(5000, seed=42)[:100]
+
+
+def test_empty():
+    assert names(0, seed=1) == []
+    assert names(seed=1, parts=(('a', 'b'), ())) == []
+    assert names(seed=1, parts=()) == ['']
+
+
+@pytest.mark.parametrize('count', [-1, 25])
+def test_count_out_of_range(count):
+    with pytest.raises(ValueError):
+        names(count, parts=SMALL_PARTS)
+
+
+def test_bad_batch_size():
+    with pytest.raises(ValueError):
+        names(parts=SMALL_PARTS, batch_size=0)
+
+
+def test_write_names():
+    output = io.StringIO()
+    assert write_names(output, 10, seed=2, batch_size=3, parts=SMALL_PARTS) == 10
+    assert output.getvalue().splitlines() == names(10, seed=2, parts=SMALL_PARTS)
@@ -0,0 +1,134 @@
+"""
+WordFrequency ranks, pruning and ordering on small fixture files and the 12dicts lists,
+and WordList.most_common built on the pruning.
+"""
+from contextlib import redirect_stdout
+import io
+
+import pytest
+
+from anagrams_v01 import WordList
+from common.word_frequency import WordFrequency, load_word_frequency
+
+FREQUENCY = """\
+----- 1 -----
+be
+    am, are, is, was
+the
+----- 2 -----
+go
+    goes, went
+a
+    an
+----- 3 -----
+abide
+"""
+
+# 'abode' is both an inflection of 'abide' and a headword, 'gone' and 'going' are only listed here,
+# 'aardvark' has no frequency band
+LEMMAS = """\
+abide
+    abided, abides, abode -> [abode]
+abode -> [abide]
+aardvark
+    aardvarks
+go
+    goes, going, gone, went
+"""
+
+RANKED_ORDER = ['be', 'am', 'are', 'is', 'was', 'the', 'go', 'goes', 'went', 'a', 'an', 'going', 'gone',
+                'abide', 'abided', 'abides', 'abode']
+
+
+@pytest.fixture(scope='module')
+def frequency(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('frequency')
+    (directory / 'frq.txt').write_text(FREQUENCY, encoding='latin-1')
+    (directory / 'lem.txt').write_text(LEMMAS, encoding='latin-1')
+    return WordFrequency(str(directory / 'frq.txt'), str(directory / 'lem.txt'))
+
+
+class TestRank:
+    def test_order(self, frequency):
+        """Band first, then the frequency list before the inherited inflections, then file order."""
+        assert sorted(frequency.ranks, key=frequency.rank) == RANKED_ORDER
+        assert [frequency.rank(w) for w in RANKED_ORDER] == list(range(len(RANKED_ORDER)))
+
+    def test_unranked(self, frequency):
+        assert len(frequency) == len(RANKED_ORDER)
+        for word in ('aardvark', 'aardvarks', 'zebra', ''):
+            assert word not in frequency and frequency.rank(word) == len(frequency)
+            assert frequency.band(word) is None
+
+    def test_bands(self, frequency):
+        assert frequency.band('was') == 1 and frequency.band('an') == 2
+        # inherited from the best band of their lemmas
+        assert frequency.band('gone') == 2 and frequency.band('abode') == 3
+
+    def test_without_lemmas(self, tmp_path):
+        path = tmp_path / 'frq.txt'
+        path.write_text(FREQUENCY, encoding='latin-1')
+        frequency = WordFrequency(str(path), None)
+        assert sorted(frequency.ranks, key=frequency.rank) == [w for w in RANKED_ORDER
+                                                               if w not in ('gone', 'going', 'abided',
+                                                                            'abides', 'abode')]
+
+    def test_score(self, frequency):
+        assert frequency.score('the') == frequency.rank('the')
+        assert frequency.score('the', 'abode', 'be') == frequency.rank('abode')
+        assert frequency.score('be', 'aardvark') == len(frequency)
+
+
+class TestPrune:
+    WORDS = ['zebra', 'abode', 'went', 'the', 'aardvark', 'an', 'be', 'went']
+
+    @pytest.mark.parametrize('top_n', [0, 1, 6, 9, 11, len(RANKED_ORDER), 100])
+    def test_prune(self, frequency, top_n):
+        top = set(RANKED_ORDER[:top_n])
+        expected = [i for i, w in enumerate(self.WORDS) if w in top]
+        assert frequency.prune_indices(self.WORDS, top_n) == expected
+        assert frequency.prune(self.WORDS, top_n) == [self.WORDS[i] for i in expected]
+
+    def test_unranked_words_are_always_pruned(self, frequency):
+        assert frequency.prune(['aardvark', 'zebra'], 10 ** 9) == []
+
+    @pytest.mark.parametrize('top_n', [0, 1, 5, len(RANKED_ORDER), 100])
+    def test_top_words(self, frequency, top_n):
+        assert frequency.top_words(top_n) == RANKED_ORDER[:top_n]
+        assert frequency.prune(RANKED_ORDER[::-1], top_n) == RANKED_ORDER[:top_n][::-1]
+
+    def test_ranked(self, frequency):
+        assert frequency.ranked(['zebra', 'abode', 'the', 'aardvark', 'be']) == \
+            ['be', 'the', 'abode', 'aardvark', 'zebra']
+        phrases = [('abode', 'be'), ('go', 'the'), ('aardvark',), ('an', 'a')]
+        assert frequency.ranked(phrases, key=lambda p: p) == [('go', 'the'), ('an', 'a'), ('abode', 'be'),
+                                                               ('aardvark',)]
+
+
+def test_lemmas(frequency):
+    assert frequency.lemma('abode') == ('abide', 'abode') and frequency.lemma('zebra') == ()
+    assert frequency.family('went') == ['go', 'goes', 'went', 'going', 'gone']
+    assert frequency.family('abides') == ['abide', 'abided', 'abides', 'abode']
+
+
+class TestDictionary:
+    def test_common_words(self):
+        frequency = load_word_frequency()
+        assert load_word_frequency() is frequency
+        assert frequency.top_words(3) == ['be', 'am', 'are']
+        assert frequency.rank('the') < frequency.rank('went') < frequency.rank('abode') < len(frequency)
+        assert 'aardvarks' not in frequency or frequency.band('aardvarks') > frequency.band('the')
+
+    @pytest.mark.parametrize('top_n', [100, 2_000])
+    def test_most_common(self, top_n):
+        words = ['zebra', 'the', 'aardvark', 'be', 'went', 'abode', 'quixotic', 'an', 'the', "can't"]
+        with redirect_stdout(io.StringIO()):
+            word_list = WordList('small', words=words)
+        subset, indices = word_list.most_common(top_n)
+        assert indices == load_word_frequency().prune_indices(words, top_n)
+        assert subset.words == load_word_frequency().prune(words, top_n) == [words[i] for i in indices]
+        assert {'the', 'be'} <= set(subset.words) and 'quixotic' not in subset.words
+        # built once per top_n
+        assert word_list.most_common(top_n)[0] is subset
+        indices, found = word_list.find_contained('thebe', top_n=top_n)
+        assert found == ['the', 'be', 'the'] and indices == [1, 3, 8]
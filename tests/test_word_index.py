@@ -0,0 +1,109 @@
+"""
+Compiled word list index (word_index.py): loading it back, rebuilding a stale one, and accepting a touched one.
+"""
+from contextlib import redirect_stdout
+import io
+import os
+import shutil
+import sys
+
+import pytest
+
+from tests import ANAGRAM_DICTIONARY
+import word_index
+from anagrams_v01 import WordList
+from word_index import WordIndex, index_path, open_index
+
+SMALL_WORDS = ['listen', 'silent', 'enlist', 'stone', 'notes', 'café', "can't", 'a', 'zebra', 'Zebra']
+
+
+def word_list(path, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return WordList(str(path), **kwargs)
+
+
+@pytest.fixture
+def dictionary(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text('\n'.join(SMALL_WORDS) + '\n', encoding='latin-1')
+    return path
+
+
+def assert_same(indexed, text):
+    assert indexed.index is not None and text.index is None
+    assert list(indexed.words) == text.words
+    assert indexed.words_indexed == dict(text.words_indexed)
+    assert [len(c) for c in indexed.frequencies] == [len(c) for c in text.frequencies]
+    assert indexed.anagram_table == text.anagram_table
+    for word in ('tinsel', 'zebras', 'notes', 'ecfa'):
+        assert indexed.find_contained(word, 'matrix') == text.find_contained(word, 'matrix')
+
+
+def test_index_matches_text_build(dictionary):
+    built = word_list(dictionary, use_index=True)
+    assert built.index is None and os.path.exists(index_path(str(dictionary)))
+    assert_same(word_list(dictionary, use_index=True), word_list(dictionary))
+
+
+def test_dictionary_index(tmp_path):
+    path = tmp_path / os.path.basename(ANAGRAM_DICTIONARY)
+    shutil.copy(ANAGRAM_DICTIONARY, path)
+    word_list(path, use_index=True)
+    assert_same(word_list(path, use_index=True), word_list(path))
+
+
+def test_missing_or_corrupt_index(dictionary):
+    assert open_index(str(dictionary)) is None
+    with open(index_path(str(dictionary)), 'wb') as fn:
+        fn.write(b'not an index')
+    assert open_index(str(dictionary)) is None
+    assert word_list(dictionary, use_index=True).index is None
+
+
+def test_size_change_rebuilds(dictionary):
+    word_list(dictionary, use_index=True)
+    with open(dictionary, 'a', encoding='latin-1') as fn:
+        fn.write('tinsel\n')
+    assert open_index(str(dictionary)) is None
+    rebuilt = word_list(dictionary, use_index=True)
+    assert 'tinsel' in rebuilt.words and open_index(str(dictionary)) is not None
+
+
+def test_same_size_new_contents_rebuilds(dictionary):
+    word_list(dictionary, use_index=True)
+    stat = os.stat(dictionary)
+    dictionary.write_text(dictionary.read_text(encoding='latin-1').replace('zebra', 'zebu!'), encoding='latin-1')
+    os.utime(dictionary, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert os.stat(dictionary).st_size == stat.st_size
+    assert open_index(str(dictionary)) is None
+
+
+def test_touched_file_is_accepted_and_not_hashed_again(dictionary, monkeypatch):
+    word_list(dictionary, use_index=True)
+    stat = os.stat(dictionary)
+    os.utime(dictionary, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    hashed = []
+    file_digest = word_index.file_digest
+    monkeypatch.setattr(word_index, 'file_digest', lambda name: hashed.append(name) or file_digest(name))
+    index = open_index(str(dictionary))
+    assert index is not None and len(hashed) == 1
+    assert index.source_mtime_ns == stat.st_mtime_ns + 10 ** 9
+    index.close()
+    # the header now has the new mtime
+    index = open_index(str(dictionary))
+    assert index is not None and len(hashed) == 1
+    index.close()
+
+
+def test_big_endian_round_trip(dictionary, monkeypatch):
+    """Written and read as on a big-endian host: the sections are swapped both ways."""
+    little = word_list(dictionary)
+    monkeypatch.setattr(sys, 'byteorder', 'big')
+    word_list(dictionary, use_index=True)
+    index = WordIndex(index_path(str(dictionary)))
+    try:
+        assert [index.members(c) for c in range(index.num_classes)] == list(little.words_indexed.values())
+        assert index.masks.tolist() == list(little.letter_masks)
+    finally:
+        index.close()